@@ -260,7 +260,7 @@ with st.expander("❓ FAQ"):
     A: For demo mode and exploring the marketplace, no. To get real AI responses from agents, you'll need a FREE GroqCloud API key.
     
     **Q: Where is my data stored?**
-    A: All data is stored locally in the `data/` folder. Your agents are in `agents.json` and chats are saved in `data/chats/`.
+    A: All data is stored locally in the `data/` folder. Your agents are in `agents.json` (recent changes sit in `agents.json.journal` until they are folded in) and chats are saved in `data/chats/`.
     
     **Q: Can I share my agents?**
     A: Currently, agents are stored locally. You can share the JSON configuration with others manually.
@@ -272,7 +272,7 @@ with st.expander("❓ FAQ"):
     A: GroqCloud offers extremely fast inference (up to 750 tokens/second!), generous free tier, and multiple state-of-the-art models.
     
     **Q: How do I delete an agent?**
-    A: Currently, you can manually edit the `data/agents.json` file to remove agents. A delete feature will be added in future versions.
+    A: Click 🗑️ Delete on the agent's card in the Marketplace. Please don't hand-edit `data/agents.json`: changes recorded in `agents.json.journal` are replayed on top of it and would undo your edit.
     
     **Q: Can I add custom tools?**
     A: Yes! You can create custom tools by adding Python files to the `core/tools/` directory and registering them in the tool registry.
@@ -1,160 +1,209 @@
 """
 Agent Manager - Handles CRUD operations for agents in local storage
 """
+import base64
 import json
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import shutil
 
+from core.agent_store import AgentStore, JsonAgentStore, SqliteAgentStore, migrate_json_to_sqlite
+
 DATA_DIR = "data"
 AGENTS_FILE = os.path.join(DATA_DIR, "agents.json")
 EXAMPLE_AGENTS_FILE = os.path.join(DATA_DIR, "example_agents.json")
 CHATS_DIR = os.path.join(DATA_DIR, "chats")
 
+# Storage backend: "json" (agents.json) or "sqlite" (agents.db)
+STORAGE_BACKEND = os.getenv("AGENT_MARKET_STORAGE", "json").lower()
+AGENTS_DB_FILE = os.path.join(DATA_DIR, "agents.db")
+
+# Process-wide store instances keyed by backend and path, so each keeps its
+# in-memory cache across calls
+_stores: Dict[tuple, AgentStore] = {}
+
+# Callbacks told about changed agents: called with an agent id, or None when
+# the whole catalog was replaced
+_change_listeners: List[Callable[[Optional[str]], None]] = []
+
+
+def get_store() -> AgentStore:
+    """Get the storage backend for the configured data location"""
+    if STORAGE_BACKEND == "sqlite":
+        key = ("sqlite", AGENTS_DB_FILE)
+        factory = SqliteAgentStore
+    else:
+        key = ("json", AGENTS_FILE)
+        factory = JsonAgentStore
+    
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = factory(key[1])
+    return store
+
 
 def ensure_data_directory():
     """Ensure data directory and files exist"""
     os.makedirs(DATA_DIR, exist_ok=True)
     os.makedirs(CHATS_DIR, exist_ok=True)
     
-    if not os.path.exists(AGENTS_FILE):
+    if STORAGE_BACKEND != "sqlite" and not os.path.exists(AGENTS_FILE):
         with open(AGENTS_FILE, 'w') as f:
             json.dump([], f)
 
 
-def load_agents() -> List[Dict]:
-    """Load all agents from local storage"""
+def add_change_listener(listener: Callable[[Optional[str]], None]):
+    """Register a callback run after an agent is updated or deleted"""
+    if listener not in _change_listeners:
+        _change_listeners.append(listener)
+
+
+def remove_change_listener(listener: Callable[[Optional[str]], None]):
+    """Unregister a change callback"""
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+def _notify_change(agent_id: Optional[str]):
+    for listener in list(_change_listeners):
+        listener(agent_id)
+
+
+def invalidate_agent_cache():
+    """Drop the cached agent list so the next read goes back to disk"""
+    get_store().invalidate()
+
+
+def _load_store() -> AgentStore:
+    """Get the agent store, seeding it with example agents when empty"""
     ensure_data_directory()
     
-    try:
-        with open(AGENTS_FILE, 'r') as f:
-            agents = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        agents = []
+    store = get_store()
     
     # If no agents exist, load example agents
-    if not agents and os.path.exists(EXAMPLE_AGENTS_FILE):
+    if not store.count() and os.path.exists(EXAMPLE_AGENTS_FILE):
         try:
             with open(EXAMPLE_AGENTS_FILE, 'r') as f:
-                agents = json.load(f)
-            save_agents(agents)
+                store.replace_all(json.load(f))
         except (FileNotFoundError, json.JSONDecodeError):
-            agents = []
+            pass
     
-    return agents
+    return store
+
+
+def load_agents() -> List[Dict]:
+    """Load all agents from local storage.
+    
+    The returned list is a fresh copy, but the agent dicts may be shared
+    with the in-process cache and should be treated as read-only.
+    """
+    return _load_store().load_all()
 
 
 def save_agents(agents: List[Dict]):
     """Save agents to local storage"""
     ensure_data_directory()
-    with open(AGENTS_FILE, 'w') as f:
-        json.dump(agents, f, indent=2)
+    get_store().replace_all(agents)
+    _notify_change(None)
 
 
 def create_agent(agent_data: Dict) -> Dict:
     """Create a new agent"""
-    agents = load_agents()
-    
-    # Generate unique ID
-    agent_id = f"agent_{len(agents) + 1:03d}"
-    while any(a.get('id') == agent_id for a in agents):
-        agent_id = f"agent_{int(agent_id.split('_')[1]) + 1:03d}"
+    store = _load_store()
     
-    # Add metadata
-    agent_data['id'] = agent_id
+    # Add metadata; the store assigns the ID
     agent_data['created_at'] = datetime.now().strftime("%Y-%m-%d")
-    
-    # Add to list and save
-    agents.append(agent_data)
-    save_agents(agents)
-    
-    return agent_data
+    return store.create(agent_data)
 
 
 def get_agent(agent_id: str) -> Optional[Dict]:
     """Get a specific agent by ID"""
-    agents = load_agents()
-    for agent in agents:
-        if agent.get('id') == agent_id:
-            return agent
-    return None
+    return _load_store().get(agent_id)
 
 
 def get_agent_by_name(name: str) -> Optional[Dict]:
     """Get a specific agent by name"""
-    agents = load_agents()
-    for agent in agents:
-        if agent.get('name') == name:
-            return agent
-    return None
+    return _load_store().get_by_name(name)
 
 
-def update_agent(agent_id: str, updated_data: Dict) -> bool:
-    """Update an existing agent"""
-    agents = load_agents()
+def update_agent(agent_id: str, updated_data: Dict, expected_version: Optional[int] = None) -> bool:
+    """Update an existing agent.
     
-    for i, agent in enumerate(agents):
-        if agent.get('id') == agent_id:
-            # Preserve ID and creation date
-            updated_data['id'] = agent_id
-            updated_data['created_at'] = agent.get('created_at')
-            agents[i] = updated_data
-            save_agents(agents)
-            return True
-    
-    return False
+    When expected_version is given (or updated_data carries the 'version'
+    it was read at), the update raises core.agent_store.AgentVersionConflict
+    if the agent has been modified since.
+    """
+    updated = _load_store().update(agent_id, updated_data, expected_version)
+    if updated:
+        _notify_change(agent_id)
+    return updated
 
 
 def delete_agent(agent_id: str) -> bool:
     """Delete an agent"""
-    agents = load_agents()
-    original_count = len(agents)
-    
-    agents = [a for a in agents if a.get('id') != agent_id]
-    
-    if len(agents) < original_count:
-        save_agents(agents)
-        return True
-    
-    return False
+    deleted = _load_store().delete(agent_id)
+    if deleted:
+        _notify_change(agent_id)
+    return deleted
 
 
-def search_agents(query: str = "", filters: Dict = None) -> List[Dict]:
-    """Search and filter agents"""
-    agents = load_agents()
-    
-    if not query and not filters:
-        return agents
-    
-    results = agents
-    
-    # Text search
-    if query:
-        query_lower = query.lower()
-        results = [
-            a for a in results
-            if query_lower in a.get('name', '').lower()
-            or query_lower in a.get('description', '').lower()
-            or query_lower in a.get('author', '').lower()
-            or any(query_lower in tool.lower() for tool in a.get('tools', []))
-        ]
-    
-    # Apply filters
-    if filters:
-        if 'author' in filters and filters['author']:
-            results = [a for a in results if a.get('author') == filters['author']]
-        
-        if 'model' in filters and filters['model']:
-            results = [a for a in results if a.get('model') == filters['model']]
-        
-        if 'tools' in filters and filters['tools']:
-            results = [
-                a for a in results
-                if any(tool in a.get('tools', []) for tool in filters['tools'])
-            ]
-    
-    return results
+def _encode_cursor(offset: int) -> str:
+    """Encode a result position as an opaque page cursor"""
+    return base64.urlsafe_b64encode(json.dumps({'offset': offset}).encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> int:
+    """Decode a page cursor; unknown or malformed cursors start from the top"""
+    if not cursor:
+        return 0
+    try:
+        return max(int(json.loads(base64.urlsafe_b64decode(cursor.encode()))['offset']), 0)
+    except (ValueError, TypeError, KeyError):
+        return 0
+
+
+def search_agents(query: str = "", filters: Dict = None, limit: Optional[int] = None,
+                  offset: int = 0, sort: Optional[str] = None) -> List[Dict]:
+    """Search and filter agents.
+    
+    Query tokens are prefix-matched against name, description, author and
+    tools, and results are ranked by relevance. With no query, agents keep
+    their stored order. sort may be 'newest', 'name', 'name_desc' or
+    'author' to order by field instead.
+    """
+    return _load_store().search(query, filters, limit, offset, sort)
+
+
+def search_agents_with_facets(query: str = "", filters: Dict = None, limit: Optional[int] = None,
+                              offset: int = 0, sort: Optional[str] = None,
+                              cursor: Optional[str] = None) -> Dict:
+    """Search agents and count facet values in the same pass.
+    
+    Returns {'agents': [...], 'total': int, 'facets': {'author': {...},
+    'model': {...}, 'tools': {...}}, 'next_cursor': str or None}. Filter
+    values may be a string or a list; values within a facet are OR'ed and
+    facets are AND'ed. Each facet is counted against every filter except
+    its own. Pass a previous result's next_cursor to fetch the next page.
+    """
+    if cursor:
+        offset = _decode_cursor(cursor)
+    result = _load_store().find(query, filters, limit, offset, with_facets=True, sort=sort)
+    end = offset + len(result['agents'])
+    result['offset'] = offset
+    result['next_cursor'] = _encode_cursor(end) if end < result['total'] else None
+    return result
+
+
+def count_agents() -> int:
+    """Count stored agents"""
+    return _load_store().count()
+
+
+def migrate_to_sqlite() -> int:
+    """Copy agents.json into agents.db; returns the number of agents copied"""
+    ensure_data_directory()
+    return migrate_json_to_sqlite(AGENTS_FILE, AGENTS_DB_FILE)
 
 
 def save_chat(agent_name: str, messages: List[Dict]) -> str:
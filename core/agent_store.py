@@ -0,0 +1,979 @@
+"""
+Agent Store - Pluggable storage backends for the agent catalog
+"""
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from itertools import islice
+from contextlib import contextmanager
+from typing import List, Dict, Optional
+
+from core.search_index import (
+    FACET_FIELDS, FIELD_WEIGHTS, FacetIndex, SearchIndex,
+    filter_values, agent_field_tokens, tokenize,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+
+
+def _agent_id_number(agent_id) -> Optional[int]:
+    """Return the numeric part of a generated 'agent_N' id, if any"""
+    if not isinstance(agent_id, str) or not agent_id.startswith('agent_'):
+        return None
+    suffix = agent_id[len('agent_'):]
+    return int(suffix) if suffix.isdigit() else None
+
+
+def _format_agent_id(number: int) -> str:
+    """Format a generated agent id"""
+    return f"agent_{number:03d}"
+
+
+def _file_stamp(path: str) -> Optional[tuple]:
+    """Return a (mtime, size, inode) stamp for a file, or None if missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+# Sort orders accepted by AgentStore.find: name -> (field, descending), with
+# None (or 'relevance') meaning relevance ranking / insertion order
+SORT_ORDERS = {
+    None: None,
+    'relevance': None,
+    'newest': ('created_at', True),
+    'name': ('name', False),
+    'name_desc': ('name', True),
+    'author': ('author', False),
+}
+
+
+# Journal records folded into a new agents.json snapshot at a time
+JOURNAL_COMPACT_THRESHOLD = 500
+
+
+class AgentVersionConflict(Exception):
+    """Raised when an update carries a stale agent version"""
+    
+    def __init__(self, agent_id: str, expected: int, actual: int):
+        super().__init__(
+            f"Agent '{agent_id}' was modified concurrently "
+            f"(expected version {expected}, found {actual})"
+        )
+        self.agent_id = agent_id
+        self.expected = expected
+        self.actual = actual
+
+
+def _check_version(agent_id: str, current: Dict, updated_data: Dict,
+                   expected_version: Optional[int]) -> int:
+    """Validate an optimistic update and return the agent's next version.
+    
+    The expected version comes from expected_version or, failing that, the
+    'version' carried in updated_data (the version the caller last read).
+    Updates without either are applied unconditionally.
+    """
+    actual = current.get('version', 0)
+    expected = expected_version if expected_version is not None else updated_data.get('version')
+    if expected is not None and expected != actual:
+        raise AgentVersionConflict(agent_id, expected, actual)
+    return actual + 1
+
+
+class _FileLock:
+    """Exclusive advisory lock on a file, held across processes.
+    
+    Uses fcntl.flock on POSIX and msvcrt.locking on Windows. Each
+    acquisition opens its own descriptor, so threads of one process exclude
+    each other too.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+    
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+    
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class AgentStore(ABC):
+    """Base class for agent storage backends.
+    
+    Agent dicts returned by a store may be shared with its in-process cache
+    and should be treated as read-only.
+    """
+    
+    @abstractmethod
+    def load_all(self) -> List[Dict]:
+        """Return every agent in insertion order"""
+    
+    @abstractmethod
+    def replace_all(self, agents: List[Dict]):
+        """Replace the whole catalog"""
+    
+    def count(self) -> int:
+        """Return the number of stored agents"""
+        return len(self.load_all())
+    
+    @abstractmethod
+    def get(self, agent_id: str) -> Optional[Dict]:
+        """Get an agent by ID"""
+    
+    @abstractmethod
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        """Get the first agent with the given name"""
+    
+    @abstractmethod
+    def create(self, agent_data: Dict) -> Dict:
+        """Assign a new ID and version 1 to agent_data and store it"""
+    
+    @abstractmethod
+    def update(self, agent_id: str, updated_data: Dict,
+               expected_version: Optional[int] = None) -> bool:
+        """Replace an agent, preserving its ID and creation date.
+        
+        Every stored agent carries a 'version' that each update bumps.
+        Raises AgentVersionConflict if the expected version (see
+        _check_version) no longer matches.
+        """
+    
+    @abstractmethod
+    def delete(self, agent_id: str) -> bool:
+        """Delete an agent"""
+    
+    def search(self, query: str = "", filters: Dict = None, limit: Optional[int] = None,
+               offset: int = 0, sort: Optional[str] = None) -> List[Dict]:
+        """Search and filter agents.
+        
+        Every query token must prefix-match a token of the agent's name,
+        description, author or tools. By default matches are ranked by
+        relevance and, with no query, agents keep insertion order; sort
+        picks one of SORT_ORDERS instead.
+        """
+        return self.find(query, filters, limit, offset, sort=sort)['agents']
+    
+    def find(self, query: str = "", filters: Dict = None, limit: Optional[int] = None,
+             offset: int = 0, with_facets: bool = False, sort: Optional[str] = None) -> Dict:
+        """Search returning {'agents', 'total'} and, optionally, 'facets'.
+        
+        'total' counts every match before limit/offset are applied, and
+        'facets' maps author/model/tools to {value: count}. This fallback
+        indexes the whole catalog per call; backends override it with
+        persistent indexes.
+        """
+        return _AgentRegistry(self.load_all()).find(query, filters, limit, offset, with_facets, sort)
+    
+    def invalidate(self):
+        """Drop any cached state so the next read goes back to storage"""
+
+
+class _AgentRegistry:
+    """Parsed agent list with id and name indexes for O(1) lookups"""
+    
+    def __init__(self, agents: List[Dict], stamp: Optional[tuple] = None):
+        self.stamp = stamp
+        # Insertion-ordered map of key -> agent; the key is the agent id,
+        # or a synthetic key for agents with a missing or duplicate id
+        self._agents: Dict = {}
+        self._by_id: Dict[str, object] = {}
+        self._by_name: Dict[str, List] = {}
+        # High-water mark for generated ids; only ever moves forward
+        self.next_id = 1
+        # Records and bytes of the journal already applied (JSON store only)
+        self.journal_records = 0
+        self.journal_size = 0
+        # Full-text and facet indexes, built on first search and then kept in sync
+        self._search_index: Optional[SearchIndex] = None
+        self._facet_index: Optional[FacetIndex] = None
+        # Keys pre-sorted per sort order, dropped on any mutation
+        self._sorted: Dict[str, List] = {}
+        for agent in agents:
+            self._insert(agent)
+    
+    @property
+    def agents(self) -> List[Dict]:
+        return list(self._agents.values())
+    
+    def __len__(self) -> int:
+        return len(self._agents)
+    
+    def _insert(self, agent: Dict):
+        self._sorted.clear()
+        agent_id = agent.get('id')
+        if agent_id is not None and agent_id not in self._by_id:
+            key = agent_id
+            self._by_id[agent_id] = key
+        else:
+            key = ('_anonymous', id(agent))
+        self._agents[key] = agent
+        self._by_name.setdefault(agent.get('name'), []).append(key)
+        if self._search_index is not None:
+            self._search_index.add(key, agent)
+            self._facet_index.add(key, agent)
+        number = _agent_id_number(agent_id)
+        if number is not None and number >= self.next_id:
+            self.next_id = number + 1
+    
+    def _unindex_name(self, key, name):
+        keys = self._by_name.get(name, [])
+        if key in keys:
+            keys.remove(key)
+        if not keys:
+            self._by_name.pop(name, None)
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        key = self._by_id.get(agent_id)
+        return self._agents[key] if key is not None else None
+    
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        keys = self._by_name.get(name)
+        return self._agents[keys[0]] if keys else None
+    
+    def add(self, agent: Dict):
+        self._insert(agent)
+    
+    def apply(self, record: Dict):
+        """Apply a journal record; replaying one twice has no further effect"""
+        if record.get('op') == 'delete':
+            self.remove(record.get('id'))
+        else:
+            agent = record['agent']
+            if not self.replace(agent.get('id'), agent):
+                self.add(agent)
+        self.next_id = max(self.next_id, record.get('next_id', 0))
+    
+    def replace(self, agent_id: str, agent: Dict) -> bool:
+        key = self._by_id.get(agent_id)
+        if key is None:
+            return False
+        self._sorted.clear()
+        self._unindex_name(key, self._agents[key].get('name'))
+        self._agents[key] = agent
+        self._by_name.setdefault(agent.get('name'), []).append(key)
+        if self._search_index is not None:
+            self._search_index.add(key, agent)
+            self._facet_index.add(key, agent)
+        return True
+    
+    def remove(self, agent_id: str) -> bool:
+        key = self._by_id.pop(agent_id, None)
+        if key is None:
+            return False
+        agent = self._agents.pop(key)
+        self._sorted.clear()
+        self._unindex_name(key, agent.get('name'))
+        if self._search_index is not None:
+            self._search_index.remove(key, forget_order=True)
+            self._facet_index.remove(key)
+        return True
+    
+    def _ensure_indexes(self):
+        """Build the search and facet indexes on first use"""
+        if self._search_index is None:
+            self._search_index = SearchIndex()
+            self._facet_index = FacetIndex()
+            for key, agent in self._agents.items():
+                self._search_index.add(key, agent)
+                self._facet_index.add(key, agent)
+    
+    def _sorted_keys(self, sort: str) -> List:
+        """All keys in the given field order, cached until the next mutation"""
+        keys = self._sorted.get(sort)
+        if keys is None:
+            field, descending = SORT_ORDERS[sort]
+            agents = self._agents
+            # Stable sort, so ties keep insertion order in both directions
+            keys = sorted(agents, key=lambda k: str(agents[k].get(field) or '').lower(), reverse=descending)
+            self._sorted[sort] = keys
+        return keys
+    
+    def find(self, query: str, filters: Optional[Dict], limit: Optional[int] = None,
+             offset: int = 0, with_facets: bool = False, sort: Optional[str] = None) -> Dict:
+        """Ranked, filtered agents matching query; see AgentStore.find"""
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        self._ensure_indexes()
+        offset = max(offset or 0, 0)
+        stop = None if limit is None else offset + max(limit, 0)
+        
+        scores = self._search_index.score(query)
+        selected = self._facet_index.select(filters)
+        text_matches = None if scores is None else set(scores)
+        
+        # Keys that survive the query and filters; None means every agent
+        if scores is None:
+            candidates = selected
+        elif selected is not None:
+            scores = {key: score for key, score in scores.items() if key in selected}
+            candidates = set(scores)
+        else:
+            candidates = text_matches
+        total = len(self._agents) if candidates is None else len(candidates)
+        
+        if SORT_ORDERS[sort] is not None:
+            ordered = self._sorted_keys(sort)
+            if candidates is not None:
+                ordered = (key for key in ordered if key in candidates)
+            keys = list(islice(ordered, offset, stop))
+        elif scores is not None:
+            keys = self._search_index.rank(scores, stop)[offset:]
+        elif candidates is not None:
+            keys = self._search_index.in_order(candidates)[offset:stop]
+        else:
+            keys = list(islice(self._agents, offset, stop))
+        
+        result = {'agents': [self._agents[key] for key in keys], 'total': total}
+        if with_facets:
+            result['facets'] = self._facet_index.counts(text_matches, filters)
+        return result
+
+
+def _fsync_directory(directory: str):
+    """Flush a directory entry so a rename survives power loss (POSIX only)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write_json(path: str, data, indent: Optional[int] = None):
+    """Write JSON through a temp file + fsync + rename, so readers and
+    crashes only ever see the old or the new file, never a truncated one"""
+    directory = os.path.dirname(path)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+
+class JsonAgentStore(AgentStore):
+    """Agents stored as a JSON snapshot plus an append-only mutation journal.
+    
+    Each create/update/delete appends one JSON line to '<path>.journal', so
+    a mutation costs O(record). Once the journal reaches
+    JOURNAL_COMPACT_THRESHOLD records it is folded into a new snapshot,
+    written atomically. Replaying a record is idempotent, so a crash at any
+    point leaves a loadable store.
+    
+    Mutations hold an advisory lock on '<path>.lock' and re-read the store
+    under it, so several processes can share one data directory without
+    losing writes. Reads take no file lock.
+    """
+    
+    # Attempts at a consistent lock-free read before falling back to the lock
+    READ_RETRIES = 3
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.counter_path = os.path.splitext(path)[0] + "_meta.json"
+        self._registry: Optional[_AgentRegistry] = None
+        # Guards the in-memory registry against concurrent threads
+        self._lock = threading.RLock()
+    
+    def invalidate(self):
+        with self._lock:
+            self._registry = None
+    
+    def _stamp(self) -> tuple:
+        return (_file_stamp(self.path), _file_stamp(self.journal_path))
+    
+    def _read_id_counter(self) -> int:
+        """Read the persisted next agent id (1 if none has been stored)"""
+        try:
+            with open(self.counter_path, 'r') as f:
+                return int(json.load(f).get('next_id', 1))
+        except (OSError, ValueError, AttributeError, TypeError):
+            return 1
+    
+    def _read_registry(self, locked: bool = False) -> _AgentRegistry:
+        """Load snapshot + journal, reusing the cached registry while both are unchanged"""
+        with self._lock:
+            stamp = self._stamp()
+            cached = self._registry
+            if cached is not None and stamp[0] is not None and cached.stamp == stamp:
+                return cached
+            
+            for attempt in range(self.READ_RETRIES + 1):
+                if attempt == self.READ_RETRIES and not locked:
+                    # Writers keep racing us; read while holding their lock
+                    with _FileLock(self.lock_path):
+                        return self._read_registry(locked=True)
+                registry = self._load(stamp)
+                # A compaction between reading the snapshot and the journal
+                # shows up as a changed stamp; read again in that case
+                after = self._stamp()
+                if after == stamp or locked:
+                    break
+                stamp = after
+            
+            self._registry = registry if stamp[0] is not None else None
+            return registry
+    
+    def _load(self, stamp: tuple) -> _AgentRegistry:
+        try:
+            with open(self.path, 'r') as f:
+                agents = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            agents = []
+        
+        registry = _AgentRegistry(agents, stamp)
+        registry.next_id = max(registry.next_id, self._read_id_counter())
+        self._replay_journal(registry)
+        return registry
+    
+    def _replay_journal(self, registry: _AgentRegistry):
+        """Apply journal records to a registry loaded from the snapshot"""
+        registry.journal_records = 0
+        registry.journal_size = 0
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        
+        with f:
+            for line in f:
+                # A missing newline or bad JSON marks a torn tail left by an
+                # interrupted append; it is cut off before the next append
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                registry.apply(record)
+                registry.journal_records += 1
+                registry.journal_size += len(line)
+    
+    @contextmanager
+    def _mutation(self):
+        """Lock the store across threads and processes and yield a fresh registry"""
+        with self._lock, _FileLock(self.lock_path):
+            yield self._read_registry(locked=True)
+    
+    def _append(self, registry: _AgentRegistry, record: Dict):
+        """Durably append a record to the journal, then apply it in memory.
+        
+        Must be called inside _mutation(), which guarantees registry
+        reflects every complete record in the journal.
+        """
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        try:
+            with open(self.journal_path, 'ab') as f:
+                if f.tell() != registry.journal_size:
+                    f.truncate(registry.journal_size)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self.invalidate()
+            raise
+        
+        registry.apply(record)
+        registry.journal_records += 1
+        registry.journal_size += len(line)
+        registry.stamp = self._stamp()
+        self._registry = registry
+        
+        if registry.journal_records >= JOURNAL_COMPACT_THRESHOLD:
+            self._write_snapshot(registry)
+    
+    def _write_snapshot(self, registry: _AgentRegistry):
+        """Atomically write the full catalog and reset the journal (under _mutation)"""
+        try:
+            _atomic_write_json(self.counter_path, {'next_id': registry.next_id})
+            _atomic_write_json(self.path, registry.agents, indent=2)
+            # A crash here just replays already-snapshotted records
+            with open(self.journal_path, 'wb') as f:
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            self.invalidate()
+            raise
+        registry.journal_records = 0
+        registry.journal_size = 0
+        registry.stamp = self._stamp()
+        self._registry = registry
+    
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with self._mutation() as registry:
+            self._write_snapshot(registry)
+    
+    def load_all(self) -> List[Dict]:
+        with self._lock:
+            return self._read_registry().agents
+    
+    def count(self) -> int:
+        with self._lock:
+            return len(self._read_registry())
+    
+    def replace_all(self, agents: List[Dict]):
+        with self._mutation():
+            registry = _AgentRegistry(agents)
+            registry.next_id = max(registry.next_id, self._read_id_counter())
+            self._write_snapshot(registry)
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._read_registry().get(agent_id)
+    
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            return self._read_registry().get_by_name(name)
+    
+    def create(self, agent_data: Dict) -> Dict:
+        with self._mutation() as registry:
+            # Generate unique ID from the persisted high-water mark
+            agent_data['id'] = _format_agent_id(registry.next_id)
+            agent_data['version'] = 1
+            self._append(registry, {'op': 'create', 'agent': agent_data, 'next_id': registry.next_id + 1})
+        return agent_data
+    
+    def update(self, agent_id: str, updated_data: Dict,
+               expected_version: Optional[int] = None) -> bool:
+        with self._mutation() as registry:
+            agent = registry.get(agent_id)
+            if agent is None:
+                return False
+            
+            version = _check_version(agent_id, agent, updated_data, expected_version)
+            
+            # Preserve ID and creation date
+            updated_data['id'] = agent_id
+            updated_data['created_at'] = agent.get('created_at')
+            updated_data['version'] = version
+            self._append(registry, {'op': 'update', 'agent': updated_data})
+        return True
+    
+    def search(self, query: str = "", filters: Dict = None, limit: Optional[int] = None,
+               offset: int = 0, sort: Optional[str] = None) -> List[Dict]:
+        return self.find(query, filters, limit, offset, sort=sort)['agents']
+    
+    def find(self, query: str = "", filters: Dict = None, limit: Optional[int] = None,
+             offset: int = 0, with_facets: bool = False, sort: Optional[str] = None) -> Dict:
+        with self._lock:
+            return self._read_registry().find(query, filters, limit, offset, with_facets, sort)
+    
+    def delete(self, agent_id: str) -> bool:
+        with self._mutation() as registry:
+            if registry.get(agent_id) is None:
+                return False
+            
+            self._append(registry, {'op': 'delete', 'id': agent_id})
+        return True
+
+
+class SqliteAgentStore(AgentStore):
+    """Agents stored one row each in a SQLite database in WAL mode.
+    
+    Mutations touch a single row, so their cost does not grow with the
+    catalog, and concurrent writers are serialized by SQLite itself.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS agents (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            name TEXT,
+            author TEXT,
+            model TEXT,
+            created_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_agents_name ON agents(name);
+        CREATE INDEX IF NOT EXISTS idx_agents_author ON agents(author);
+        CREATE INDEX IF NOT EXISTS idx_agents_model ON agents(model);
+        CREATE TABLE IF NOT EXISTS agent_tools (
+            seq INTEGER NOT NULL,
+            tool TEXT NOT NULL,
+            PRIMARY KEY (seq, tool)
+        );
+        CREATE INDEX IF NOT EXISTS idx_agent_tools_tool ON agent_tools(tool, seq);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+    
+    # Full-text index over pre-tokenized fields; rowid mirrors agents.seq
+    FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS agents_fts
+        USING fts5(name, tools, author, description)
+    """
+    # Bumped whenever derived tables (agents_fts, agent_tools) change shape,
+    # so existing databases are re-indexed on first connect
+    INDEX_VERSION = "2"
+    
+    def __init__(self, path: str):
+        self.path = path
+        # sqlite3 connections must stay on the thread that opened them
+        self._local = threading.local()
+        # Whether this SQLite build has FTS5; decided on first connect
+        self.has_fts: Optional[bool] = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+            self._local.cache = None
+            self._init_indexes(conn)
+        return conn
+    
+    def _init_indexes(self, conn: sqlite3.Connection):
+        """Create derived index tables and backfill databases that predate them"""
+        try:
+            conn.execute(self.FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'index_version'").fetchone()
+            if row and row[0] == self.INDEX_VERSION:
+                return
+            if self.has_fts:
+                conn.execute("DELETE FROM agents_fts")
+            conn.execute("DELETE FROM agent_tools")
+            for seq, data in conn.execute("SELECT seq, data FROM agents").fetchall():
+                self._index_row(conn, seq, json.loads(data))
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('index_version', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (self.INDEX_VERSION,)
+            )
+    
+    def _index_row(self, conn: sqlite3.Connection, seq: int, agent: Dict):
+        """Write (or overwrite) the full-text and tool rows for an agent"""
+        conn.execute("DELETE FROM agent_tools WHERE seq = ?", (seq,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO agent_tools (seq, tool) VALUES (?, ?)",
+            [(seq, tool) for tool in agent.get('tools', []) or [] if tool]
+        )
+        if not self.has_fts:
+            return
+        fields = agent_field_tokens(agent)
+        conn.execute(
+            "INSERT OR REPLACE INTO agents_fts (rowid, name, tools, author, description) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (seq,) + tuple(' '.join(fields[f]) for f in ('name', 'tools', 'author', 'description'))
+        )
+    
+    def _unindex_row(self, conn: sqlite3.Connection, seq: int):
+        conn.execute("DELETE FROM agent_tools WHERE seq = ?", (seq,))
+        if self.has_fts:
+            conn.execute("DELETE FROM agents_fts WHERE rowid = ?", (seq,))
+    
+    @contextmanager
+    def _transaction(self):
+        """Run a write transaction, taking the write lock up front"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._local.cache = None
+    
+    def invalidate(self):
+        self._local.cache = None
+    
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+            self._local.cache = None
+    
+    @staticmethod
+    def _row_values(agent: Dict) -> tuple:
+        return (
+            agent['id'],
+            agent.get('name'),
+            agent.get('author'),
+            agent.get('model'),
+            agent.get('created_at'),
+            json.dumps(agent),
+        )
+    
+    def _next_id(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return int(row[0]) if row else 1
+    
+    def _set_next_id(self, conn: sqlite3.Connection, next_id: int):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('next_id', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (str(next_id),)
+        )
+    
+    def _insert_many(self, conn: sqlite3.Connection, agents: List[Dict]) -> int:
+        """Insert agents, allocating ids where missing; returns rows inserted"""
+        next_id = self._next_id(conn)
+        for agent in agents:
+            number = _agent_id_number(agent.get('id'))
+            if number is not None and number >= next_id:
+                next_id = number + 1
+        
+        inserted = 0
+        for agent in agents:
+            if agent.get('id') is None:
+                agent = dict(agent, id=_format_agent_id(next_id))
+                next_id += 1
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO agents (id, name, author, model, created_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._row_values(agent)
+            )
+            if cursor.rowcount:
+                self._index_row(conn, cursor.lastrowid, agent)
+            inserted += cursor.rowcount
+        self._set_next_id(conn, next_id)
+        return inserted
+    
+    def load_all(self) -> List[Dict]:
+        conn = self._connect()
+        # data_version changes whenever another connection commits, and our
+        # own commits clear the cache, so an unchanged version means a hit
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        cache = self._local.cache
+        if cache is not None and cache[0] == version:
+            return list(cache[1])
+        
+        rows = conn.execute("SELECT data FROM agents ORDER BY seq").fetchall()
+        agents = [json.loads(row[0]) for row in rows]
+        self._local.cache = (version, agents)
+        return list(agents)
+    
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM agents").fetchone()[0]
+    
+    def replace_all(self, agents: List[Dict]):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM agents")
+            conn.execute("DELETE FROM agent_tools")
+            if self.has_fts:
+                conn.execute("DELETE FROM agents_fts")
+            self._insert_many(conn, agents)
+    
+    def import_agents(self, agents: List[Dict]) -> int:
+        """Append agents, keeping existing rows with the same id"""
+        with self._transaction() as conn:
+            return self._insert_many(conn, agents)
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM agents WHERE id = ?", (agent_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_by_name(self, name: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT data FROM agents WHERE name = ? ORDER BY seq LIMIT 1", (name,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def create(self, agent_data: Dict) -> Dict:
+        with self._transaction() as conn:
+            next_id = self._next_id(conn)
+            agent_id = _format_agent_id(next_id)
+            # Rows imported with explicit ids may sit above the counter
+            while conn.execute("SELECT 1 FROM agents WHERE id = ?", (agent_id,)).fetchone():
+                next_id += 1
+                agent_id = _format_agent_id(next_id)
+            agent_data['id'] = agent_id
+            agent_data['version'] = 1
+            cursor = conn.execute(
+                "INSERT INTO agents (id, name, author, model, created_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                self._row_values(agent_data)
+            )
+            self._index_row(conn, cursor.lastrowid, agent_data)
+            self._set_next_id(conn, next_id + 1)
+        return agent_data
+    
+    def update(self, agent_id: str, updated_data: Dict,
+               expected_version: Optional[int] = None) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT seq, created_at, data FROM agents WHERE id = ?", (agent_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            
+            version = _check_version(agent_id, json.loads(row[2]), updated_data, expected_version)
+            
+            # Preserve ID and creation date
+            updated_data['id'] = agent_id
+            updated_data['created_at'] = row[1]
+            updated_data['version'] = version
+            conn.execute(
+                "UPDATE agents SET name = ?, author = ?, model = ?, created_at = ?, data = ? "
+                "WHERE id = ?",
+                self._row_values(updated_data)[1:] + (agent_id,)
+            )
+            self._index_row(conn, row[0], updated_data)
+        return True
+    
+    def delete(self, agent_id: str) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT seq FROM agents WHERE id = ?", (agent_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM agents WHERE seq = ?", (row[0],))
+            self._unindex_row(conn, row[0])
+            return True
+    
+    # ORDER BY clauses for SORT_ORDERS on the agents table (aliased 'a')
+    SORT_SQL = {
+        'newest': "a.created_at DESC, a.seq",
+        'name': "a.name COLLATE NOCASE, a.seq",
+        'name_desc': "a.name COLLATE NOCASE DESC, a.seq",
+        'author': "a.author COLLATE NOCASE, a.seq",
+    }
+    
+    def find(self, query: str = "", filters: Dict = None, limit: Optional[int] = None,
+             offset: int = 0, with_facets: bool = False, sort: Optional[str] = None) -> Dict:
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}")
+        conn = self._connect()
+        match = ' '.join(f'"{token}"*' for token in dict.fromkeys(tokenize(query)))
+        if match and not self.has_fts:
+            return super().find(query, filters, limit, offset, with_facets, sort)
+        
+        if match:
+            source = "agents_fts JOIN agents a ON a.seq = agents_fts.rowid"
+            base_where, base_params = ["agents_fts MATCH ?"], [match]
+            order = "bm25(agents_fts, ?, ?, ?, ?), a.seq"
+            order_params = [FIELD_WEIGHTS[f] for f in ('name', 'tools', 'author', 'description')]
+        else:
+            source = "agents a"
+            base_where, base_params = [], []
+            order, order_params = "a.seq", []
+        
+        if sort in self.SORT_SQL:
+            order, order_params = self.SORT_SQL[sort], []
+        
+        where, params = self._filter_clause(filters)
+        where, params = base_where + where, base_params + params
+        where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+        
+        rows = conn.execute(
+            f"SELECT a.data FROM {source}{where_sql} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + order_params + [-1 if limit is None else max(limit, 0), max(offset or 0, 0)]
+        ).fetchall()
+        agents = [json.loads(row[0]) for row in rows]
+        total = conn.execute(f"SELECT COUNT(*) FROM {source}{where_sql}", params).fetchone()[0]
+        result = {'agents': agents, 'total': total}
+        
+        if with_facets:
+            facets = {}
+            for field in FACET_FIELDS:
+                # Count each facet against every filter except its own
+                other_where, other_params = self._filter_clause(filters, exclude=field)
+                other_where, other_params = base_where + other_where, base_params + other_params
+                other_sql = (" WHERE " + " AND ".join(other_where)) if other_where else ""
+                if field == 'tools':
+                    sql = (f"SELECT t.tool, COUNT(*) FROM {source} "
+                           f"JOIN agent_tools t ON t.seq = a.seq{other_sql} GROUP BY t.tool")
+                else:
+                    sql = (f"SELECT a.{field}, COUNT(*) FROM {source}{other_sql} "
+                           f"GROUP BY a.{field}")
+                counts = {value: count for value, count in conn.execute(sql, other_params) if value}
+                facets[field] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+            result['facets'] = facets
+        
+        return result
+    
+    @staticmethod
+    def _filter_clause(filters: Optional[Dict], exclude: Optional[str] = None) -> tuple:
+        """SQL conditions on the agents table (aliased 'a') for facet filters"""
+        where, params = [], []
+        for field in FACET_FIELDS:
+            if field == exclude:
+                continue
+            values = filter_values(filters, field)
+            if not values:
+                continue
+            placeholders = ', '.join('?' * len(values))
+            if field == 'tools':
+                where.append(f"a.seq IN (SELECT seq FROM agent_tools WHERE tool IN ({placeholders}))")
+            else:
+                where.append(f"a.{field} IN ({placeholders})")
+            params.extend(values)
+        return where, params
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """One-shot copy of a JSON agents file, with its journal, into a SQLite store.
+    
+    Agents whose id already exists in the database are skipped, so running
+    the migration twice is harmless. Returns the number of agents copied.
+    """
+    # Snapshot plus journal, exactly as the JSON store itself sees them
+    registry = JsonAgentStore(json_path)._read_registry()
+    
+    store = SqliteAgentStore(db_path)
+    try:
+        with store._transaction() as conn:
+            # Carry over the JSON store's id high-water mark
+            if registry.next_id > store._next_id(conn):
+                store._set_next_id(conn, registry.next_id)
+        return store.import_agents(registry.agents)
+    finally:
+        store.close()
@@ -0,0 +1,197 @@
+"""
+Batch Runner - Run one agent over a JSONL dataset of prompts
+
+Usage:
+    python -m core.batch agent_001 prompts.jsonl results.jsonl --concurrency 4
+
+Each input line is a JSON object with an 'input' (or 'prompt') string and
+optionally an 'id' and a 'history' list of {'role', 'content'} messages; a
+bare JSON string is also accepted. Results are appended to the output file
+as they finish, one JSON object per prompt. Re-running the same command
+skips prompts that already have a successful result.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+
+from core.agent_manager import get_agent, get_agent_by_name
+from core.groq_integration import get_config
+from core.runner import AgentRunner
+
+
+# Default number of prompts in flight at once
+DEFAULT_CONCURRENCY = 4
+
+# Default retries per prompt after the first attempt
+DEFAULT_RETRIES = 3
+
+
+def load_prompts(path: str) -> List[Dict]:
+    """Read prompts from a JSONL file, giving each an id (its line number by default)"""
+    prompts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {'input': record}
+            text = record.get('input', record.get('prompt'))
+            if not isinstance(text, str):
+                raise ValueError(f"{path}:{line_number}: expected an 'input' string")
+            prompts.append({
+                'id': str(record.get('id', line_number)),
+                'input': text,
+                'history': record.get('history') or [],
+            })
+    return prompts
+
+
+def completed_ids(path: str) -> set:
+    """Ids with a successful result in an existing output file"""
+    done = set()
+    try:
+        f = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return done
+    with f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if isinstance(record, dict) and record.get('error') is None and 'id' in record:
+                done.add(str(record['id']))
+    return done
+
+
+def run_batch(agent: Dict, prompts: Iterable[Dict], output_path: str,
+              concurrency: int = DEFAULT_CONCURRENCY, retries: int = DEFAULT_RETRIES,
+              resume: bool = True, use_cache: bool = False,
+              on_result: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Run an agent over prompts, appending each result to output_path as it finishes.
+    
+    Results are {'id', 'input', 'output', 'error', 'latency_ms'}; 'error'
+    is None on success. Model calls share the process-wide Groq rate
+    limiter, and the runner retries rate limits and transient errors up to
+    retries times with jittered exponential backoff. With resume, prompts
+    that already have a successful result in output_path are skipped.
+    Replies bypass the response cache unless use_cache is set, so every
+    prompt hits the model.
+    
+    Returns counts: {'total', 'skipped', 'succeeded', 'failed'}.
+    """
+    prompts = list(prompts)
+    done = completed_ids(output_path) if resume else set()
+    pending = [prompt for prompt in prompts if prompt['id'] not in done]
+    summary = {'total': len(prompts), 'skipped': len(prompts) - len(pending), 'succeeded': 0, 'failed': 0}
+    
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    write_lock = threading.Lock()
+    # Like RunnerPool checkouts, a runner serves one caller at a time: each
+    # worker thread builds its own, so concurrent prompts never share an Agno agent
+    local = threading.local()
+    
+    def get_worker_runner() -> AgentRunner:
+        runner = getattr(local, 'runner', None)
+        if runner is None:
+            runner = local.runner = AgentRunner(agent)
+            runner.cache_responses = runner.cache_responses and use_cache
+            # The runner's own retries are the only ones; retrying around
+            # them as well would multiply attempts under rate limits
+            runner.max_retries = retries
+        return runner
+    
+    def run_one(prompt: Dict) -> Dict:
+        runner = get_worker_runner()
+        started = time.monotonic()
+        try:
+            output = runner.complete(prompt['input'], prompt['history'])
+            error = None
+        except Exception as e:
+            output = None
+            error = f"{type(e).__name__}: {e}"
+        return {
+            'id': prompt['id'],
+            'input': prompt['input'],
+            'output': output,
+            'error': error,
+            'latency_ms': round((time.monotonic() - started) * 1000),
+        }
+    
+    with open(output_path, 'a', encoding='utf-8') as out:
+        with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as executor:
+            futures = [executor.submit(run_one, prompt) for prompt in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                with write_lock:
+                    out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    out.flush()
+                summary['failed' if result['error'] else 'succeeded'] += 1
+                if on_result is not None:
+                    on_result(result)
+    
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m core.batch",
+        description="Run one agent over a JSONL file of prompts."
+    )
+    parser.add_argument("agent", help="Agent id (or name)")
+    parser.add_argument("prompts", help="Input JSONL file")
+    parser.add_argument("output", help="Output JSONL file; results are appended")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Prompts in flight at once (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES,
+                        help=f"Retries per prompt for rate limits and transient errors (default {DEFAULT_RETRIES})")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="Run every prompt even if the output already has a result for it")
+    parser.add_argument("--use-cache", action="store_true",
+                        help="Allow cached replies instead of calling the model for every prompt")
+    args = parser.parse_args(argv)
+    
+    agent = get_agent(args.agent) or get_agent_by_name(args.agent)
+    if agent is None:
+        print(f"❌ Agent not found: {args.agent}", file=sys.stderr)
+        return 1
+    if not get_config().is_configured():
+        print("❌ GROQ_API_KEY is not set; batch runs need a real model.", file=sys.stderr)
+        return 1
+    
+    prompts = load_prompts(args.prompts)
+    finished = [0]
+    
+    def report(result: Dict):
+        finished[0] += 1
+        status = "✅" if result['error'] is None else f"❌ {result['error']}"
+        print(f"[{finished[0]}] {result['id']} {status} ({result['latency_ms']} ms)", file=sys.stderr)
+    
+    summary = run_batch(
+        agent, prompts, args.output,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        resume=not args.no_resume,
+        use_cache=args.use_cache,
+        on_result=report
+    )
+    print(
+        f"{summary['succeeded']} succeeded, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped of {summary['total']}",
+        file=sys.stderr
+    )
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Chat Context - Token-budgeted sliding window over chat history
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from core.groq_integration import get_context_window
+
+
+# Rough characters per token for English text with Llama-style tokenizers
+CHARS_PER_TOKEN = 4
+
+# Per-message token overhead for role markers and separators
+MESSAGE_TOKEN_OVERHEAD = 4
+
+# Tokens kept free for the model's reply
+RESPONSE_TOKEN_RESERVE = 2048
+
+# Upper bound on history sent per turn, whatever the context window, to
+# keep prompt size, latency and cost in check
+MAX_HISTORY_TOKENS = 8000
+
+# Roles passed back to the model as conversation history
+HISTORY_ROLES = ('user', 'assistant')
+
+# Distinct message contents whose token counts are remembered
+TOKEN_CACHE_SIZE = 4096
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text"""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _content_tokens(content: str) -> int:
+    return estimate_tokens(content) + MESSAGE_TOKEN_OVERHEAD
+
+
+def message_tokens(message: Dict) -> int:
+    """Token count of a chat message.
+    
+    Counts are cached by content rather than stored on the message, so
+    session-state messages stay clean for saving and export, and an edited
+    message is simply counted again.
+    """
+    return _content_tokens(message.get('content') or '')
+
+
+def history_budget(model_name: str, system_prompt: str = "", user_input: str = "") -> int:
+    """Tokens available for history once the prompt, input and reply are accounted for"""
+    available = (
+        get_context_window(model_name)
+        - RESPONSE_TOKEN_RESERVE
+        - estimate_tokens(system_prompt)
+        - estimate_tokens(user_input)
+        - 2 * MESSAGE_TOKEN_OVERHEAD
+    )
+    return max(min(available, MAX_HISTORY_TOKENS), 0)
+
+
+def select_history(chat_history: Optional[List[Dict]], budget: int,
+                   current_input: Optional[str] = None) -> List[Dict]:
+    """Most recent history messages fitting in budget, oldest first.
+    
+    A trailing user message equal to current_input is left out, since the
+    chat UI records the message before running the agent. Messages are
+    dropped oldest first; the window never starts with an assistant reply
+    whose question was dropped.
+    """
+    messages = [
+        message for message in chat_history or []
+        if message.get('role') in HISTORY_ROLES and message.get('content')
+    ]
+    if (current_input is not None and messages and messages[-1]['role'] == 'user'
+            and messages[-1]['content'] == current_input):
+        messages = messages[:-1]
+    
+    selected = []
+    used = 0
+    for message in reversed(messages):
+        tokens = message_tokens(message)
+        if used + tokens > budget:
+            break
+        selected.append(message)
+        used += tokens
+    selected.reverse()
+    
+    while selected and selected[0]['role'] != 'user':
+        selected.pop(0)
+    return selected
@@ -1,40 +1,80 @@
 """
 GroqCloud Integration - Handle model selection and API configuration
 """
-from typing import Optional, Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+import asyncio
+import atexit
+import importlib.util
+import inspect
+import math
 import os
+import random
+import re
+import threading
+import time
+from collections import deque
 
 
-# Available Groq models
+# Available Groq models; rpm/tpm are GroqCloud free-tier requests and tokens
+# per minute, input_price/output_price on-demand USD per million tokens
 AVAILABLE_MODELS = {
     "llama-3.3-70b-versatile": {
         "name": "Llama 3.3 70B",
         "description": "Most capable Llama model, versatile for various tasks",
-        "provider": "Meta"
+        "provider": "Meta",
+        "context_window": 131072,
+        "rpm": 30,
+        "tpm": 12000,
+        "input_price": 0.59,
+        "output_price": 0.79
     },
     "llama-3.1-70b-versatile": {
         "name": "Llama 3.1 70B",
         "description": "Previous generation Llama, still very capable",
-        "provider": "Meta"
+        "provider": "Meta",
+        "context_window": 131072,
+        "rpm": 30,
+        "tpm": 6000,
+        "input_price": 0.59,
+        "output_price": 0.79
     },
     "llama-3.1-8b-instant": {
         "name": "Llama 3.1 8B Instant",
         "description": "Fast and efficient smaller model",
-        "provider": "Meta"
+        "provider": "Meta",
+        "context_window": 131072,
+        "rpm": 30,
+        "tpm": 6000,
+        "input_price": 0.05,
+        "output_price": 0.08
     },
     "mixtral-8x7b-32768": {
         "name": "Mixtral 8x7B",
         "description": "Mixture of experts model with 32k context",
-        "provider": "Mistral"
+        "provider": "Mistral",
+        "context_window": 32768,
+        "rpm": 30,
+        "tpm": 5000,
+        "input_price": 0.24,
+        "output_price": 0.24
     },
     "gemma2-9b-it": {
         "name": "Gemma 2 9B",
         "description": "Google's efficient instruction-tuned model",
-        "provider": "Google"
+        "provider": "Google",
+        "context_window": 8192,
+        "rpm": 30,
+        "tpm": 15000,
+        "input_price": 0.2,
+        "output_price": 0.2
     }
 }
 
 
+# Context window assumed for models missing from AVAILABLE_MODELS
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
 def get_available_models() -> Dict[str, Dict]:
     """Get list of available models"""
     return AVAILABLE_MODELS
@@ -55,6 +95,11 @@ def get_model_info(model_name: str) -> Optional[Dict]:
     return AVAILABLE_MODELS.get(model_name)
 
 
+def get_context_window(model_name: str) -> int:
+    """Get a model's context window in tokens"""
+    return AVAILABLE_MODELS.get(model_name, {}).get('context_window', DEFAULT_CONTEXT_WINDOW)
+
+
 class GroqConfig:
     """Configuration for Groq API"""
     
@@ -106,3 +151,454 @@ def set_model(model: str):
     else:
         _config.model = model
 
+
+# Connection pool shared by every Groq model in the process
+HTTP_POOL_SIZE = int(os.getenv("GROQ_HTTP_POOL_SIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("GROQ_HTTP_TIMEOUT", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("GROQ_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def http2_available() -> bool:
+    """Whether httpx can speak HTTP/2 (needs the h2 package)"""
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_http_client():
+    """Get the process-wide pooled httpx client used for Groq calls.
+    
+    Connections are kept alive between calls, so only the first request
+    to the API pays for the TCP and TLS handshakes.
+    """
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            import httpx
+            _http_client = httpx.Client(
+                http2=http2_available(),
+                limits=httpx.Limits(
+                    max_connections=HTTP_POOL_SIZE,
+                    max_keepalive_connections=HTTP_POOL_SIZE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            )
+            atexit.register(_http_client.close)
+    return _http_client
+
+
+def create_groq_model(model_name: str, for_async: bool = False):
+    """Create an Agno Groq model; sync models send requests over the shared HTTP client.
+    
+    Agno builds an httpx.AsyncClient for async runs and caches it on the
+    model, and that client belongs to the event loop it was first used on.
+    Async callers therefore need a model per event loop, created with
+    for_async so Agno is not handed the sync client.
+    """
+    from agno.models.groq import Groq
+    
+    kwargs: Dict[str, Any] = {'id': model_name}
+    if not for_async and 'http_client' in inspect.signature(Groq).parameters:
+        kwargs['http_client'] = get_http_client()
+    return Groq(**kwargs)
+
+
+# Multiplier applied to the per-model rpm/tpm limits (e.g. 10 on a paid
+# tier); 0 turns client-side rate limiting off
+RATE_LIMIT_SCALE = float(os.getenv("GROQ_RATE_LIMIT_SCALE", "1"))
+
+# Retries for rate-limited or transient failures of one model call
+MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+
+# Backoff before retry n is BACKOFF_BASE * 2**n seconds with jitter, capped
+# at BACKOFF_MAX
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+_RATE_LIMIT_RE = re.compile(r"rate.?limit|too many requests|\b429\b", re.IGNORECASE)
+_TRANSIENT_RE = re.compile(
+    r"timed? ?out|timeout|connection|temporarily|unavailable|overloaded|\b50[0234]\b",
+    re.IGNORECASE
+)
+_RETRY_AFTER_RE = re.compile(r"(?:try again in|retry after)\s*([0-9.]+)\s*(ms|s)?", re.IGNORECASE)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """Whether an error is a provider rate limit"""
+    return _status_code(error) == 429 or bool(_RATE_LIMIT_RE.search(str(error)))
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an error is worth retrying: rate limits, 5xx and network failures"""
+    if is_rate_limited(error):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or bool(_TRANSIENT_RE.search(str(error)))
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the provider asked us to wait, from the retry-after header or message"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    value = headers.get('retry-after') if hasattr(headers, 'get') else None
+    if value is not None:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+    match = _RETRY_AFTER_RE.search(str(error))
+    if match:
+        seconds = float(match.group(1))
+        return seconds / 1000 if (match.group(2) or '').lower() == 'ms' else seconds
+    return None
+
+
+def backoff_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Seconds to wait before retry number attempt (0-based).
+    
+    The provider's retry-after wins; otherwise exponential backoff with
+    jitter in [delay/2, delay] so retrying clients spread out.
+    """
+    if error is not None:
+        requested = retry_after(error)
+        if requested is not None:
+            return requested
+    delay = min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+    return random.uniform(delay / 2, delay)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity.
+    
+    Reservations may overdraw the bucket; the caller is told how long to
+    wait for the debt to be repaid, so waiters are served in arrival order.
+    """
+    
+    def __init__(self, capacity: float, per_second: float, now: Optional[float] = None):
+        self.capacity = capacity
+        self.per_second = per_second
+        self._tokens = capacity
+        self._updated = time.monotonic() if now is None else now
+    
+    def _refill(self, now: float):
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+    
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount tokens and return the seconds until they are covered"""
+        self._refill(now)
+        self._tokens -= min(amount, self.capacity)
+        return max(-self._tokens / self.per_second, 0.0)
+    
+    def adjust(self, amount: float, now: float):
+        """Return (positive) or take (negative) tokens after the fact"""
+        self._refill(now)
+        self._tokens = min(self.capacity, self._tokens + amount)
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds a reservation of amount would wait, without making it"""
+        self._refill(now)
+        return max((min(amount, self.capacity) - self._tokens) / self.per_second, 0.0)
+
+
+class RateLimiter:
+    """Per-model request and token budgets shared by every caller in the process"""
+    
+    def __init__(self, scale: float = RATE_LIMIT_SCALE):
+        self.scale = scale
+        self._buckets: Dict[str, tuple] = {}
+        self._paused_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def _model_buckets(self, model: str) -> Optional[tuple]:
+        buckets = self._buckets.get(model)
+        if buckets is None:
+            info = AVAILABLE_MODELS.get(model, {})
+            if not info.get('rpm') or not info.get('tpm'):
+                return None
+            rpm = info['rpm'] * self.scale
+            tpm = info['tpm'] * self.scale
+            buckets = self._buckets[model] = (TokenBucket(rpm, rpm / 60), TokenBucket(tpm, tpm / 60))
+        return buckets
+    
+    def reserve(self, model: str, tokens: int) -> float:
+        """Reserve one request and tokens for model; returns seconds to wait first"""
+        if self.scale <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            pause = max(self._paused_until.get(model, 0.0) - now, 0.0)
+            buckets = self._model_buckets(model)
+            if buckets is None:
+                return pause
+            requests, token_bucket = buckets
+            return max(pause, requests.reserve(1, now), token_bucket.reserve(tokens, now))
+    
+    def wait_time(self, model: str, tokens: int) -> float:
+        """Seconds a call to model would wait right now, without reserving anything"""
+        if self.scale <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            pause = max(self._paused_until.get(model, 0.0) - now, 0.0)
+            buckets = self._model_buckets(model)
+            if buckets is None:
+                return pause
+            requests, token_bucket = buckets
+            return max(pause, requests.wait_time(1, now), token_bucket.wait_time(tokens, now))
+    
+    def acquire(self, model: str, tokens: int) -> float:
+        """Block until a call may be made; returns the seconds waited"""
+        delay = self.reserve(model, tokens)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+    
+    async def aacquire(self, model: str, tokens: int) -> float:
+        """Async version of acquire()"""
+        delay = self.reserve(model, tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+    
+    def record_usage(self, model: str, reserved: int, used: int):
+        """Correct a token reservation once the real usage is known"""
+        if self.scale <= 0 or not used:
+            return
+        with self._lock:
+            buckets = self._model_buckets(model)
+            if buckets is not None:
+                buckets[1].adjust(reserved - used, time.monotonic())
+    
+    def pause(self, model: str, seconds: float):
+        """Hold back every call to model, e.g. after a 429"""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._paused_until[model] = max(self._paused_until.get(model, 0.0), until)
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get the process-wide rate limiter"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+    return _rate_limiter
+
+
+def _retry_delay(model: str, attempt: int, error: Exception, max_retries: int) -> Optional[float]:
+    """Delay before retrying a failed call, or None to give up"""
+    if attempt >= max_retries or not is_retryable(error):
+        return None
+    delay = backoff_delay(attempt, error)
+    if is_rate_limited(error):
+        # Everyone calling this model backs off, not just this caller
+        get_rate_limiter().pause(model, delay)
+        return 0.0
+    return delay
+
+
+def _backoff(delay: float, cancelled: Optional[threading.Event]) -> bool:
+    """Sleep before a retry; True if cancelled is set first, to give up instead"""
+    if cancelled is None:
+        time.sleep(delay)
+        return False
+    return cancelled.wait(delay)
+
+
+def call_with_retries(model: str, tokens: int, call: Callable[[], Any],
+                      max_retries: int = MAX_RETRIES, cancelled: Optional[threading.Event] = None) -> Any:
+    """Make a rate-limited model call, retrying rate limits and transient errors.
+    
+    Setting cancelled (e.g. once a hedged call has lost) stops further retries.
+    """
+    attempt = 0
+    while True:
+        get_rate_limiter().acquire(model, tokens)
+        try:
+            return call()
+        except Exception as e:
+            delay = _retry_delay(model, attempt, e, max_retries)
+            if delay is None or _backoff(delay, cancelled):
+                raise
+            attempt += 1
+
+
+async def acall_with_retries(model: str, tokens: int, call: Callable[[], Any],
+                             max_retries: int = MAX_RETRIES) -> Any:
+    """Async version of call_with_retries(); call returns an awaitable"""
+    attempt = 0
+    while True:
+        await get_rate_limiter().aacquire(model, tokens)
+        try:
+            return await call()
+        except Exception as e:
+            delay = _retry_delay(model, attempt, e, max_retries)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def stream_with_retries(model: str, tokens: int, start: Callable[[], Iterator],
+                        max_retries: int = MAX_RETRIES, cancelled: Optional[threading.Event] = None) -> Iterator:
+    """Rate-limited stream; retried only if it fails before yielding anything"""
+    attempt = 0
+    while True:
+        get_rate_limiter().acquire(model, tokens)
+        started = False
+        try:
+            for item in start():
+                started = True
+                yield item
+            return
+        except Exception as e:
+            delay = None if started else _retry_delay(model, attempt, e, max_retries)
+            if delay is None or _backoff(delay, cancelled):
+                raise
+            attempt += 1
+
+
+async def astream_with_retries(model: str, tokens: int, start: Callable[[], AsyncIterator],
+                               max_retries: int = MAX_RETRIES) -> AsyncIterator:
+    """Async version of stream_with_retries()"""
+    attempt = 0
+    while True:
+        await get_rate_limiter().aacquire(model, tokens)
+        started = False
+        try:
+            async for item in start():
+                started = True
+                yield item
+            return
+        except Exception as e:
+            delay = None if started else _retry_delay(model, attempt, e, max_retries)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+# Calls remembered per model for latency and error statistics
+HEALTH_WINDOW = 50
+
+# Only calls made within this many seconds count towards a model's statistics
+HEALTH_WINDOW_SECONDS = 300
+
+# Fewer recent calls than this are too few to judge a model by
+MIN_HEALTH_SAMPLES = 5
+
+# Share of recent calls failing at which a model is passed over for its fallbacks
+MAX_ERROR_RATE = 0.5
+
+# p95 latency in seconds above which a model is passed over for its fallbacks
+MAX_P95_SECONDS = float(os.getenv("GROQ_MAX_P95_SECONDS", "30"))
+
+# Rate limit wait in seconds above which a model is passed over for its fallbacks
+MAX_QUEUE_SECONDS = float(os.getenv("GROQ_MAX_QUEUE_SECONDS", "2"))
+
+# Seconds before hedging a call to a model with too few calls to know its p95
+DEFAULT_HEDGE_SECONDS = float(os.getenv("GROQ_HEDGE_SECONDS", "10"))
+
+
+def percentile(ordered: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class ModelHealth:
+    """Rolling latency and error rate of recent calls to each model"""
+    
+    def __init__(self, window: int = HEALTH_WINDOW, window_seconds: float = HEALTH_WINDOW_SECONDS):
+        self.window = window
+        self.window_seconds = window_seconds
+        # model -> deque of (finished at, seconds, succeeded)
+        self._calls: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, model: str, seconds: float, error: Optional[Exception] = None):
+        """Note how long a call took and whether it failed"""
+        with self._lock:
+            calls = self._calls.get(model)
+            if calls is None:
+                calls = self._calls[model] = deque(maxlen=self.window)
+            calls.append((time.monotonic(), seconds, error is None))
+    
+    def stats(self, model: str) -> Dict:
+        """Call count, error rate and latency percentiles over the window.
+        
+        Returns {'calls', 'error_rate', 'p50', 'p95'}; latencies are of
+        successful calls, in seconds, and None when there are none.
+        """
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            calls = [call for call in self._calls.get(model, ()) if call[0] >= cutoff]
+        latencies = sorted(seconds for _, seconds, succeeded in calls if succeeded)
+        failures = len(calls) - len(latencies)
+        return {
+            'calls': len(calls),
+            'error_rate': failures / len(calls) if calls else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+        }
+    
+    def is_degraded(self, model: str) -> bool:
+        """Whether recent calls to model are failing or slow"""
+        stats = self.stats(model)
+        if stats['calls'] < MIN_HEALTH_SAMPLES:
+            return False
+        return stats['error_rate'] >= MAX_ERROR_RATE or (stats['p95'] or 0.0) > MAX_P95_SECONDS
+    
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait on model before hedging with another: its p95 latency"""
+        stats = self.stats(model)
+        if stats['calls'] < MIN_HEALTH_SAMPLES or stats['p95'] is None:
+            return DEFAULT_HEDGE_SECONDS
+        return stats['p95']
+    
+    def clear(self):
+        """Forget every recorded call"""
+        with self._lock:
+            self._calls.clear()
+
+
+_model_health = ModelHealth()
+
+
+def get_model_health() -> ModelHealth:
+    """Get the process-wide model health tracker"""
+    return _model_health
+
+
+def route_models(models: List[str], tokens: int = 0) -> List[str]:
+    """Order a primary model and its fallbacks for a call.
+    
+    Models that are ready keep their declared order and go first; a model
+    is not ready while it would wait more than MAX_QUEUE_SECONDS for its
+    rate limit or its recent calls are failing or slow. The others follow,
+    so a call still has somewhere to go when every model is struggling.
+    """
+    limiter = get_rate_limiter()
+    health = get_model_health()
+    ready = [
+        model for model in models
+        if limiter.wait_time(model, tokens) <= MAX_QUEUE_SECONDS and not health.is_degraded(model)
+    ]
+    return ready + [model for model in models if model not in ready]
@@ -0,0 +1,363 @@
+"""
+Metrics - Per-run latency, token, tool and cost measurements
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.groq_integration import get_model_info, percentile
+
+
+# Runs kept in memory for the Test Agent page
+METRICS_BUFFER_SIZE = 1000
+
+# Also append every run to this JSONL file (e.g. data/run_metrics.jsonl)
+METRICS_FILE = os.getenv("AGENT_MARKET_METRICS_FILE", "")
+
+# Serve Prometheus text metrics at http://localhost:<port>/metrics
+METRICS_PORT = int(os.getenv("AGENT_MARKET_METRICS_PORT", "0"))
+
+# Interface the metrics endpoint listens on; loopback only unless set (e.g.
+# 0.0.0.0 for a scraper on another host)
+METRICS_HOST = os.getenv("AGENT_MARKET_METRICS_HOST", "127.0.0.1")
+
+# Upper bounds, in seconds, of the Prometheus histogram buckets
+HISTOGRAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return None if seconds is None else round(seconds * 1000)
+
+
+def estimate_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> Optional[float]:
+    """On-demand USD price of a run's tokens, or None when unknown"""
+    info = get_model_info(model) or {}
+    if prompt_tokens is None or completion_tokens is None or 'input_price' not in info:
+        return None
+    return (prompt_tokens * info['input_price'] + completion_tokens * info['output_price']) / 1_000_000
+
+
+class RunMetrics:
+    """Measurements of one agent run, filled in as the run progresses.
+    
+    Hedged runs report from several threads, so updates take a lock.
+    """
+    
+    def __init__(self, agent_id: str, agent_name: str, model: str, streamed: bool):
+        self.agent_id = agent_id
+        self.agent_name = agent_name
+        self.model = model
+        self.streamed = streamed
+        self.timestamp = datetime.now().isoformat(timespec='seconds')
+        self.cache_hit: Optional[bool] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        # {'tool': name, 'ms': duration or None}
+        self.tools: List[Dict] = []
+        self._started = time.monotonic()
+        self._queue_wait: Optional[float] = None
+        self._first_token: Optional[float] = None
+        self._tool_starts: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def model_started(self):
+        """Note that a model call got past the rate limit and concurrency cap"""
+        with self._lock:
+            if self._queue_wait is None:
+                self._queue_wait = time.monotonic() - self._started
+    
+    def first_content(self):
+        """Note that the first content was streamed back"""
+        with self._lock:
+            if self._first_token is None:
+                self._first_token = time.monotonic() - self._started
+    
+    def add_usage(self, output: Any):
+        """Add the token counts Agno reports on a run output or completion event"""
+        run_metrics = getattr(output, 'metrics', None)
+        prompt = getattr(run_metrics, 'input_tokens', None)
+        completion = getattr(run_metrics, 'output_tokens', None)
+        with self._lock:
+            if isinstance(prompt, int):
+                self.prompt_tokens = (self.prompt_tokens or 0) + prompt
+            if isinstance(completion, int):
+                self.completion_tokens = (self.completion_tokens or 0) + completion
+    
+    def tool_event(self, event: Dict):
+        """Time a tool call from its runner 'started' and 'completed' events"""
+        now = time.monotonic()
+        with self._lock:
+            starts = self._tool_starts.setdefault(event['tool'], [])
+            if event['status'] == 'started':
+                starts.append(now)
+            else:
+                started = starts.pop(0) if starts else None
+                self.tools.append({'tool': event['tool'], 'ms': None if started is None else _ms(now - started)})
+    
+    def add_tools(self, tools: Optional[Iterable[Any]]):
+        """Add the tool executions of a non-streamed run output"""
+        with self._lock:
+            for tool in tools or []:
+                duration = getattr(getattr(tool, 'metrics', None), 'duration', None)
+                self.tools.append({
+                    'tool': getattr(tool, 'tool_name', None) or 'tool',
+                    'ms': _ms(duration) if isinstance(duration, (int, float)) else None,
+                })
+    
+    def finish(self, error: Optional[Exception] = None) -> Dict:
+        """The finished run as a flat record"""
+        with self._lock:
+            return {
+                'timestamp': self.timestamp,
+                'agent_id': self.agent_id,
+                'agent': self.agent_name,
+                'model': self.model,
+                'streamed': self.streamed,
+                'cache_hit': self.cache_hit,
+                'queue_wait_ms': _ms(self._queue_wait),
+                'ttft_ms': _ms(self._first_token),
+                'latency_ms': _ms(time.monotonic() - self._started),
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'cost_usd': estimate_cost(self.model, self.prompt_tokens, self.completion_tokens),
+                'tool_calls': len(self.tools),
+                'tools': list(self.tools),
+                'error': None if error is None else f"{type(error).__name__}: {error}",
+            }
+
+
+class RingBuffer:
+    """The most recent run records, in memory"""
+    
+    def __init__(self, size: int = METRICS_BUFFER_SIZE):
+        self._records: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def write(self, record: Dict):
+        with self._lock:
+            self._records.append(record)
+    
+    def records(self, agent_id: Optional[str] = None) -> List[Dict]:
+        """Records oldest first, optionally for one agent"""
+        with self._lock:
+            return [record for record in self._records if agent_id is None or record['agent_id'] == agent_id]
+    
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+
+class JsonlSink:
+    """Appends each run record to a JSONL file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def write(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def _labels(labels: tuple) -> str:
+    escaped = (
+        f'{name}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in labels
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class PrometheusSink:
+    """Aggregates run records into Prometheus counters and histograms"""
+    
+    COUNTERS = {
+        'agent_market_runs_total': "Agent runs by outcome",
+        'agent_market_cache_hits_total': "Agent runs answered from the response cache",
+        'agent_market_tokens_total': "Prompt and completion tokens used",
+        'agent_market_cost_usd_total': "Estimated on-demand cost of tokens used",
+        'agent_market_tool_calls_total': "Tool calls made by agents",
+    }
+    HISTOGRAMS = {
+        'agent_market_run_latency_seconds': "Total run latency",
+        'agent_market_time_to_first_token_seconds': "Time to the first streamed content",
+        'agent_market_queue_wait_seconds': "Time waiting for the rate limit and a model call slot",
+        'agent_market_tool_duration_seconds': "Tool call duration",
+    }
+    
+    def __init__(self, buckets: tuple = HISTOGRAM_BUCKETS):
+        self.buckets = buckets
+        # (name, labels) -> value
+        self._counters: Dict[tuple, float] = {}
+        # (name, labels) -> [count per bucket..., sum, count]
+        self._histograms: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    def _inc(self, name: str, labels: tuple, amount: float = 1):
+        self._counters[(name, labels)] = self._counters.get((name, labels), 0) + amount
+    
+    def _observe(self, name: str, labels: tuple, milliseconds: Optional[int]):
+        if milliseconds is None:
+            return
+        seconds = milliseconds / 1000
+        values = self._histograms.get((name, labels))
+        if values is None:
+            values = self._histograms[(name, labels)] = [0] * (len(self.buckets) + 2)
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                values[index] += 1
+        values[-2] += seconds
+        values[-1] += 1
+    
+    def write(self, record: Dict):
+        agent = (('agent', record['agent']),)
+        labels = agent + (('model', record['model']),)
+        with self._lock:
+            self._inc('agent_market_runs_total', labels + (('status', 'error' if record['error'] else 'ok'),))
+            if record['cache_hit']:
+                self._inc('agent_market_cache_hits_total', agent)
+            for kind in ('prompt', 'completion'):
+                if record[f'{kind}_tokens']:
+                    self._inc('agent_market_tokens_total', labels + (('kind', kind),), record[f'{kind}_tokens'])
+            if record['cost_usd']:
+                self._inc('agent_market_cost_usd_total', labels, record['cost_usd'])
+            self._observe('agent_market_run_latency_seconds', agent, record['latency_ms'])
+            self._observe('agent_market_time_to_first_token_seconds', agent, record['ttft_ms'])
+            self._observe('agent_market_queue_wait_seconds', agent, record['queue_wait_ms'])
+            for tool in record['tools']:
+                self._inc('agent_market_tool_calls_total', (('tool', tool['tool']),))
+                self._observe('agent_market_tool_duration_seconds', (('tool', tool['tool']),), tool['ms'])
+    
+    def render(self) -> str:
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, help_text in self.COUNTERS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value:g}")
+            for name, help_text in self.HISTOGRAMS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (metric, labels), values in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, values):
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {values[-1]}")
+                    lines.append(f"{name}_sum{_labels(labels)} {values[-2]:g}")
+                    lines.append(f"{name}_count{_labels(labels)} {values[-1]}")
+        return '\n'.join(lines) + '\n'
+    
+    def serve(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Serve render() at /metrics from a daemon thread, on loopback unless host is given"""
+        sink = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = sink.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+
+def summarize(records: List[Dict]) -> Dict:
+    """Latency percentiles, token totals and tool timings over run records"""
+    def values(field: str) -> List[int]:
+        return sorted(record[field] for record in records if record[field] is not None)
+    
+    latency, ttft, queue_wait = values('latency_ms'), values('ttft_ms'), values('queue_wait_ms')
+    tool_times: Dict[str, List[Optional[int]]] = {}
+    for record in records:
+        for call in record['tools']:
+            tool_times.setdefault(call['tool'], []).append(call['ms'])
+    
+    return {
+        'runs': len(records),
+        'errors': sum(1 for record in records if record['error']),
+        'cache_hits': sum(1 for record in records if record['cache_hit']),
+        'latency_p50_ms': percentile(latency, 50),
+        'latency_p95_ms': percentile(latency, 95),
+        'ttft_p50_ms': percentile(ttft, 50),
+        'ttft_p95_ms': percentile(ttft, 95),
+        'queue_wait_p95_ms': percentile(queue_wait, 95),
+        'prompt_tokens': sum(record['prompt_tokens'] or 0 for record in records),
+        'completion_tokens': sum(record['completion_tokens'] or 0 for record in records),
+        'cost_usd': sum(record['cost_usd'] or 0.0 for record in records),
+        'tools': {
+            tool: {'calls': len(times), 'p50_ms': percentile(sorted(ms for ms in times if ms is not None), 50)}
+            for tool, times in tool_times.items()
+        },
+    }
+
+
+class MetricsRecorder:
+    """Sends finished run records to the ring buffer and any other sinks"""
+    
+    def __init__(self, buffer_size: int = METRICS_BUFFER_SIZE, jsonl_path: Optional[str] = None,
+                 prometheus: bool = False):
+        self.buffer = RingBuffer(buffer_size)
+        self.jsonl = JsonlSink(jsonl_path) if jsonl_path else None
+        self.prometheus = PrometheusSink() if prometheus else None
+    
+    def record(self, record: Dict):
+        """Store one run record; a failing sink never fails the run"""
+        for sink in (self.buffer, self.jsonl, self.prometheus):
+            if sink is None:
+                continue
+            try:
+                sink.write(record)
+            except Exception as e:
+                print(f"Error recording run metrics: {e}")
+    
+    def recent(self, agent_id: Optional[str] = None) -> List[Dict]:
+        """Runs still in the ring buffer, oldest first"""
+        return self.buffer.records(agent_id)
+    
+    def summary(self, agent_id: Optional[str] = None) -> Dict:
+        """summarize() over the runs still in the ring buffer"""
+        return summarize(self.recent(agent_id))
+
+
+# Process-wide recorder, created on first use
+_metrics: Optional[MetricsRecorder] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRecorder:
+    """Get the shared metrics recorder, starting the Prometheus endpoint if configured"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRecorder(jsonl_path=METRICS_FILE or None, prometheus=bool(METRICS_PORT))
+            if METRICS_PORT:
+                try:
+                    _metrics.prometheus.serve(METRICS_PORT, METRICS_HOST)
+                except OSError as e:
+                    print(f"Metrics endpoint unavailable on {METRICS_HOST}:{METRICS_PORT}: {e}")
+    return _metrics
@@ -0,0 +1,182 @@
+"""
+Response Cache - Exact-match cache of agent replies
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+
+# Cache tier: "memory" (default), "sqlite" (memory backed by
+# data/response_cache.db) or "off"
+RESPONSE_CACHE_MODE = os.getenv("AGENT_MARKET_RESPONSE_CACHE", "memory").lower()
+RESPONSE_CACHE_DB_FILE = os.path.join("data", "response_cache.db")
+
+# Seconds a cached reply stays valid
+RESPONSE_CACHE_TTL = int(os.getenv("AGENT_MARKET_RESPONSE_CACHE_TTL", "3600"))
+
+# Replies kept in memory before the least recently used is evicted
+RESPONSE_CACHE_SIZE = 512
+
+# Tools whose answers depend on live data or have side effects (a cached
+# "wrote the file" reply would skip the write); agents using them are not
+# cached unless they opt in with 'cache_responses': True
+VOLATILE_TOOLS = ('WebSearchTool', 'YFinanceTool', 'FileOpsTool')
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    """Collapse whitespace so trivially different inputs share an entry"""
+    return _WHITESPACE_RE.sub(' ', text or '').strip()
+
+
+def caching_enabled(agent_config: Dict) -> bool:
+    """Whether an agent's replies may be cached.
+    
+    An explicit 'cache_responses' setting wins; otherwise agents using a
+    tool from VOLATILE_TOOLS are not cached.
+    """
+    setting = agent_config.get('cache_responses')
+    if setting is not None:
+        return bool(setting)
+    return not any(tool in VOLATILE_TOOLS for tool in agent_config.get('tools', []) or [])
+
+
+def response_cache_key(model: str, system_prompt: str, instructions: List[str], tools: List[str],
+                       history: List[Dict], user_input: str) -> str:
+    """Cache key for a model call; equal keys are guaranteed the same prompt"""
+    payload = {
+        'model': model,
+        'system_prompt': _normalize(system_prompt),
+        'instructions': [_normalize(instruction) for instruction in instructions],
+        'tools': sorted(tools),
+        'history': [[message['role'], _normalize(message['content'])] for message in history],
+        'input': _normalize(user_input),
+    }
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU of replies with a TTL, optionally backed by SQLite.
+    
+    The SQLite tier outlives the process and is shared by every process
+    using the same file; entries found there are promoted to memory.
+    """
+    
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL,
+                 db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached reply, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            
+            if entry is None and self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT response, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[1], row[0])
+                    self._remember(key, entry)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: str, response: str):
+        """Cache a reply"""
+        entry = (time.time() + self.ttl, response)
+        with self._lock:
+            self._remember(key, entry)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, expires_at) VALUES (?, ?, ?)",
+                    (key, response, entry[0])
+                )
+                self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+    
+    def _remember(self, key: str, entry: tuple):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached reply and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': len(self._entries),
+        }
+    
+    def close(self):
+        """Close the SQLite tier, if any"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Process-wide cache, created on first use
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the shared response cache, or None when caching is turned off"""
+    global _response_cache
+    if RESPONSE_CACHE_MODE == "off":
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            db_path = RESPONSE_CACHE_DB_FILE if RESPONSE_CACHE_MODE == "sqlite" else None
+            _response_cache = ResponseCache(db_path=db_path)
+    return _response_cache
@@ -1,12 +1,34 @@
 """
 Agent Runner - Executes agent logic via Agno framework
 """
-from typing import Dict, List, Optional, Any
+import asyncio
+import functools
+import hashlib
+import json
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Any
 from agno.agent import Agent, RunOutput
-from agno.models.groq import Groq
+from agno.models.message import Message
 from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.yfinance import YFinanceTools
-from core.groq_integration import get_config, validate_model
+from core.agent_manager import add_change_listener
+from core.chat_context import estimate_tokens, history_budget, message_tokens, select_history
+from core.metrics import RunMetrics, get_metrics
+from core.response_cache import caching_enabled, get_response_cache, response_cache_key
+from core.semantic_cache import get_semantic_cache
+from core.tool_sandbox import SANDBOXED_TOOLS, ToolLimitExceeded, get_tool_sandbox
+from core.groq_integration import (
+    MAX_RETRIES, acall_with_retries, astream_with_retries, backoff_delay, call_with_retries,
+    create_groq_model, get_config, get_model_health, get_rate_limiter, is_rate_limited, is_retryable,
+    route_models, stream_with_retries, validate_model,
+)
 import os
 
 
@@ -20,6 +42,57 @@ TOOL_REGISTRY = {
 }
 
 
+# Seconds a custom tool call may run before the model is told it timed out
+TOOL_TIMEOUT = float(os.getenv("AGENT_MARKET_TOOL_TIMEOUT", "10"))
+
+# Set to "0" to run CPU-heavy tools in-process, guarded by the timeout only
+TOOL_SANDBOX_ENABLED = os.getenv("AGENT_MARKET_TOOL_SANDBOX", "1") != "0"
+
+# Threads running in-process tool calls; a call that times out keeps its
+# thread until it returns
+_tool_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tool")
+
+
+def tool_limit_result(tool: str, reason: str, message: str, timeout: float) -> str:
+    """Tool result telling the model a call was stopped, as JSON"""
+    return json.dumps({
+        'status': 'stopped',
+        'reason': reason,
+        'tool': tool,
+        'timeout_seconds': timeout,
+        'message': f"{message}. Try a smaller input or a different approach.",
+    })
+
+
+def guard_tool(func: Callable, timeout: float = TOOL_TIMEOUT) -> Callable:
+    """Wrap a custom tool so one pathological call can't stall a run.
+    
+    Tools listed in SANDBOXED_TOOLS run in a worker process with CPU and
+    memory limits; the rest run on a thread. Either way the model gets a
+    tool_limit_result() once timeout seconds pass or memory runs out, and
+    an error message if the call fails.
+    """
+    name = func.__name__
+    sandboxed = TOOL_SANDBOX_ENABLED and name in SANDBOXED_TOOLS
+    
+    @functools.wraps(func)
+    def guarded(*args, **kwargs):
+        try:
+            if sandboxed:
+                return get_tool_sandbox().run(name, args, kwargs, timeout)
+            return _tool_executor.submit(func, *args, **kwargs).result(timeout=timeout)
+        except FutureTimeoutError:
+            return tool_limit_result(name, 'timeout', f"{name} took longer than {timeout:g}s", timeout)
+        except ToolLimitExceeded as e:
+            return tool_limit_result(name, e.reason, str(e), timeout)
+        except MemoryError:
+            return tool_limit_result(name, 'memory_limit', f"{name} ran out of memory", timeout)
+        except Exception as e:
+            return f"❌ Error: {str(e)}"
+    
+    return guarded
+
+
 def get_tool_instances(tool_names: List[str]) -> List[Any]:
     """Get tool instances from names"""
     tools = []
@@ -41,16 +114,172 @@ def get_tool_instances(tool_names: List[str]) -> List[Any]:
         elif tool_name == 'FileOpsTool':
             # File operations - we'll handle through custom function
             from core.tools.file_ops_agno import get_file_ops_tool
-            tools.append(get_file_ops_tool())
+            tools.append(guard_tool(get_file_ops_tool()))
         
         elif tool_name == 'MathTool':
             # Math - we'll handle through custom function
-            from core.tools.math_tool_agno import get_math_tool
-            tools.append(get_math_tool())
+            from core.tools.math_tool_agno import get_math_batch_tool, get_math_tool
+            tools.append(guard_tool(get_math_tool()))
+            # Vectorized batch mode, available when NumPy is installed
+            batch_tool = get_math_batch_tool()
+            if batch_tool is not None:
+                tools.append(guard_tool(batch_tool))
     
     return tools
 
 
+# Maximum model calls in flight at once in this process, across all threads
+# and event loops
+MAX_CONCURRENT_MODEL_CALLS = int(os.getenv("AGENT_MARKET_MAX_MODEL_CALLS", "8"))
+
+
+class ModelCallLimiter:
+    """Process-wide cap on in-flight model calls.
+    
+    Works like a semaphore shared by synchronous callers and coroutines on
+    any event loop: a released slot is handed directly to the longest
+    waiter, so waiting coroutines never hold a thread.
+    """
+    
+    def __init__(self, limit: int = MAX_CONCURRENT_MODEL_CALLS):
+        self.limit = max(limit, 1)
+        self._active = 0
+        self._lock = threading.Lock()
+        # (loop, future) for coroutines, (None, threading.Event) for threads
+        self._waiters: deque = deque()
+    
+    @property
+    def in_flight(self) -> int:
+        return self._active
+    
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+    
+    async def acquire(self):
+        """Wait for a free slot without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            # A slot granted just before cancellation must be passed on;
+            # one still on its way is passed on by _grant
+            if handed_over and future.done() and not future.cancelled():
+                self.release()
+            raise
+    
+    def acquire_blocking(self):
+        """Block the calling thread until a slot is free"""
+        with self._lock:
+            if self._active < self.limit and not self._waiters:
+                self._active += 1
+                return
+            event = threading.Event()
+            self._waiters.append((None, event))
+        event.wait()
+    
+    def release(self):
+        """Free a slot, handing it to the next waiter if there is one"""
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if loop is None:
+                    waiter.set()
+                    return
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._grant, waiter)
+                    return
+            self._active -= 1
+    
+    def _grant(self, future: "asyncio.Future"):
+        if future.done():
+            # The waiter was cancelled while the slot was in transit
+            self.release()
+        else:
+            future.set_result(None)
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of an async block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+    
+    @contextmanager
+    def blocking_slot(self):
+        """Hold a slot for the duration of a synchronous block"""
+        self.acquire_blocking()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+_model_calls = ModelCallLimiter()
+
+
+def get_model_call_limiter() -> ModelCallLimiter:
+    """Get the process-wide model call limiter"""
+    return _model_calls
+
+
+# Completion tokens reserved against the rate limit before a run's real
+# usage is known
+COMPLETION_TOKEN_ESTIMATE = 512
+
+# Reply used when the model returns no content
+EMPTY_RESPONSE = "I apologize, but I couldn't generate a response. Please try again."
+
+# Threads running hedged calls; a call that loses the race finishes here in
+# the background
+_hedge_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_MODEL_CALLS, thread_name_prefix="hedge")
+
+# Marks the end of a hedged stream, with the error that ended it if any
+_STREAM_END = object()
+
+
+def _stream_event(event: Any) -> Optional[Dict]:
+    """Convert an Agno run event into a runner stream event, if it is one we surface"""
+    kind = getattr(event, 'event', None)
+    if kind == 'RunContent':
+        content = getattr(event, 'content', None)
+        if isinstance(content, str) and content:
+            return {'type': 'content', 'content': content}
+    elif kind in ('ToolCallStarted', 'ToolCallCompleted'):
+        return _tool_call_event(event)
+    return None
+
+
+def _tool_call_event(event: Any) -> Dict:
+    """Convert an Agno tool call event into a runner stream event"""
+    tool = getattr(event, 'tool', None)
+    completed = getattr(event, 'event', None) == 'ToolCallCompleted'
+    result = getattr(tool, 'result', None) if completed else None
+    return {
+        'type': 'tool_call',
+        'status': 'completed' if completed else 'started',
+        'tool': getattr(tool, 'tool_name', None) or 'tool',
+        'args': getattr(tool, 'tool_args', None) or {},
+        'result': None if result is None else str(result),
+    }
+
+
 class AgentRunner:
     """Runs an agent with specified configuration using Agno"""
     
@@ -61,11 +290,39 @@ class AgentRunner:
         self.model_name = agent_config.get('model', 'llama-3.3-70b-versatile')
         self.system_prompt = agent_config.get('prompt', 'You are a helpful AI assistant.')
         self.tool_names = agent_config.get('tools', [])
+        self.instructions = self._build_instructions()
+        self.cache_responses = caching_enabled(agent_config)
+        
+        # Models tried, in order, when the primary is slow, failing or rate-limited
+        self.fallback_models = []
+        for model in agent_config.get('fallback_models') or []:
+            if validate_model(model) and model != self.model_name and model not in self.fallback_models:
+                self.fallback_models.append(model)
+        # Start a fallback alongside a primary that is slower than usual
+        self.hedge_requests = bool(agent_config.get('hedge_requests')) and bool(self.fallback_models)
+        # Retries for rate limits and transient errors on the last model tried
+        self.max_retries = MAX_RETRIES
         
         # Initialize Agno agent
         self.agent = None
+        self._fallback_agents: Dict[str, Agent] = {}
+        self._fallback_agents_lock = threading.Lock()
+        # Agents for async runs, per event loop and model (see create_groq_model)
+        self._async_agents: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Agent]]" = (
+            weakref.WeakKeyDictionary()
+        )
         self._init_agent()
     
+    def _build_instructions(self) -> List[str]:
+        """Build the agent's instructions"""
+        instructions = [self.system_prompt]
+        
+        # Add tool-specific instructions
+        if 'SummarizeTool' in self.tool_names:
+            instructions.append("When asked to summarize, provide concise summaries of key points.")
+        
+        return instructions
+    
     def _init_agent(self):
         """Initialize the Agno agent"""
         groq_config = get_config()
@@ -76,54 +333,668 @@ class AgentRunner:
             self.agent = None
             return
         
-        # Get tools
-        tools = get_tool_instances(self.tool_names)
-        
-        # Build instructions
-        instructions = [self.system_prompt]
-        
-        # Add tool-specific instructions
-        if 'SummarizeTool' in self.tool_names:
-            instructions.append("When asked to summarize, provide concise summaries of key points.")
-        
         # Create Agno agent
         try:
-            self.agent = Agent(
-                name=self.name,
-                model=Groq(id=self.model_name),
-                description=self.description,
-                instructions=instructions,
-                tools=tools if tools else None,
-                markdown=True,
-            )
+            self.agent = self._build_agent(self.model_name)
         except Exception as e:
             print(f"Error initializing agent: {e}")
             self.agent = None
     
+    def _build_agent(self, model_name: str, for_async: bool = False) -> Agent:
+        """Build an Agno agent with this agent's tools on the given model"""
+        tools = get_tool_instances(self.tool_names)
+        return Agent(
+            name=self.name,
+            model=create_groq_model(model_name, for_async=for_async),
+            description=self.description,
+            instructions=self.instructions,
+            tools=tools if tools else None,
+            markdown=True,
+        )
+    
+    def _agent_for(self, model_name: str) -> Agent:
+        """The Agno agent for the primary model or a fallback, built on first use"""
+        if model_name == self.model_name:
+            return self.agent
+        with self._fallback_agents_lock:
+            agent = self._fallback_agents.get(model_name)
+            if agent is None:
+                agent = self._fallback_agents[model_name] = self._build_agent(model_name)
+            return agent
+    
+    def _async_agent_for(self, model_name: str) -> Agent:
+        """The Agno agent for async runs of a model on the running event loop"""
+        loop = asyncio.get_running_loop()
+        with self._fallback_agents_lock:
+            agents = self._async_agents.setdefault(loop, {})
+            agent = agents.get(model_name)
+            if agent is None:
+                agent = agents[model_name] = self._build_agent(model_name, for_async=True)
+            return agent
+    
     def run(self, user_input: str, chat_history: Optional[List[Dict]] = None) -> str:
         """Run the agent with user input"""
         
         try:
-            # Check if API key is configured
-            groq_config = get_config()
-            if not groq_config.is_configured() or self.agent is None:
-                return self._demo_mode_response(user_input)
+            return self.complete(user_input, chat_history)
+        
+        except Exception as e:
+            return self._error_response(e)
+    
+    def complete(self, user_input: str, chat_history: Optional[List[Dict]] = None) -> str:
+        """Run the agent like run(), but let model errors propagate.
+        
+        For callers that retry or record failures themselves, such as
+        batch evaluation.
+        """
+        # Check if API key is configured
+        groq_config = get_config()
+        if not groq_config.is_configured() or self.agent is None:
+            return self._demo_mode_response(user_input)
+        
+        with self._measure(streamed=False) as metrics:
+            # Run the agent with the recent conversation
+            request = self._prepare(user_input, chat_history, metrics)
+            cached = self._cached_response(request)
+            if cached is not None:
+                return cached
             
-            # Run the agent
-            response: RunOutput = self.agent.run(user_input, stream=False)
+            models = self._route(request)
+            if self.hedge_requests and len(models) > 1:
+                response = self._call_hedged(request, models)
+            else:
+                response = self._call_routed(request, models)
             
             # Extract the content from response
             if response and response.content:
+                self._cache_response(request, response.content)
                 return response.content
             else:
-                return "I apologize, but I couldn't generate a response. Please try again."
+                return EMPTY_RESPONSE
+    
+    def run_stream(self, user_input: str, chat_history: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        """Run the agent, yielding events as the response is generated.
+        
+        Yields {'type': 'content', 'content': str} for each content delta and
+        {'type': 'tool_call', 'status': 'started' | 'completed', 'tool': str,
+        'args': dict, 'result': str or None} around each tool call. Demo
+        mode and errors are yielded as a single content event.
+        """
+        try:
+            # Check if API key is configured
+            groq_config = get_config()
+            if not groq_config.is_configured() or self.agent is None:
+                yield {'type': 'content', 'content': self._demo_mode_response(user_input)}
+                return
+            
+            with self._measure(streamed=True) as metrics:
+                request = self._prepare(user_input, chat_history, metrics)
+                cached = self._cached_response(request)
+                if cached is not None:
+                    metrics.first_content()
+                    yield {'type': 'content', 'content': cached}
+                    return
+                
+                chunks = []
+                models = self._route(request)
+                if self.hedge_requests and len(models) > 1:
+                    events = self._stream_hedged(request, models)
+                else:
+                    events = self._stream_routed(request, models)
+                for converted in events:
+                    if converted['type'] == 'content':
+                        chunks.append(converted['content'])
+                    yield converted
+                
+                if chunks:
+                    self._cache_response(request, ''.join(chunks))
+                else:
+                    yield {'type': 'content', 'content': EMPTY_RESPONSE}
         
         except Exception as e:
-            error_msg = str(e)
-            if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
-                return f"❌ **API Key Error**\n\nPlease check your GroqCloud API key.\n\nError: {error_msg}"
+            yield {'type': 'content', 'content': self._error_response(e)}
+    
+    async def arun(self, user_input: str, chat_history: Optional[List[Dict]] = None) -> str:
+        """Async version of run(); waits for a model call slot without holding a thread"""
+        try:
+            # Check if API key is configured
+            groq_config = get_config()
+            if not groq_config.is_configured() or self.agent is None:
+                return self._demo_mode_response(user_input)
+            
+            with self._measure(streamed=False) as metrics:
+                request = self._prepare(user_input, chat_history, metrics)
+                cached = self._cached_response(request)
+                if cached is not None:
+                    return cached
+                
+                models = self._route(request)
+                if self.hedge_requests and len(models) > 1:
+                    response = await self._acall_hedged(request, models)
+                else:
+                    response = await self._acall_routed(request, models)
+                
+                if response and response.content:
+                    self._cache_response(request, response.content)
+                    return response.content
+                else:
+                    return EMPTY_RESPONSE
+        
+        except Exception as e:
+            return self._error_response(e)
+    
+    async def arun_stream(self, user_input: str,
+                          chat_history: Optional[List[Dict]] = None) -> AsyncIterator[Dict]:
+        """Async version of run_stream(), yielding the same events"""
+        try:
+            # Check if API key is configured
+            groq_config = get_config()
+            if not groq_config.is_configured() or self.agent is None:
+                yield {'type': 'content', 'content': self._demo_mode_response(user_input)}
+                return
+            
+            with self._measure(streamed=True) as metrics:
+                request = self._prepare(user_input, chat_history, metrics)
+                cached = self._cached_response(request)
+                if cached is not None:
+                    metrics.first_content()
+                    yield {'type': 'content', 'content': cached}
+                    return
+                
+                chunks = []
+                models = self._route(request)
+                if self.hedge_requests and len(models) > 1:
+                    events = self._astream_hedged(request, models)
+                else:
+                    events = self._astream_routed(request, models)
+                async for converted in events:
+                    if converted['type'] == 'content':
+                        chunks.append(converted['content'])
+                    yield converted
+                
+                if chunks:
+                    self._cache_response(request, ''.join(chunks))
+                else:
+                    yield {'type': 'content', 'content': EMPTY_RESPONSE}
+        
+        except Exception as e:
+            yield {'type': 'content', 'content': self._error_response(e)}
+    
+    @contextmanager
+    def _measure(self, streamed: bool) -> Iterator[RunMetrics]:
+        """Measure one run and hand the record to the metrics sinks when it ends"""
+        metrics = RunMetrics(self.config.get('id') or self.name, self.name, self.model_name, streamed)
+        error = None
+        try:
+            yield metrics
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            get_metrics().record(metrics.finish(error))
+    
+    def _prepare(self, user_input: str, chat_history: Optional[List[Dict]], metrics: RunMetrics) -> Dict:
+        """Work out what to send for one run.
+        
+        Returns {'input': the user message preceded by as much history as
+        fits the token budget, 'cache': response cache reference or None
+        when this agent is not cached, 'tokens': estimated prompt plus
+        completion tokens, reserved against the model's rate limit,
+        'metrics': the run's RunMetrics}.
+        """
+        # Leave room for the smallest context window a fallback may need
+        budget = min(
+            history_budget(model, self.system_prompt, user_input)
+            for model in [self.model_name] + self.fallback_models
+        )
+        history = select_history(chat_history, budget, current_input=user_input)
+        
+        cache_ref = None
+        if self.cache_responses:
+            cache_ref = {
+                'key': response_cache_key(
+                    self.model_name, self.system_prompt, self.instructions,
+                    self.tool_names, history, user_input
+                ),
+                # Paraphrases are only matched at the start of a conversation,
+                # where the question alone determines the answer
+                'scope': None if history else response_cache_key(
+                    self.model_name, self.system_prompt, self.instructions,
+                    self.tool_names, [], ''
+                ),
+                'text': user_input,
+            }
+        
+        tokens = (
+            sum(message_tokens(message) for message in history)
+            + estimate_tokens(user_input)
+            + sum(estimate_tokens(instruction) for instruction in self.instructions)
+            + COMPLETION_TOKEN_ESTIMATE
+        )
+        
+        run_input: Any = user_input
+        if history:
+            run_input = [Message(role=message['role'], content=message['content']) for message in history]
+            run_input.append(Message(role='user', content=user_input))
+        return {'input': run_input, 'cache': cache_ref, 'tokens': tokens, 'metrics': metrics}
+    
+    def _route(self, request: Dict) -> List[str]:
+        """Models to try for a run, best first"""
+        if not self.fallback_models:
+            return [self.model_name]
+        return route_models([self.model_name] + self.fallback_models, request['tokens'])
+    
+    def _retries(self, index: int, models: List[str]) -> int:
+        """Retries on one model; only the last one retries, the rest fail over"""
+        return self.max_retries if index == len(models) - 1 else 0
+    
+    @staticmethod
+    def _fails_over(error: Exception, index: int, models: List[str]) -> bool:
+        """Whether a failed model should be given up for the next one"""
+        return index < len(models) - 1 and is_retryable(error)
+    
+    def _record_failure(self, model: str, started: float, error: Exception):
+        """Count a failed call against model, holding it back if it was rate-limited"""
+        get_model_health().record(model, time.monotonic() - started, error)
+        if is_rate_limited(error):
+            get_rate_limiter().pause(model, backoff_delay(0, error))
+    
+    def _call(self, model: str, request: Dict, max_retries: int = MAX_RETRIES,
+              agent: Optional[Agent] = None, cancelled: Optional[threading.Event] = None) -> RunOutput:
+        """One non-streaming run on model, recording its latency and outcome.
+        
+        Runs on the runner's own agent for model unless one is given.
+        """
+        if agent is None:
+            agent = self._agent_for(model)
+        
+        def call():
+            with get_model_call_limiter().blocking_slot():
+                request['metrics'].model_started()
+                return agent.run(request['input'], stream=False)
+        
+        started = time.monotonic()
+        try:
+            response = call_with_retries(model, request['tokens'], call, max_retries, cancelled)
+        except Exception as e:
+            self._record_failure(model, started, e)
+            raise
+        get_model_health().record(model, time.monotonic() - started)
+        self._record_usage(model, request, response)
+        request['metrics'].model = model
+        request['metrics'].add_tools(getattr(response, 'tools', None))
+        return response
+    
+    async def _acall(self, model: str, request: Dict, max_retries: int = MAX_RETRIES) -> RunOutput:
+        """Async version of _call()"""
+        agent = self._async_agent_for(model)
+        
+        async def call():
+            async with get_model_call_limiter().slot():
+                request['metrics'].model_started()
+                return await agent.arun(request['input'], stream=False)
+        
+        started = time.monotonic()
+        try:
+            response = await acall_with_retries(model, request['tokens'], call, max_retries)
+        except Exception as e:
+            self._record_failure(model, started, e)
+            raise
+        get_model_health().record(model, time.monotonic() - started)
+        self._record_usage(model, request, response)
+        request['metrics'].model = model
+        request['metrics'].add_tools(getattr(response, 'tools', None))
+        return response
+    
+    def _call_routed(self, request: Dict, models: List[str]) -> RunOutput:
+        """Try models in turn, moving on when one is rate-limited or fails transiently"""
+        for index, model in enumerate(models):
+            try:
+                response = self._call(model, request, self._retries(index, models))
+                request['answered_by'] = model
+                return response
+            except Exception as e:
+                if not self._fails_over(e, index, models):
+                    raise
+    
+    async def _acall_routed(self, request: Dict, models: List[str]) -> RunOutput:
+        """Async version of _call_routed()"""
+        for index, model in enumerate(models):
+            try:
+                response = await self._acall(model, request, self._retries(index, models))
+                request['answered_by'] = model
+                return response
+            except Exception as e:
+                if not self._fails_over(e, index, models):
+                    raise
+    
+    def _call_hedged(self, request: Dict, models: List[str]) -> RunOutput:
+        """Race models for a run; the first success wins.
+        
+        The next model is started whenever the newest one has run longer
+        than its p95 latency or a call has failed. Each call gets an agent
+        of its own, since a losing call keeps running after this returns and
+        the runner may by then be serving another session; losers stop
+        retrying once the race is over.
+        """
+        pending = set()
+        model_of = {}
+        error = None
+        cancelled = threading.Event()
+        try:
+            for index, model in enumerate(models):
+                future = _hedge_executor.submit(self._call, model, request, self._retries(index, models),
+                                                self._build_agent(model), cancelled)
+                model_of[future] = model
+                pending.add(future)
+                hedge_after = get_model_health().hedge_delay(model) if index < len(models) - 1 else None
+                while pending:
+                    done, pending = wait(pending, timeout=hedge_after, return_when=FIRST_COMPLETED)
+                    if not done:
+                        break
+                    for future in done:
+                        if future.exception() is None:
+                            request['answered_by'] = model_of[future]
+                            return future.result()
+                        error = future.exception()
+                        if not is_retryable(error):
+                            raise error
+                    if index < len(models) - 1:
+                        break
+            raise error
+        finally:
+            cancelled.set()
+    
+    async def _acall_hedged(self, request: Dict, models: List[str]) -> RunOutput:
+        """Async version of _call_hedged(); calls that lose the race are cancelled"""
+        pending = set()
+        model_of = {}
+        error = None
+        try:
+            for index, model in enumerate(models):
+                task = asyncio.ensure_future(self._acall(model, request, self._retries(index, models)))
+                model_of[task] = model
+                pending.add(task)
+                hedge_after = get_model_health().hedge_delay(model) if index < len(models) - 1 else None
+                while pending:
+                    done, pending = await asyncio.wait(pending, timeout=hedge_after,
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break
+                    for task in done:
+                        if task.exception() is None:
+                            request['answered_by'] = model_of[task]
+                            return task.result()
+                        error = task.exception()
+                        if not is_retryable(error):
+                            raise error
+                    if index < len(models) - 1:
+                        break
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            # Let losers unwind before the runner can serve another session
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    def _stream(self, model: str, request: Dict, max_retries: int = MAX_RETRIES,
+                agent: Optional[Agent] = None, cancelled: Optional[threading.Event] = None) -> Iterator:
+        """Rate-limited Agno event stream from model"""
+        if agent is None:
+            agent = self._agent_for(model)
+        
+        def start():
+            with get_model_call_limiter().blocking_slot():
+                request['metrics'].model_started()
+                yield from agent.run(request['input'], stream=True, stream_intermediate_steps=True)
+        
+        return stream_with_retries(model, request['tokens'], start, max_retries, cancelled)
+    
+    def _astream(self, model: str, request: Dict, max_retries: int = MAX_RETRIES) -> AsyncIterator:
+        """Async version of _stream()"""
+        agent = self._async_agent_for(model)
+        
+        async def start():
+            async with get_model_call_limiter().slot():
+                request['metrics'].model_started()
+                async for event in agent.arun(request['input'], stream=True, stream_intermediate_steps=True):
+                    yield event
+        
+        return astream_with_retries(model, request['tokens'], start, max_retries)
+    
+    def _stream_routed(self, request: Dict, models: List[str]) -> Iterator[Dict]:
+        """Stream from models in turn, failing over only until an event is shown"""
+        shown = False
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            try:
+                for event in self._stream(model, request, self._retries(index, models)):
+                    converted = self._handle_event(model, request, event)
+                    if converted is not None:
+                        shown = True
+                        yield converted
+            except Exception as e:
+                self._record_failure(model, started, e)
+                # Fail over only while nothing has been shown yet
+                if shown or not self._fails_over(e, index, models):
+                    raise
+                continue
+            get_model_health().record(model, time.monotonic() - started)
+            request['metrics'].model = request['answered_by'] = model
+            return
+    
+    async def _astream_routed(self, request: Dict, models: List[str]) -> AsyncIterator[Dict]:
+        """Async version of _stream_routed()"""
+        shown = False
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            try:
+                async for event in self._astream(model, request, self._retries(index, models)):
+                    converted = self._handle_event(model, request, event)
+                    if converted is not None:
+                        shown = True
+                        yield converted
+            except Exception as e:
+                self._record_failure(model, started, e)
+                if shown or not self._fails_over(e, index, models):
+                    raise
+                continue
+            get_model_health().record(model, time.monotonic() - started)
+            request['metrics'].model = request['answered_by'] = model
+            return
+    
+    def _stream_hedged(self, request: Dict, models: List[str]) -> Iterator[Dict]:
+        """Race model streams to their first event, then follow the winner.
+        
+        As in _call_hedged(), the next model is started whenever the newest
+        one has gone longer than its p95 latency without an event or a
+        stream has failed, and each stream runs on an agent of its own.
+        Streams that lose stop at their next event.
+        """
+        events = queue.Queue()
+        started = []
+        running = set()
+        abandoned = set()
+        cancelled = threading.Event()
+        
+        def pump(index: int, stream: Iterator):
+            try:
+                for event in stream:
+                    if index in abandoned:
+                        return
+                    events.put((index, event, None))
+            except Exception as e:
+                events.put((index, _STREAM_END, e))
+                return
+            finally:
+                stream.close()
+            events.put((index, _STREAM_END, None))
+        
+        def start_next():
+            index = len(started)
+            model = models[index]
+            stream = self._stream(model, request, self._retries(index, models), self._build_agent(model), cancelled)
+            started.append(time.monotonic())
+            running.add(index)
+            threading.Thread(target=pump, args=(index, stream), name="stream-hedge", daemon=True).start()
+        
+        try:
+            start_next()
+            while True:
+                can_hedge = len(started) < len(models)
+                hedge_after = get_model_health().hedge_delay(models[len(started) - 1]) if can_hedge else None
+                try:
+                    index, event, error = events.get(timeout=hedge_after)
+                except queue.Empty:
+                    start_next()
+                    continue
+                if error is None:
+                    break
+                running.discard(index)
+                self._record_failure(models[index], started[index], error)
+                if not is_retryable(error) or not (running or can_hedge):
+                    raise error
+                if not running:
+                    start_next()
+            
+            winner, model = index, models[index]
+            abandoned.update(running - {winner})
+            cancelled.set()
+            request['metrics'].model = request['answered_by'] = model
+            while event is not _STREAM_END:
+                converted = self._handle_event(model, request, event)
+                if converted is not None:
+                    yield converted
+                index, event, error = events.get()
+                while index != winner:
+                    index, event, error = events.get()
+            if error is not None:
+                self._record_failure(model, started[winner], error)
+                raise error
+            get_model_health().record(model, time.monotonic() - started[winner])
+        finally:
+            abandoned.update(range(len(started)))
+            cancelled.set()
+    
+    async def _astream_hedged(self, request: Dict, models: List[str]) -> AsyncIterator[Dict]:
+        """Async version of _stream_hedged(); streams that lose are cancelled"""
+        events = asyncio.Queue()
+        started = []
+        tasks = []
+        running = set()
+        
+        async def pump(index: int):
+            try:
+                async for event in self._astream(models[index], request, self._retries(index, models)):
+                    await events.put((index, event, None))
+            except Exception as e:
+                await events.put((index, _STREAM_END, e))
+                return
+            await events.put((index, _STREAM_END, None))
+        
+        def start_next():
+            index = len(started)
+            started.append(time.monotonic())
+            running.add(index)
+            tasks.append(asyncio.ensure_future(pump(index)))
+        
+        try:
+            start_next()
+            while True:
+                can_hedge = len(started) < len(models)
+                hedge_after = get_model_health().hedge_delay(models[len(started) - 1]) if can_hedge else None
+                try:
+                    index, event, error = await asyncio.wait_for(events.get(), hedge_after)
+                except asyncio.TimeoutError:
+                    start_next()
+                    continue
+                if error is None:
+                    break
+                running.discard(index)
+                self._record_failure(models[index], started[index], error)
+                if not is_retryable(error) or not (running or can_hedge):
+                    raise error
+                if not running:
+                    start_next()
+            
+            winner, model = index, models[index]
+            for loser, task in enumerate(tasks):
+                if loser != winner:
+                    task.cancel()
+            request['metrics'].model = request['answered_by'] = model
+            while event is not _STREAM_END:
+                converted = self._handle_event(model, request, event)
+                if converted is not None:
+                    yield converted
+                index, event, error = await events.get()
+                while index != winner:
+                    index, event, error = await events.get()
+            if error is not None:
+                self._record_failure(model, started[winner], error)
+                raise error
+            get_model_health().record(model, time.monotonic() - started[winner])
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _handle_event(self, model: str, request: Dict, event: Any) -> Optional[Dict]:
+        """Convert a streamed Agno event, noting token usage when the run completes"""
+        if getattr(event, 'event', None) == 'RunCompleted':
+            self._record_usage(model, request, event)
+        converted = _stream_event(event)
+        if converted is not None:
+            if converted['type'] == 'content':
+                request['metrics'].first_content()
             else:
-                return f"❌ **Error**: {error_msg}\n\n💡 Make sure your GROQ_API_KEY is valid."
+                request['metrics'].tool_event(converted)
+        return converted
+    
+    def _record_usage(self, model: str, request: Dict, output: Any):
+        """Settle the rate limit reservation with the tokens the run really used"""
+        request['metrics'].add_usage(output)
+        used = getattr(getattr(output, 'metrics', None), 'total_tokens', None)
+        if isinstance(used, int) and used > 0:
+            get_rate_limiter().record_usage(model, request['tokens'], used)
+    
+    def _cached_response(self, request: Dict) -> Optional[str]:
+        """Look up an exact match, then a paraphrase when the semantic cache is on"""
+        cache_ref = request['cache']
+        if cache_ref is None:
+            return None
+        
+        cached = None
+        cache = get_response_cache()
+        if cache is not None:
+            cached = cache.get(cache_ref['key'])
+        
+        semantic_cache = get_semantic_cache()
+        if cached is None and semantic_cache is not None and cache_ref['scope'] is not None:
+            cached = semantic_cache.get(cache_ref['scope'], cache_ref['text'])
+        request['metrics'].cache_hit = cached is not None
+        return cached
+    
+    def _cache_response(self, request: Dict, response: str):
+        """Store a reply; replies from a fallback model are not cached under the primary's key"""
+        cache_ref = request['cache']
+        if cache_ref is None or request.get('answered_by') != self.model_name:
+            return
+        
+        cache = get_response_cache()
+        if cache is not None:
+            cache.put(cache_ref['key'], response)
+        
+        semantic_cache = get_semantic_cache()
+        if semantic_cache is not None and cache_ref['scope'] is not None:
+            semantic_cache.put(cache_ref['scope'], cache_ref['text'], response)
+    
+    def _error_response(self, error: Exception) -> str:
+        """Format a run failure as a chat message"""
+        error_msg = str(error)
+        if "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
+            return f"❌ **API Key Error**\n\nPlease check your GroqCloud API key.\n\nError: {error_msg}"
+        else:
+            return f"❌ **Error**: {error_msg}\n\n💡 Make sure your GROQ_API_KEY is valid."
     
     def _demo_mode_response(self, user_input: str) -> str:
         """Generate demo response when no API key"""
@@ -161,13 +1032,13 @@ To get actual AI responses powered by GroqCloud:
 
 ### What This Agent Can Do (With API Key):
 """
-        
+
         if 'WebSearchTool' in self.tool_names:
             response += "\n🔍 **Web Search**: Search DuckDuckGo for current information"
         if 'SummarizeTool' in self.tool_names:
             response += "\n📝 **Summarize**: Condense long texts into key points"
         if 'FileOpsTool' in self.tool_names:
-            response += "\n📁 **File Operations**: Read and write files safely"
+            response += "\n📁 **File Operations**: Read, page through and write files safely"
         if 'MathTool' in self.tool_names:
             response += "\n🧮 **Calculator**: Perform complex mathematical calculations"
         if 'YFinanceTool' in self.tool_names:
@@ -191,3 +1062,122 @@ To get actual AI responses powered by GroqCloud:
 {self.system_prompt}
 """
         return info
+
+
+# Maximum number of initialized runners kept for reuse
+RUNNER_POOL_SIZE = 32
+
+
+def config_hash(agent_config: Dict) -> str:
+    """Stable hash of an agent configuration"""
+    encoded = json.dumps(agent_config, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class RunnerPool:
+    """LRU cache of initialized AgentRunners, checked out one caller at a time.
+    
+    Runners are keyed by agent id, configuration hash and API key, so an
+    edited agent or a newly entered key gets a fresh runner while repeated
+    chat turns reuse the tools, model client and Agno agent already built.
+    A checked-out runner is never handed to anyone else until it is
+    returned, so concurrent sessions never share an Agno agent; when every
+    runner for a key is busy another one is built.
+    """
+    
+    def __init__(self, max_size: int = RUNNER_POOL_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Idle runners per key, least recently used key first
+        self._idle: "OrderedDict[tuple, List[AgentRunner]]" = OrderedDict()
+        # Checked-out runners by id(); invalidate() drops entries so the
+        # runner is discarded rather than returned
+        self._busy: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return sum(len(runners) for runners in self._idle.values())
+    
+    def _key(self, agent_config: Dict) -> tuple:
+        api_key = get_config().api_key or ''
+        return (
+            agent_config.get('id') or agent_config.get('name'),
+            config_hash(agent_config),
+            hashlib.sha256(api_key.encode('utf-8')).hexdigest(),
+        )
+    
+    def acquire(self, agent_config: Dict) -> AgentRunner:
+        """Take an idle runner for an agent, building one if none is free"""
+        key = self._key(agent_config)
+        with self._lock:
+            runners = self._idle.get(key)
+            if runners:
+                runner = runners.pop()
+                if not runners:
+                    del self._idle[key]
+                self._busy[id(runner)] = key
+                self.hits += 1
+                return runner
+            self.misses += 1
+        
+        # Build outside the lock; tool and model setup can be slow
+        runner = AgentRunner(agent_config)
+        with self._lock:
+            self._busy[id(runner)] = key
+        return runner
+    
+    def release(self, runner: AgentRunner):
+        """Return a runner taken with acquire()"""
+        with self._lock:
+            key = self._busy.pop(id(runner), None)
+            if key is None:
+                return
+            self._idle.setdefault(key, []).append(runner)
+            self._idle.move_to_end(key)
+            while len(self) > self.max_size:
+                oldest, runners = next(iter(self._idle.items()))
+                runners.pop(0)
+                if not runners:
+                    del self._idle[oldest]
+    
+    @contextmanager
+    def checkout(self, agent_config: Dict):
+        """Use a runner exclusively for the duration of the block"""
+        runner = self.acquire(agent_config)
+        try:
+            yield runner
+        finally:
+            self.release(runner)
+    
+    def invalidate(self, agent_id: Optional[str] = None):
+        """Drop runners for one agent, or all runners when agent_id is None"""
+        with self._lock:
+            if agent_id is None:
+                self._idle.clear()
+                self._busy.clear()
+                return
+            for key in [key for key in self._idle if key[0] == agent_id]:
+                del self._idle[key]
+            for runner_id in [runner_id for runner_id, key in self._busy.items() if key[0] == agent_id]:
+                del self._busy[runner_id]
+
+
+# Process-wide pool, emptied of an agent's runners whenever it changes
+_runner_pool: Optional[RunnerPool] = None
+_runner_pool_lock = threading.Lock()
+
+
+def get_runner_pool() -> RunnerPool:
+    """Get or create the shared runner pool"""
+    global _runner_pool
+    with _runner_pool_lock:
+        if _runner_pool is None:
+            _runner_pool = RunnerPool()
+            add_change_listener(_runner_pool.invalidate)
+    return _runner_pool
+
+
+def checkout_runner(agent_config: Dict):
+    """Context manager lending a pooled runner to one caller at a time"""
+    return get_runner_pool().checkout(agent_config)
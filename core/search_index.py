@@ -0,0 +1,266 @@
+"""
+Search Index - Tokenized inverted index for marketplace search
+"""
+import heapq
+import re
+from bisect import bisect_left
+from typing import Dict, Hashable, List, Optional, Set
+
+
+# Relative weight of a token match in each searchable field
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'tools': 2.0,
+    'author': 2.0,
+    'description': 1.0,
+}
+
+# Exact token matches outrank prefix matches
+EXACT_MATCH_BOOST = 2.0
+
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase search tokens.
+    
+    CamelCase words are indexed both whole and by part, so 'WebSearchTool'
+    is found by 'websearchtool', 'search' and 'tool'.
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text or ''):
+        lowered = word.lower()
+        tokens.append(lowered)
+        parts = _CAMEL_RE.findall(word)
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+    return tokens
+
+
+def agent_field_tokens(agent: Dict) -> Dict[str, List[str]]:
+    """Tokens for each searchable field of an agent"""
+    return {
+        'name': tokenize(agent.get('name', '')),
+        'tools': tokenize(' '.join(agent.get('tools', []) or [])),
+        'author': tokenize(agent.get('author', '')),
+        'description': tokenize(agent.get('description', '')),
+    }
+
+
+class SearchIndex:
+    """Inverted index from token to weighted postings, updated incrementally.
+    
+    Keys are opaque document handles supplied by the caller; ties in score
+    are broken by the order in which keys were first added.
+    """
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, float]] = {}
+        self._doc_tokens: Dict[Hashable, Dict[str, float]] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._next_order = 0
+        # Sorted vocabulary for prefix lookups, rebuilt lazily after changes
+        self._vocabulary: Optional[List[str]] = None
+    
+    def __len__(self) -> int:
+        return len(self._doc_tokens)
+    
+    def add(self, key: Hashable, agent: Dict):
+        """Index an agent under key, replacing any previous entry"""
+        if key in self._doc_tokens:
+            self.remove(key)
+        if key not in self._order:
+            self._order[key] = self._next_order
+            self._next_order += 1
+        
+        weights: Dict[str, float] = {}
+        for field, tokens in agent_field_tokens(agent).items():
+            for token in tokens:
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+        
+        self._doc_tokens[key] = weights
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._vocabulary = None
+            postings[key] = weight
+    
+    def remove(self, key: Hashable, forget_order: bool = False):
+        """Remove key from the index"""
+        weights = self._doc_tokens.pop(key, None)
+        if forget_order:
+            self._order.pop(key, None)
+        if weights is None:
+            return
+        for token in weights:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary = None
+    
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        start = bisect_left(vocabulary, prefix)
+        end = start
+        while end < len(vocabulary) and vocabulary[end].startswith(prefix):
+            end += 1
+        return vocabulary[start:end]
+    
+    def score(self, query: str) -> Optional[Dict[Hashable, float]]:
+        """Score keys matching every query token (by prefix).
+        
+        Returns None when the query has no tokens, meaning "no text filter".
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return None
+        
+        scores: Optional[Dict[Hashable, float]] = None
+        for query_token in query_tokens:
+            token_scores: Dict[Hashable, float] = {}
+            for token in self._prefix_tokens(query_token):
+                boost = EXACT_MATCH_BOOST if token == query_token else 1.0
+                postings = self._postings[token]
+                if not token_scores:
+                    token_scores = {key: weight * boost for key, weight in postings.items()}
+                    continue
+                for key, weight in postings.items():
+                    weight *= boost
+                    if weight > token_scores.get(key, 0.0):
+                        token_scores[key] = weight
+            
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {
+                    key: total + token_scores[key]
+                    for key, total in scores.items()
+                    if key in token_scores
+                }
+            if not scores:
+                break
+        
+        return scores
+    
+    def in_order(self, keys) -> List[Hashable]:
+        """Sort keys by insertion order"""
+        order = self._order
+        return sorted(keys, key=lambda key: order.get(key, 0))
+    
+    def rank(self, scores: Dict[Hashable, float], top: Optional[int] = None) -> List[Hashable]:
+        """Order scored keys by descending score, then insertion order.
+        
+        With top set, only the best `top` keys are selected, which avoids a
+        full sort when a page of a large result set is requested.
+        """
+        order = self._order
+        # Insertion order is unique, so keys themselves are never compared
+        entries = [(-score, order.get(key, 0), key) for key, score in scores.items()]
+        if top is not None and top < len(entries):
+            entries = heapq.nsmallest(top, entries)
+        else:
+            entries.sort()
+        return [entry[2] for entry in entries]
+
+
+# Agent fields that can be filtered and counted as facets
+FACET_FIELDS = ('author', 'model', 'tools')
+
+
+def _facet_values(agent: Dict, field: str) -> List[str]:
+    """Facet values of an agent; tools is multi-valued"""
+    if field == 'tools':
+        return [tool for tool in agent.get('tools', []) or [] if tool]
+    value = agent.get(field)
+    return [value] if value else []
+
+
+def filter_values(filters: Optional[Dict], field: str) -> List[str]:
+    """Requested values for a facet filter; a single string or a list"""
+    if not filters or not filters.get(field):
+        return []
+    value = filters[field]
+    return [value] if isinstance(value, str) else list(value)
+
+
+class FacetIndex:
+    """Posting sets per facet value (author, model, tool), updated incrementally"""
+    
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, Set[Hashable]]] = {field: {} for field in FACET_FIELDS}
+        self._doc_values: Dict[Hashable, Dict[str, List[str]]] = {}
+    
+    def add(self, key: Hashable, agent: Dict):
+        """Index an agent's facet values under key, replacing any previous entry"""
+        self.remove(key)
+        values = {field: _facet_values(agent, field) for field in FACET_FIELDS}
+        self._doc_values[key] = values
+        for field, field_values in values.items():
+            for value in field_values:
+                self._postings[field].setdefault(value, set()).add(key)
+    
+    def remove(self, key: Hashable):
+        """Remove key from every facet"""
+        values = self._doc_values.pop(key, None)
+        if values is None:
+            return
+        for field, field_values in values.items():
+            postings = self._postings[field]
+            for value in field_values:
+                keys = postings.get(value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del postings[value]
+    
+    def select(self, filters: Optional[Dict], exclude: Optional[str] = None) -> Optional[Set[Hashable]]:
+        """Keys passing the facet filters, or None when nothing is filtered.
+        
+        A facet named by exclude is ignored, which is how counts for that
+        facet are computed against the other active filters.
+        """
+        selected: Optional[Set[Hashable]] = None
+        for field in FACET_FIELDS:
+            wanted = filter_values(filters, field) if field != exclude else []
+            if not wanted:
+                continue
+            postings = self._postings[field]
+            matched: Set[Hashable] = set()
+            for value in wanted:
+                matched |= postings.get(value, set())
+            selected = matched if selected is None else selected & matched
+            if not selected:
+                break
+        return selected
+    
+    def counts(self, base: Optional[Set[Hashable]], filters: Optional[Dict]) -> Dict[str, Dict[str, int]]:
+        """Per-value counts for each facet over base (None means all keys).
+        
+        Each facet is counted with every filter applied except its own, so a
+        selected author does not hide the other authors' counts.
+        """
+        facets = {}
+        for field in FACET_FIELDS:
+            scope = base
+            others = self.select(filters, exclude=field)
+            if others is not None:
+                scope = others if scope is None else scope & others
+            counts = {}
+            for value, keys in self._postings[field].items():
+                if scope is None:
+                    count = len(keys)
+                elif len(keys) < len(scope):
+                    count = sum(1 for key in keys if key in scope)
+                else:
+                    count = sum(1 for key in scope if key in keys)
+                if count:
+                    counts[value] = count
+            facets[field] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return facets
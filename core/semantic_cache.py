@@ -0,0 +1,186 @@
+"""
+Semantic Cache - Reuse agent replies for paraphrased questions
+"""
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the semantic cache is off without it
+    np = None
+
+from core.search_index import tokenize
+
+
+# Optional sentence-transformers model run on CPU; without it questions are
+# embedded with a hashing vectorizer
+EMBEDDING_MODEL = os.getenv("AGENT_MARKET_EMBEDDING_MODEL", "")
+
+# "1" or "0" turns answering paraphrases from cache on or off; by default it
+# is on only when an embedding model is configured
+SEMANTIC_CACHE_ENABLED = os.getenv("AGENT_MARKET_SEMANTIC_CACHE", "1" if EMBEDDING_MODEL else "0") == "1"
+
+# Minimum cosine similarity for a cached reply to be reused
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("AGENT_MARKET_SEMANTIC_THRESHOLD", "0.92"))
+
+# Dimensions of the hashing vectorizer
+HASHING_DIMENSIONS = 1024
+
+# Questions remembered per agent before the oldest is replaced
+SEMANTIC_CACHE_SIZE = 256
+
+# Seconds a cached reply stays valid
+SEMANTIC_CACHE_TTL = int(os.getenv("AGENT_MARKET_SEMANTIC_CACHE_TTL", "3600"))
+
+
+def _hashing_features(text: str) -> List[str]:
+    """Words, word bigrams and character trigrams of text"""
+    words = tokenize(text)
+    features = list(words)
+    features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+    for word in words:
+        padded = f"#{word}#"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+def hashing_embed(texts: List[str], dimensions: int = HASHING_DIMENSIONS) -> "np.ndarray":
+    """Embed texts as L2-normalized signed feature hashes"""
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _hashing_features(text):
+            digest = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vectors[row, digest % dimensions] += sign
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+_embedder: Optional[Callable[[List[str]], "np.ndarray"]] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder() -> Callable[[List[str]], "np.ndarray"]:
+    """Get the text embedder: the configured local model, else the hashing vectorizer"""
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            _embedder = hashing_embed
+            if EMBEDDING_MODEL:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    model = SentenceTransformer(EMBEDDING_MODEL, device='cpu')
+                    _embedder = lambda texts: model.encode(
+                        texts, normalize_embeddings=True, convert_to_numpy=True
+                    ).astype(np.float32)
+                except Exception as e:
+                    print(f"Embedding model unavailable, using hashing vectorizer: {e}")
+    return _embedder
+
+
+class _AgentVectors:
+    """Fixed-capacity ring of question vectors and replies for one agent"""
+    
+    def __init__(self, dimensions: int, capacity: int):
+        self.matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self.responses: List[Optional[str]] = [None] * capacity
+        self.terms: List[Optional[FrozenSet[str]]] = [None] * capacity
+        self.expires_at = np.zeros(capacity, dtype=np.float64)
+        self.next_slot = 0
+
+
+class SemanticCache:
+    """Per-agent matrices of question embeddings, matched by cosine similarity.
+    
+    Vectors are L2-normalized, so similarity against every stored question
+    of an agent is a single matrix-vector product.
+    
+    With exact_terms (the default for the hashing vectorizer) a question
+    must also contain exactly the same words and numbers as the cached one.
+    Feature hashes score "World War I" and "World War II", or 6.5% and 7.5%,
+    as near-identical, so on their own they would serve wrong answers.
+    """
+    
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, capacity: int = SEMANTIC_CACHE_SIZE,
+                 ttl: float = SEMANTIC_CACHE_TTL, embedder: Optional[Callable] = None,
+                 exact_terms: Optional[bool] = None):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.embedder = embedder or get_embedder()
+        self.exact_terms = self.embedder is hashing_embed if exact_terms is None else exact_terms
+        self.hits = 0
+        self.misses = 0
+        self._agents: Dict[str, _AgentVectors] = {}
+        self._lock = threading.Lock()
+    
+    def _embed(self, text: str) -> "np.ndarray":
+        return np.asarray(self.embedder([text])[0], dtype=np.float32)
+    
+    def get(self, scope: str, text: str) -> Optional[str]:
+        """Reply cached for the most similar question in scope, if similar enough"""
+        vector = self._embed(text)
+        with self._lock:
+            vectors = self._agents.get(scope)
+            if vectors is not None:
+                similarity = vectors.matrix @ vector
+                similarity[vectors.expires_at <= time.time()] = -1.0
+                if self.exact_terms:
+                    terms = frozenset(tokenize(text))
+                    similarity[np.array([stored != terms for stored in vectors.terms])] = -1.0
+                best = int(np.argmax(similarity))
+                if similarity[best] >= self.threshold:
+                    self.hits += 1
+                    return vectors.responses[best]
+            self.misses += 1
+            return None
+    
+    def put(self, scope: str, text: str, response: str):
+        """Remember a reply for a question"""
+        vector = self._embed(text)
+        with self._lock:
+            vectors = self._agents.get(scope)
+            if vectors is None:
+                vectors = self._agents[scope] = _AgentVectors(len(vector), self.capacity)
+            slot = vectors.next_slot
+            vectors.matrix[slot] = vector
+            vectors.responses[slot] = response
+            vectors.terms[slot] = frozenset(tokenize(text))
+            vectors.expires_at[slot] = time.time() + self.ttl
+            vectors.next_slot = (slot + 1) % self.capacity
+    
+    def clear(self):
+        """Forget every cached reply and reset the counters"""
+        with self._lock:
+            self._agents.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Process-wide cache, created on first use
+_semantic_cache: Optional[SemanticCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """Get the shared semantic cache, or None when disabled or NumPy is missing"""
+    global _semantic_cache
+    if not SEMANTIC_CACHE_ENABLED or np is None:
+        return None
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticCache()
+    return _semantic_cache
@@ -0,0 +1,254 @@
+"""
+Tool Sandbox - Run CPU-heavy tools in worker processes with resource limits
+
+The parent keeps a small pool of `python -m core.tool_sandbox` workers and
+talks to them with one JSON object per line. Each worker caps its own
+address space and, per call, its CPU time (on platforms with the
+`resource` module); a call that overruns its wall-clock timeout gets its
+worker killed and replaced.
+"""
+import atexit
+import importlib
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows has no rlimits; workers then run unlimited
+    resource = None
+
+
+# Tools run in the sandbox, by function name: (module, factory)
+SANDBOXED_TOOLS = {
+    'calculator': ('core.tools.math_tool_agno', 'get_math_tool'),
+    'batch_calculator': ('core.tools.math_tool_agno', 'get_math_batch_tool'),
+}
+
+# Worker processes kept alive for sandboxed calls
+SANDBOX_WORKERS = int(os.getenv("AGENT_MARKET_TOOL_SANDBOX_WORKERS", "2"))
+
+# CPU seconds one sandboxed call may use
+SANDBOX_CPU_SECONDS = int(os.getenv("AGENT_MARKET_TOOL_CPU_SECONDS", "5"))
+
+# Address space limit of a worker, in megabytes
+SANDBOX_MEMORY_MB = int(os.getenv("AGENT_MARKET_TOOL_MEMORY_MB", "1024"))
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ToolLimitExceeded(Exception):
+    """A tool call was stopped by a guard.
+    
+    reason is 'timeout', 'cpu_limit', 'memory_limit' or 'crashed'.
+    """
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _Worker:
+    """One sandbox process and a thread reading its replies"""
+    
+    def __init__(self, cpu_seconds: int, memory_mb: int):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [_PROJECT_ROOT, env.get('PYTHONPATH')]))
+        env['AGENT_MARKET_TOOL_CPU_SECONDS'] = str(cpu_seconds)
+        env['AGENT_MARKET_TOOL_MEMORY_MB'] = str(memory_mb)
+        # One thread per numeric library, so the address space limit isn't
+        # spent on thread stacks
+        for name in ('OPENBLAS_NUM_THREADS', 'OMP_NUM_THREADS', 'MKL_NUM_THREADS'):
+            env[name] = '1'
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'core.tool_sandbox'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        self.replies: "queue.Queue[Optional[str]]" = queue.Queue()
+        threading.Thread(target=self._read, name="tool-sandbox-reader", daemon=True).start()
+    
+    def _read(self):
+        for line in self.process.stdout:
+            self.replies.put(line)
+        # End of output: the worker exited
+        self.replies.put(None)
+    
+    def call(self, tool: str, args: tuple, kwargs: Dict, timeout: float) -> Dict:
+        """Send one call and wait up to timeout seconds for its reply"""
+        request = json.dumps({'tool': tool, 'args': list(args), 'kwargs': kwargs})
+        try:
+            self.process.stdin.write(request + '\n')
+            self.process.stdin.flush()
+        except OSError:
+            raise ToolLimitExceeded('crashed', f"{tool} worker is not running")
+        
+        try:
+            line = self.replies.get(timeout=timeout)
+        except queue.Empty:
+            self.kill()
+            raise ToolLimitExceeded('timeout', f"{tool} took longer than {timeout:g}s and was stopped")
+        
+        if line is None:
+            returncode = self.process.wait()
+            if resource is not None and returncode == -signal.SIGXCPU:
+                raise ToolLimitExceeded('cpu_limit', f"{tool} used more than its CPU time limit and was stopped")
+            raise ToolLimitExceeded('crashed', f"{tool} worker exited with code {returncode}")
+        return json.loads(line)
+    
+    def alive(self) -> bool:
+        return self.process.poll() is None
+    
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class ToolSandbox:
+    """Pool of sandbox workers shared by every runner in the process"""
+    
+    def __init__(self, workers: int = SANDBOX_WORKERS, cpu_seconds: int = SANDBOX_CPU_SECONDS,
+                 memory_mb: int = SANDBOX_MEMORY_MB):
+        self.max_workers = max(workers, 1)
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+    
+    def _checkout(self, timeout: float) -> _Worker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._started < self.max_workers:
+                self._started += 1
+                try:
+                    return _Worker(self.cpu_seconds, self.memory_mb)
+                except Exception:
+                    self._started -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise ToolLimitExceeded('timeout', f"No sandbox worker became free within {timeout:g}s")
+    
+    def _checkin(self, worker: _Worker):
+        if worker.alive():
+            self._idle.put(worker)
+        else:
+            with self._lock:
+                self._started -= 1
+    
+    def run(self, tool: str, args: tuple, kwargs: Dict, timeout: float) -> Any:
+        """Call a tool from SANDBOXED_TOOLS in a worker; raises ToolLimitExceeded"""
+        deadline = time.monotonic() + timeout
+        worker = self._checkout(timeout)
+        try:
+            reply = worker.call(tool, args, kwargs, max(deadline - time.monotonic(), 0.0))
+        finally:
+            self._checkin(worker)
+        if 'error' in reply:
+            if reply.get('reason') == 'memory_limit':
+                raise ToolLimitExceeded('memory_limit', f"{tool} ran out of its {self.memory_mb} MB memory limit")
+            raise RuntimeError(reply['error'])
+        return reply['result']
+    
+    def close(self):
+        """Stop every idle worker"""
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.kill()
+            with self._lock:
+                self._started -= 1
+
+
+_sandbox: Optional[ToolSandbox] = None
+_sandbox_lock = threading.Lock()
+
+
+def get_tool_sandbox() -> ToolSandbox:
+    """Get the process-wide tool sandbox"""
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            _sandbox = ToolSandbox()
+            atexit.register(_sandbox.close)
+    return _sandbox
+
+
+def _limit_memory(megabytes: int):
+    if resource is not None and megabytes > 0:
+        limit = megabytes * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _limit_cpu(seconds: int):
+    """Allow seconds more CPU time from now; the kernel sends SIGXCPU past it.
+    
+    Only the soft limit moves, since a lowered hard limit could never be
+    raised again for the next call.
+    """
+    if resource is None or seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + seconds
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _load_tool(name: str, loaded: Dict[str, Callable]) -> Callable:
+    if name not in loaded:
+        if name not in SANDBOXED_TOOLS:
+            raise ValueError(f"Tool '{name}' cannot run in the sandbox")
+        module_name, factory = SANDBOXED_TOOLS[name]
+        tool = getattr(importlib.import_module(module_name), factory)()
+        if tool is None:
+            raise RuntimeError(f"Tool '{name}' is not available")
+        loaded[name] = tool
+    return loaded[name]
+
+
+def main():
+    """Serve tool calls from stdin until it closes"""
+    replies = sys.stdout
+    # Anything a tool prints must not corrupt the replies
+    sys.stdout = sys.stderr
+    _limit_memory(SANDBOX_MEMORY_MB)
+    loaded: Dict[str, Callable] = {}
+    
+    for line in sys.stdin:
+        try:
+            request = json.loads(line)
+            _limit_cpu(SANDBOX_CPU_SECONDS)
+            tool = _load_tool(request['tool'], loaded)
+            reply = {'result': tool(*request.get('args', []), **request.get('kwargs', {}))}
+        except MemoryError:
+            reply = {'error': "MemoryError", 'reason': 'memory_limit'}
+        except Exception as e:
+            reply = {'error': f"{type(e).__name__}: {e}"}
+        replies.write(json.dumps(reply, ensure_ascii=False, default=str) + '\n')
+        replies.flush()
+
+
+if __name__ == '__main__':
+    main()
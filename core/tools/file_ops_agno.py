@@ -1,8 +1,198 @@
 """
 File Operations Tool - Agno compatible
 """
+import mmap
 import os
-from typing import Optional
+import re
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple, Union
+
+
+# Most bytes one read returns to the model; the rest is marked as truncated
+MAX_READ_BYTES = int(os.getenv("AGENT_MARKET_FILE_READ_BYTES", "20000"))
+
+# Lines returned by head/tail when no count is given
+DEFAULT_LINES = 50
+
+# Files at least this large are memory-mapped instead of read
+MMAP_THRESHOLD = 1024 * 1024
+
+# Limits for search: matching lines returned, files scanned, size of one file
+SEARCH_MAX_MATCHES = 100
+SEARCH_MAX_FILES = 2000
+SEARCH_MAX_FILE_BYTES = 256 * 1024 * 1024
+
+# Bytes and seconds one search may spend across all files. The budget is
+# checked before each file and the deadline also within one; it is kept
+# under the tool timeout so the search returns what it found instead of
+# being stopped
+SEARCH_MAX_TOTAL_BYTES = 1024 * 1024 * 1024
+SEARCH_SECONDS = float(os.getenv("AGENT_MARKET_SEARCH_SECONDS", "5"))
+
+# Characters of a matching line shown in search results
+SEARCH_LINE_CHARS = 300
+
+# Bytes whose newlines are counted at once when skipping to a line
+LINE_SCAN_BYTES = 64 * 1024
+
+
+@contextmanager
+def _open_bytes(filepath: str) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Open a file as a bytes-like buffer, memory-mapped when it is large"""
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_THRESHOLD:
+            yield f.read()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def _count_newlines(data, start: int, end: int) -> int:
+    """Newlines in data[start:end], copying at most LINE_SCAN_BYTES of an mmap at a time"""
+    if isinstance(data, bytes):
+        return data.count(b'\n', start, end)
+    return sum(data[position:min(position + LINE_SCAN_BYTES, end)].count(b'\n')
+               for position in range(start, end, LINE_SCAN_BYTES))
+
+
+def _line_start(data, line: int) -> int:
+    """Byte offset where 1-based line starts, or len(data) past the end.
+    
+    Blocks of LINE_SCAN_BYTES before the line are skipped by counting
+    their newlines, so only the block holding it is walked line by line.
+    """
+    position, remaining = 0, line - 1
+    while remaining:
+        block_end = min(position + LINE_SCAN_BYTES, len(data))
+        newlines = _count_newlines(data, position, block_end)
+        if newlines >= remaining:
+            break
+        if block_end == len(data):
+            return len(data)
+        remaining -= newlines
+        position = block_end
+    for _ in range(remaining):
+        position = data.find(b'\n', position) + 1
+    return position
+
+
+def _line_end(data, start: int, count: int) -> int:
+    """Byte offset just past count lines beginning at start.
+    
+    Stops early once the span is longer than a read shows, since
+    _excerpt() cuts it at MAX_READ_BYTES anyway.
+    """
+    position = start
+    for _ in range(count):
+        if position - start > MAX_READ_BYTES:
+            break
+        newline = data.find(b'\n', position)
+        if newline == -1:
+            return len(data)
+        position = newline + 1
+    return position
+
+
+def _tail_start(data, count: int) -> int:
+    """Byte offset where the last count lines begin, or a line start more
+    than MAX_READ_BYTES from the end if that comes first"""
+    end = position = len(data)
+    # A final newline ends the last line rather than starting an empty one
+    if data[position - 1:position] == b'\n':
+        position -= 1
+    for _ in range(count):
+        if end - (position + 1) > MAX_READ_BYTES:
+            break
+        position = data.rfind(b'\n', 0, position)
+        if position == -1:
+            return 0
+    return position + 1
+
+
+def _excerpt(filepath: str, data, start: int, end: int, label: str, from_end: bool = False) -> str:
+    """Format data[start:end] for the model, capped at MAX_READ_BYTES.
+    
+    A tail keeps the last MAX_READ_BYTES of the span, any other read the
+    first. The header carries the file size and the byte span shown.
+    """
+    size = len(data)
+    end = min(end, size)
+    start = min(start, end)
+    cut = end - start > MAX_READ_BYTES
+    if cut and from_end:
+        start = end - MAX_READ_BYTES
+    elif cut:
+        end = start + MAX_READ_BYTES
+    
+    text = data[start:end].decode('utf-8', errors='replace')
+    result = f"📄 {filepath} ({size:,} bytes), {label}, bytes {start:,}-{end:,}:\n\n{text}"
+    if cut:
+        separator = '\n' if text.endswith('\n') else '\n\n'
+        if from_end:
+            result += f"{separator}... [truncated, {start:,} earlier bytes not shown]"
+        else:
+            result += f"{separator}... [truncated, {size - end:,} bytes remaining; continue with 'read:{filepath}:{end}:{MAX_READ_BYTES}']"
+    return result
+
+
+def _search_paths(root: str) -> Iterator[str]:
+    """Files under root in sorted order, skipping hidden directories"""
+    if os.path.isfile(root):
+        yield root
+        return
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            yield os.path.join(directory, name)
+
+
+def _search_buffer(regex, data, limit: int, deadline: Optional[float] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (line number, line) for up to limit lines of data matching regex.
+    
+    Each match jumps the scan to the next line, so a line is reported once
+    and newlines are only counted between matches. data is searched in
+    windows of whole lines about LINE_SCAN_BYTES long, so a match cannot
+    span two windows; TimeoutError is raised between windows once the
+    deadline passes.
+    """
+    position = line_number = counted_to = 0
+    while limit > 0 and position <= len(data):
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError
+        window_end = data.find(b'\n', position + LINE_SCAN_BYTES)
+        window_end = len(data) if window_end == -1 else window_end + 1
+        match = regex.search(data, position, window_end)
+        if match is None:
+            if window_end == len(data):
+                return
+            position = window_end
+            continue
+        start = data.rfind(b'\n', 0, match.start()) + 1
+        end = data.find(b'\n', match.start())
+        if end == -1:
+            end = len(data)
+        line_number += _count_newlines(data, counted_to, start)
+        counted_to = start
+        yield line_number + 1, data[start:end].rstrip(b'\r').decode('utf-8', errors='replace')
+        limit -= 1
+        position = end + 1
+
+
+def _parse_counts(values, names: Tuple[str, ...]) -> Tuple[int, ...]:
+    if len(values) > len(names):
+        raise ValueError(f"Too many values, expected at most: {', '.join(names)}")
+    counts = []
+    for value, name in zip(values, names):
+        try:
+            count = int(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a whole number, got '{value}'")
+        if count < 0:
+            raise ValueError(f"{name} must not be negative")
+        counts.append(count)
+    return tuple(counts)
 
 
 def get_file_ops_tool():
@@ -13,7 +203,16 @@ def get_file_ops_tool():
         Execute file operations.
         
         Args:
-            command: Command in format 'read:filepath' or 'write:filepath:content' or 'list:directory'
+            command: One of
+                'read:filepath[:offset[:length]]' - bytes from offset (default 0)
+                'head:filepath[:n]' / 'tail:filepath[:n]' - first/last n lines (default 50)
+                'lines:filepath:start[-end]' - 1-based line range
+                'search:regex:path' - matching lines, with line numbers, in a
+                    file or every file under a directory
+                'write:filepath:content'
+                'list:directory'
+            Reads report the file size and are capped in length; a capped
+            read says how many bytes were left out.
         
         Returns:
             Result of the file operation
@@ -22,11 +221,12 @@ def get_file_ops_tool():
             parts = command.split(':', 2)
             operation = parts[0].lower()
             
-            if operation == 'read':
+            if operation in ('read', 'head', 'tail', 'lines'):
                 if len(parts) < 2:
-                    return "Error: Please specify a file path. Format: 'read:filepath'"
+                    return f"Error: Please specify a file path. Format: '{operation}:filepath'"
                 
                 filepath = parts[1].strip()
+                options = parts[2].split(':') if len(parts) > 2 else []
                 
                 if not _is_safe_path(filepath):
                     return "Error: Access denied. Only files in the current workspace are accessible."
@@ -34,13 +234,44 @@ def get_file_ops_tool():
                 if not os.path.exists(filepath):
                     return f"Error: File '{filepath}' not found."
                 
+                if not os.path.isfile(filepath):
+                    return f"Error: '{filepath}' is not a file. Use 'list:{filepath}' for directories."
+                
                 try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                    return f"📄 Contents of {filepath}:\n\n{content}"
+                    with _open_bytes(filepath) as data:
+                        return _read_part(filepath, data, operation, options)
+                except ValueError as e:
+                    return f"Error: {str(e)}"
                 except Exception as e:
                     return f"Error reading file: {str(e)}"
             
+            elif operation == 'search':
+                # The pattern may contain ':', so the path is taken from the right
+                rest = command.split(':', 1)[1] if ':' in command else ''
+                pattern, separator, path = rest.rpartition(':')
+                if not separator:
+                    pattern, path = path, '.'
+                path = path.strip() or '.'
+                
+                if not pattern:
+                    return "Error: Please specify a pattern. Format: 'search:pattern:path'"
+                
+                if not _is_safe_path(path):
+                    return "Error: Access denied."
+                
+                if not os.path.exists(path):
+                    return f"Error: '{path}' not found."
+                
+                try:
+                    regex = re.compile(pattern.encode('utf-8'))
+                except re.error as e:
+                    return f"Error: Invalid pattern '{pattern}': {e}"
+                
+                try:
+                    return _search(regex, pattern, path)
+                except Exception as e:
+                    return f"Error searching files: {str(e)}"
+            
             elif operation == 'write':
                 if len(parts) < 3:
                     return "Error: Format: 'write:filepath:content'"
@@ -84,11 +315,92 @@ def get_file_ops_tool():
                     return f"Error listing directory: {str(e)}"
             
             else:
-                return f"Error: Unknown operation '{operation}'. Use 'read', 'write', or 'list'."
+                return f"Error: Unknown operation '{operation}'. Use 'read', 'head', 'tail', 'lines', 'search', 'write', or 'list'."
         
         except Exception as e:
             return f"Error: {str(e)}"
     
+    def _read_part(filepath: str, data, operation: str, options) -> str:
+        """Run a read-style operation against an open file buffer"""
+        if operation == 'read':
+            counts = _parse_counts(options, ('offset', 'length'))
+            offset = counts[0] if counts else 0
+            length = counts[1] if len(counts) > 1 else len(data)
+            return _excerpt(filepath, data, offset, offset + length, "read")
+        
+        if operation in ('head', 'tail'):
+            count = _parse_counts(options, ('line count',))[0] if options else DEFAULT_LINES
+            if operation == 'head':
+                return _excerpt(filepath, data, 0, _line_end(data, 0, count), f"first {count} lines")
+            return _excerpt(filepath, data, _tail_start(data, count), len(data), f"last {count} lines", from_end=True)
+        
+        if not options or not options[0].strip():
+            raise ValueError(f"Format: 'lines:{filepath}:start-end'")
+        first, _, last = options[0].partition('-')
+        start, = _parse_counts([first], ('start line',))
+        start = max(start, 1)
+        begin = _line_start(data, start)
+        if last.strip():
+            end, = _parse_counts([last], ('end line',))
+            if end < start:
+                raise ValueError("end line must not be before start line")
+            stop = _line_end(data, begin, end - start + 1)
+            return _excerpt(filepath, data, begin, stop, f"lines {start}-{end}")
+        return _excerpt(filepath, data, begin, len(data), f"lines {start}-")
+    
+    def _search(regex, pattern: str, path: str) -> str:
+        """Scan every text file under path for regex"""
+        results = []
+        scanned = skipped = scanned_bytes = 0
+        stopped = None
+        deadline = time.monotonic() + SEARCH_SECONDS
+        for filepath in _search_paths(path):
+            # One match past the limit shows that results were cut
+            if len(results) > SEARCH_MAX_MATCHES:
+                stopped = f"at {SEARCH_MAX_MATCHES} matches"
+            elif scanned >= SEARCH_MAX_FILES:
+                stopped = f"after {SEARCH_MAX_FILES} files"
+            elif time.monotonic() > deadline:
+                stopped = f"after {SEARCH_SECONDS:g}s"
+            if stopped:
+                break
+            try:
+                size = os.path.getsize(filepath)
+                if size > SEARCH_MAX_FILE_BYTES:
+                    skipped += 1
+                    continue
+                if scanned_bytes + size > SEARCH_MAX_TOTAL_BYTES:
+                    stopped = f"after {scanned_bytes // (1024 * 1024):,} MB"
+                    break
+                scanned_bytes += size
+                with _open_bytes(filepath) as data:
+                    # A NUL byte near the start means a binary file
+                    if b'\0' in data[:8192]:
+                        continue
+                    scanned += 1
+                    for line_number, line in _search_buffer(regex, data, SEARCH_MAX_MATCHES + 1 - len(results), deadline):
+                        if len(line) > SEARCH_LINE_CHARS:
+                            line = line[:SEARCH_LINE_CHARS] + "…"
+                        results.append(f"{filepath}:{line_number}: {line}")
+            except TimeoutError:
+                # A subclass of OSError, so caught first
+                stopped = f"after {SEARCH_SECONDS:g}s"
+                break
+            except OSError:
+                skipped += 1
+        if len(results) > SEARCH_MAX_MATCHES:
+            results = results[:SEARCH_MAX_MATCHES]
+            stopped = f"at {SEARCH_MAX_MATCHES} matches"
+        
+        result = f"🔎 {len(results)} matching lines for '{pattern}' in {path} (files scanned: {scanned}"
+        if skipped:
+            result += f", skipped as unreadable or over {SEARCH_MAX_FILE_BYTES // (1024 * 1024)} MB: {skipped}"
+        result += "):\n\n"
+        result += '\n'.join(results) if results else "No matches."
+        if stopped:
+            result += f"\n\n... [stopped {stopped}; narrow the pattern or path]"
+        return result
+    
     def _is_safe_path(path: str) -> bool:
         """Check if path is safe to access"""
         if os.path.isabs(path):
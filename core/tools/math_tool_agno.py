@@ -1,7 +1,323 @@
 """
 Math Tool - Agno compatible calculator
 """
+import ast
+import json
 import math
+from functools import lru_cache, reduce
+from types import MappingProxyType
+from typing import Any, Dict
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch mode is off without it
+    np = None
+
+
+# Longest expression accepted
+MAX_EXPRESSION_LENGTH = 1000
+
+# Largest n accepted by factorial()
+MAX_FACTORIAL = 1000
+
+# Largest integer power, in bits, that ** and pow() may produce
+MAX_POWER_BITS = 10000
+
+# Largest number of digits, either side of the point, round() may round to;
+# round(7, -n) builds 10 ** n internally
+MAX_ROUND_DIGITS = 1000
+
+# Compiled expressions kept for reuse
+COMPILE_CACHE_SIZE = 1024
+
+# Most values a batch evaluation may produce
+MAX_BATCH_SIZE = 1_000_000
+
+# Values listed when a batch result is shown rather than summarized
+BATCH_VALUES_SHOWN = 20
+
+
+def _pow(base, exponent, modulus=None):
+    """pow() that refuses integer results too large to compute quickly"""
+    if modulus is None and isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        # The result has about exponent * log2(base) bits
+        if abs(base) > 1 and exponent * math.log2(abs(base)) > MAX_POWER_BITS:
+            raise ValueError(f"Result too large: {base} ** {exponent}")
+    if modulus is None:
+        return pow(base, exponent)
+    return pow(base, exponent, modulus)
+
+
+def _round(number, ndigits=None):
+    """round() with a bound on ndigits"""
+    if isinstance(ndigits, int) and abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ValueError(f"round() digits too large (limit {MAX_ROUND_DIGITS})")
+    if ndigits is None:
+        return round(number)
+    return round(number, ndigits)
+
+
+def _factorial(n):
+    """math.factorial() with an upper bound on n"""
+    if isinstance(n, (int, float)) and n > MAX_FACTORIAL:
+        raise ValueError(f"factorial() argument too large (limit {MAX_FACTORIAL})")
+    return math.factorial(n)
+
+
+# Functions and constants available to expressions; '**' is compiled into a
+# call to _pow so it is guarded like pow()
+SAFE_NAMES = MappingProxyType({
+    'abs': abs,
+    'round': _round,
+    'min': min,
+    'max': max,
+    'sum': sum,
+    'pow': _pow,
+    'sqrt': math.sqrt,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'asin': math.asin,
+    'acos': math.acos,
+    'atan': math.atan,
+    'sinh': math.sinh,
+    'cosh': math.cosh,
+    'tanh': math.tanh,
+    'log': math.log,
+    'log10': math.log10,
+    'log2': math.log2,
+    'exp': math.exp,
+    'floor': math.floor,
+    'ceil': math.ceil,
+    'degrees': math.degrees,
+    'radians': math.radians,
+    'factorial': _factorial,
+    'pi': math.pi,
+    'e': math.e,
+    'tau': math.tau,
+    'inf': math.inf,
+    '_pow': _pow,
+})
+
+_GLOBALS = {'__builtins__': {}}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Tuple, ast.List, ast.Compare, ast.BoolOp,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.UAdd, ast.USub,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.And, ast.Or, ast.Not,
+)
+
+# Lists and tuples may only be passed to functions like sum() and max(); as
+# operands, '[1] * 10 ** 8' would build a huge sequence
+_SEQUENCE_NODES = (ast.List, ast.Tuple)
+
+
+class _GuardPower(ast.NodeTransformer):
+    """Rewrite 'a ** b' as '_pow(a, b)'"""
+    
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            call = ast.Call(func=ast.Name(id='_pow', ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+            return ast.copy_location(call, node)
+        return node
+
+
+def _validate(tree: ast.Expression, variables: frozenset):
+    """Reject anything but arithmetic and comparisons on numbers, variables and calls to SAFE_NAMES"""
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, float):
+            raise ValueError(f"Unsupported value: {node.value!r}")
+        if isinstance(node, ast.Name) and node.id not in variables and (
+                node.id not in SAFE_NAMES or node.id.startswith('_')):
+            raise NameError(f"name '{node.id}' is not defined")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.keywords:
+                raise ValueError("Only calls like name(arguments) are supported")
+        operands = ()
+        if isinstance(node, ast.BinOp):
+            operands = (node.left, node.right)
+        elif isinstance(node, ast.UnaryOp):
+            operands = (node.operand,)
+        elif isinstance(node, ast.Compare):
+            operands = (node.left, *node.comparators)
+        elif isinstance(node, ast.BoolOp):
+            operands = node.values
+        if any(isinstance(operand, _SEQUENCE_NODES) for operand in operands):
+            raise ValueError("Lists and tuples can only be passed to functions like sum() or max()")
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expression(expression: str, variables: frozenset = frozenset()):
+    """Parse, validate and compile an expression, once per distinct text.
+    
+    Raises SyntaxError, NameError or ValueError for anything the
+    calculator does not allow.
+    """
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError(f"Expression too long (limit {MAX_EXPRESSION_LENGTH} characters)")
+    tree = ast.parse(expression, mode='eval')
+    _validate(tree, variables)
+    tree = ast.fix_missing_locations(_GuardPower().visit(tree))
+    return compile(tree, '<calculator>', 'eval')
+
+
+def evaluate(expression: str):
+    """Evaluate an expression against SAFE_NAMES"""
+    return eval(compile_expression(expression), _GLOBALS, SAFE_NAMES)
+
+
+def _np_factorial(n):
+    """Element-wise factorial with the same bound as factorial()"""
+    values = np.asarray(n, dtype=np.float64)
+    if np.any(values < 0) or np.any(values != np.floor(values)):
+        raise ValueError("factorial() only accepts non-negative integers")
+    if np.any(values > MAX_FACTORIAL):
+        raise ValueError(f"factorial() argument too large (limit {MAX_FACTORIAL})")
+    return np.vectorize(lambda v: float(math.factorial(int(v))), otypes=[np.float64])(values)
+
+
+def _np_extreme(single, pairwise):
+    """min()/max(): reduce one array, or compare several element-wise"""
+    def extreme(*args):
+        if len(args) == 1:
+            return single(args[0])
+        return reduce(pairwise, args)
+    return extreme
+
+
+def _np_unary(name: str, func):
+    """Wrap a one-argument NumPy function so a second argument cannot reach
+    its out= parameter"""
+    def call(x):
+        return func(x)
+    call.__name__ = call.__qualname__ = name
+    return call
+
+
+def _np_pow(base, exponent, modulus=None):
+    """pow() and ** in floating point, without the modulus, which
+    np.power() would take as out=.
+    
+    Integer np.power() refuses negative exponents and wraps past 2 ** 63.
+    """
+    if modulus is not None:
+        raise ValueError("pow() with a modulus is not supported in batch mode")
+    return np.power(np.asarray(base, dtype=np.float64), exponent)
+
+
+def _np_round(x, digits=0):
+    """round() to a whole number of digits"""
+    return np.round(x, int(digits))
+
+
+def _np_log(x, base=None):
+    """log(x) or log(x, base), as math.log() takes them"""
+    if base is None:
+        return np.log(x)
+    return np.log(x) / np.log(base)
+
+
+# SAFE_NAMES with NumPy's element-wise equivalents, for batch evaluation
+NUMPY_NAMES = MappingProxyType({} if np is None else {
+    'abs': _np_unary('abs', np.abs),
+    'round': _np_round,
+    'min': _np_extreme(np.min, np.minimum),
+    'max': _np_extreme(np.max, np.maximum),
+    'sum': _np_unary('sum', np.sum),
+    'pow': _np_pow,
+    'sqrt': _np_unary('sqrt', np.sqrt),
+    'sin': _np_unary('sin', np.sin),
+    'cos': _np_unary('cos', np.cos),
+    'tan': _np_unary('tan', np.tan),
+    'asin': _np_unary('asin', np.arcsin),
+    'acos': _np_unary('acos', np.arccos),
+    'atan': _np_unary('atan', np.arctan),
+    'sinh': _np_unary('sinh', np.sinh),
+    'cosh': _np_unary('cosh', np.cosh),
+    'tanh': _np_unary('tanh', np.tanh),
+    'log': _np_log,
+    'log10': _np_unary('log10', np.log10),
+    'log2': _np_unary('log2', np.log2),
+    'exp': _np_unary('exp', np.exp),
+    'floor': _np_unary('floor', np.floor),
+    'ceil': _np_unary('ceil', np.ceil),
+    'degrees': _np_unary('degrees', np.degrees),
+    'radians': _np_unary('radians', np.radians),
+    'factorial': _np_factorial,
+    'pi': np.pi,
+    'e': np.e,
+    'tau': math.tau,
+    'inf': np.inf,
+    '_pow': _np_pow,
+})
+
+
+def _batch_input(name: str, spec: Any) -> "np.ndarray":
+    """A variable's values: a list of numbers or a 'start:stop[:step]' range"""
+    if not name.isidentifier() or name.startswith('_') or name in SAFE_NAMES:
+        raise ValueError(f"Invalid variable name '{name}'")
+    if isinstance(spec, str):
+        try:
+            bounds = [float(part) for part in spec.split(':')]
+        except ValueError:
+            bounds = []
+        if len(bounds) not in (2, 3):
+            raise ValueError(f"Variable '{name}': use a list of numbers or 'start:stop[:step]'")
+        start, stop, step = bounds if len(bounds) == 3 else bounds + [1.0]
+        if step == 0 or (stop - start) / step > MAX_BATCH_SIZE:
+            raise ValueError(f"Variable '{name}': range must have a non-zero step and at most {MAX_BATCH_SIZE:,} values")
+        return np.arange(start, stop, step, dtype=np.float64)
+    
+    values = np.asarray(spec, dtype=np.float64)
+    if values.ndim != 1:
+        raise ValueError(f"Variable '{name}': expected a flat list of numbers")
+    if values.size > MAX_BATCH_SIZE:
+        raise ValueError(f"Variable '{name}': at most {MAX_BATCH_SIZE:,} values")
+    return values
+
+
+def evaluate_batch(expression: str, variables: Dict[str, Any]) -> "np.ndarray":
+    """Evaluate an expression element-wise over named arrays or ranges"""
+    if np is None:
+        raise RuntimeError("Batch mode needs NumPy (pip install numpy)")
+    arrays = {name: _batch_input(name, spec) for name, spec in variables.items()}
+    code = compile_expression(expression, frozenset(arrays))
+    namespace = dict(NUMPY_NAMES)
+    namespace.update(arrays)
+    with np.errstate(all='ignore'):
+        return np.asarray(eval(code, _GLOBALS, namespace), dtype=np.float64)
+
+
+def _format_number(value: float) -> str:
+    value = round(float(value), 10)
+    if math.isfinite(value) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _summarize_batch(values: "np.ndarray") -> str:
+    """Count, spread and percentiles of the finite results"""
+    finite = values[np.isfinite(values)]
+    lines = [f"count: {values.size}"]
+    if values.size != finite.size:
+        lines.append(f"non-finite (nan/inf): {values.size - finite.size}")
+    if finite.size:
+        p5, p50, p95 = np.percentile(finite, [5, 50, 95])
+        lines += [
+            f"mean: {_format_number(finite.mean())}",
+            f"std: {_format_number(finite.std())}",
+            f"min: {_format_number(finite.min())}",
+            f"p5: {_format_number(p5)}",
+            f"median: {_format_number(p50)}",
+            f"p95: {_format_number(p95)}",
+            f"max: {_format_number(finite.max())}",
+            f"sum: {_format_number(finite.sum())}",
+        ]
+    return '\n'.join(lines)
 
 
 def get_math_tool():
@@ -20,41 +336,8 @@ def get_math_tool():
         try:
             expression = expression.strip()
             
-            # Create safe namespace
-            safe_dict = {
-                'abs': abs,
-                'round': round,
-                'min': min,
-                'max': max,
-                'sum': sum,
-                'pow': pow,
-                'sqrt': math.sqrt,
-                'sin': math.sin,
-                'cos': math.cos,
-                'tan': math.tan,
-                'asin': math.asin,
-                'acos': math.acos,
-                'atan': math.atan,
-                'sinh': math.sinh,
-                'cosh': math.cosh,
-                'tanh': math.tanh,
-                'log': math.log,
-                'log10': math.log10,
-                'log2': math.log2,
-                'exp': math.exp,
-                'floor': math.floor,
-                'ceil': math.ceil,
-                'degrees': math.degrees,
-                'radians': math.radians,
-                'factorial': math.factorial,
-                'pi': math.pi,
-                'e': math.e,
-                'tau': math.tau,
-                'inf': math.inf,
-            }
-            
             # Evaluate safely
-            result = eval(expression, {"__builtins__": {}}, safe_dict)
+            result = evaluate(expression)
             
             # Format result
             if isinstance(result, float):
@@ -71,8 +354,61 @@ def get_math_tool():
             return f"❌ Unknown function in '{expression}'. Available: sqrt, sin, cos, tan, log, exp, etc."
         except ZeroDivisionError:
             return "❌ Error: Division by zero"
+        except MemoryError:
+            # Reported by the sandbox as its memory limit
+            raise
         except Exception as e:
             return f"❌ Error: {str(e)}"
     
     return calculator
 
+
+def get_math_batch_tool():
+    """Get the vectorized batch calculator tool for Agno, or None without NumPy"""
+    if np is None:
+        return None
+    
+    def batch_calculator(expression: str, variables: str, output: str = "summary") -> str:
+        """
+        Evaluate one formula over many values at once instead of calling the calculator repeatedly.
+        
+        Args:
+            expression: Formula using the calculator's functions and the variable names, e.g. 'x * (1 + r) ** 10'
+            variables: JSON object mapping each variable to a list of numbers or a 'start:stop:step' range,
+                e.g. '{"x": [100, 250, 400], "r": "0.01:0.1:0.01"}'. Variables of equal length are combined element by element.
+            output: 'summary' for count, mean, spread and percentiles, or 'values' for the results themselves (long lists are truncated)
+        
+        Returns:
+            Summary statistics or values of the results
+        """
+        try:
+            expression = expression.strip()
+            variables = json.loads(variables) if variables.strip() else {}
+            if not isinstance(variables, dict):
+                return "❌ Error: variables must be a JSON object of name -> list or 'start:stop:step'"
+            
+            values = evaluate_batch(expression, variables).ravel()
+            
+            if values.size == 1:
+                return f"🧮 Result: {expression} = {_format_number(values[0])}"
+            
+            header = f"🧮 Batch result: {expression} over {values.size} values"
+            if output.strip().lower() == 'values':
+                shown = ', '.join(_format_number(value) for value in values[:BATCH_VALUES_SHOWN])
+                more = values.size - BATCH_VALUES_SHOWN
+                suffix = f", ... ({more} more)" if more > 0 else ""
+                return f"{header}\n[{shown}{suffix}]"
+            return f"{header}\n{_summarize_batch(values)}"
+        
+        except json.JSONDecodeError:
+            return "❌ Error: variables must be valid JSON, e.g. '{\"x\": [1, 2, 3]}'"
+        except SyntaxError:
+            return f"❌ Syntax Error: Invalid expression '{expression}'"
+        except NameError as e:
+            return f"❌ Unknown name in '{expression}': {e}. Define it in variables or use sqrt, sin, log, exp, etc."
+        except MemoryError:
+            raise
+        except Exception as e:
+            return f"❌ Error: {str(e)}"
+    
+    return batch_calculator
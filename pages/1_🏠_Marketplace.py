@@ -8,9 +8,9 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.agent_manager import load_agents, search_agents, delete_agent
+from core.agent_manager import count_agents, search_agents_with_facets, delete_agent
 from ui.components.agent_card import render_agent_grid
-from core.groq_integration import get_available_models
+from core.groq_integration import get_available_models, get_model_info
 
 # Page configuration
 st.set_page_config(
@@ -24,9 +24,6 @@ st.title("🏠 Agent Marketplace")
 st.markdown("Browse, test, and clone AI agents from the marketplace")
 st.divider()
 
-# Load agents FIRST
-all_agents = load_agents()
-
 # Handle deletion confirmation BEFORE filtering/searching
 if 'agent_to_delete' in st.session_state and st.session_state['agent_to_delete']:
     agent_to_delete = st.session_state['agent_to_delete']
@@ -63,50 +60,101 @@ with col1:
         label_visibility="collapsed"
     )
 
-with col2:
-    # Get unique authors
-    authors = sorted(list(set(agent.get('author', 'Unknown') for agent in all_agents)))
-    author_filter = st.selectbox(
-        "Filter by author",
-        options=['All Authors'] + authors
-    )
-
-with col3:
-    # Get available models
-    models = list(get_available_models().keys())
-    model_filter = st.selectbox(
-        "Filter by model",
-        options=['All Models'] + models
-    )
+# Current filter selections; the widgets are drawn after searching so
+# their options can show facet counts from the same query
+author_filter = st.session_state.get('marketplace_author_filter', 'All Authors')
+model_filter = st.session_state.get('marketplace_model_filter', 'All Models')
 
-# Apply filters
 filters = {}
 if author_filter != 'All Authors':
     filters['author'] = author_filter
 if model_filter != 'All Models':
     filters['model'] = model_filter
 
-# Search agents
-agents = search_agents(query=search_query, filters=filters if filters else None)
-
-# Sort options
-col_sort, col_count = st.columns([1, 3])
+# Sort, page size and view options
+SORT_OPTIONS = {
+    'Newest First': 'newest',
+    'Name (A-Z)': 'name',
+    'Name (Z-A)': 'name_desc',
+    'Author': 'author',
+    'Best Match': 'relevance',
+}
+col_sort, col_size, col_view = st.columns([1, 1, 2])
 with col_sort:
     sort_by = st.selectbox(
         "Sort by",
-        options=['Newest First', 'Name (A-Z)', 'Name (Z-A)', 'Author'],
+        options=list(SORT_OPTIONS),
+        label_visibility="collapsed"
+    )
+with col_size:
+    page_size = st.selectbox(
+        "Agents per page",
+        options=[10, 25, 50, 100],
+        index=1,
+        key='marketplace_page_size',
+        format_func=lambda n: f"{n} per page",
+        label_visibility="collapsed"
+    )
+with col_view:
+    view_mode = st.radio(
+        "View",
+        options=['🗂️ Cards', '📋 List'],
+        horizontal=True,
         label_visibility="collapsed"
     )
 
-# Apply sorting
-if sort_by == 'Name (A-Z)':
-    agents = sorted(agents, key=lambda x: x.get('name', '').lower())
-elif sort_by == 'Name (Z-A)':
-    agents = sorted(agents, key=lambda x: x.get('name', '').lower(), reverse=True)
-elif sort_by == 'Author':
-    agents = sorted(agents, key=lambda x: x.get('author', '').lower())
-elif sort_by == 'Newest First':
-    agents = sorted(agents, key=lambda x: x.get('created_at', ''), reverse=True)
+# Cursor stack for the pages visited so far; reset whenever the query changes
+search_signature = (search_query, tuple(sorted(filters.items())), sort_by, page_size)
+if st.session_state.get('marketplace_search_signature') != search_signature:
+    st.session_state['marketplace_search_signature'] = search_signature
+    st.session_state['marketplace_page_cursors'] = [None]
+page_cursors = st.session_state['marketplace_page_cursors']
+
+# Search agents - only the visible page is fetched
+search_result = search_agents_with_facets(
+    query=search_query,
+    filters=filters if filters else None,
+    limit=page_size,
+    sort=SORT_OPTIONS[sort_by],
+    cursor=page_cursors[-1]
+)
+agents = search_result['agents']
+facets = search_result['facets']
+
+with col2:
+    # Authors present in the current results, keeping the active selection
+    authors = sorted(set(facets['author']) | ({author_filter} - {'All Authors'}))
+    st.selectbox(
+        "Filter by author",
+        options=['All Authors'] + authors,
+        key='marketplace_author_filter',
+        format_func=lambda a: a if a == 'All Authors' else f"{a} ({facets['author'].get(a, 0)})"
+    )
+
+with col3:
+    # Get available models
+    models = list(get_available_models().keys())
+    st.selectbox(
+        "Filter by model",
+        options=['All Models'] + models,
+        key='marketplace_model_filter',
+        format_func=lambda m: m if m == 'All Models' else f"{get_model_info(m)['name']} ({facets['model'].get(m, 0)})"
+    )
+
+# Page navigation
+total_results = search_result['total']
+col_prev, col_page, col_next = st.columns([1, 2, 1])
+with col_prev:
+    if st.button("⬅️ Previous", use_container_width=True, disabled=len(page_cursors) <= 1):
+        page_cursors.pop()
+        st.rerun()
+with col_page:
+    total_pages = max((total_results + page_size - 1) // page_size, 1)
+    st.caption(f"Page {len(page_cursors)} of {total_pages}")
+with col_next:
+    if st.button("Next ➡️", use_container_width=True, disabled=search_result['next_cursor'] is None):
+        page_cursors.append(search_result['next_cursor'])
+        st.rerun()
 
 st.divider()
 
@@ -128,22 +176,25 @@ def on_delete_agent(agent):
     st.session_state['agent_to_delete'] = agent
 
 # Display agents
-render_agent_grid(agents, on_try=on_try_agent, on_clone=on_clone_agent, on_delete=on_delete_agent)
+render_agent_grid(
+    agents,
+    on_try=on_try_agent,
+    on_clone=on_clone_agent,
+    on_delete=on_delete_agent,
+    compact=view_mode == '📋 List',
+    total=total_results,
+    offset=search_result['offset']
+)
 
 # Stats in sidebar
 with st.sidebar:
     st.markdown("### 📊 Marketplace Stats")
-    st.metric("Total Agents", len(all_agents))
-    st.metric("Search Results", len(agents))
+    st.metric("Total Agents", count_agents())
+    st.metric("Search Results", search_result['total'])
     
-    # Tool usage stats
+    # Tool usage stats (facet counts, already sorted by popularity)
     st.markdown("### 🧰 Popular Tools")
-    tool_counts = {}
-    for agent in all_agents:
-        for tool in agent.get('tools', []):
-            tool_counts[tool] = tool_counts.get(tool, 0) + 1
-    
-    for tool, count in sorted(tool_counts.items(), key=lambda x: x[1], reverse=True):
+    for tool, count in facets['tools'].items():
         st.markdown(f"- **{tool}**: {count} agent(s)")
     
     st.divider()
@@ -106,6 +106,29 @@ if mode == '🧩 No-Code Mode':
             label_visibility="collapsed"
         )
         
+        # Response caching
+        CACHE_OPTIONS = {'Auto': None, 'On': True, 'Off': False}
+        clone_cache = clone_agent.get('cache_responses') if clone_agent else None
+        cache_choice = st.selectbox(
+            "Response Caching",
+            options=list(CACHE_OPTIONS),
+            index=list(CACHE_OPTIONS.values()).index(clone_cache) if clone_cache in (True, False) else 0,
+            help="Reuse answers to repeated questions. Auto caches unless the agent uses live-data or file tools (web search, finance, file operations)."
+        )
+        
+        # Fallback models
+        fallback_models = st.multiselect(
+            "Fallback Models",
+            options=models,
+            default=[model for model in (clone_agent.get('fallback_models', []) if clone_agent else []) if model in models],
+            help="Models to switch to, in order, when the main model is rate-limited, failing or slow"
+        )
+        hedge_requests = st.checkbox(
+            "Hedge slow requests",
+            value=bool(clone_agent.get('hedge_requests')) if clone_agent else False,
+            help="Also ask the first fallback when the main model takes longer than usual, and keep whichever answers first. Uses extra requests."
+        )
+        
         # Submit button
         st.divider()
         submitted = st.form_submit_button(
@@ -129,6 +152,13 @@ if mode == '🧩 No-Code Mode':
                 'tools': selected_tools,
                 'prompt': system_prompt
             }
+            if CACHE_OPTIONS[cache_choice] is not None:
+                agent_data['cache_responses'] = CACHE_OPTIONS[cache_choice]
+            fallback_models = [model for model in fallback_models if model != selected_model]
+            if fallback_models:
+                agent_data['fallback_models'] = fallback_models
+                if hedge_requests:
+                    agent_data['hedge_requests'] = True
             
             try:
                 # Save agent
@@ -185,6 +215,9 @@ else:
             'tools': clone_agent.get('tools', []),
             'prompt': clone_agent.get('prompt', '')
         }
+        for field in ('cache_responses', 'fallback_models', 'hedge_requests'):
+            if field in clone_agent:
+                template[field] = clone_agent[field]
     
     # JSON editor
     agent_json = st.text_area(
@@ -249,6 +282,9 @@ else:
         
         ### Optional Fields
         - `tools` (array): List of tools (WebSearchTool, SummarizeTool, FileOpsTool, MathTool)
+        - `cache_responses` (boolean): Reuse answers to repeated questions (default: on, unless the agent uses WebSearchTool, YFinanceTool or FileOpsTool)
+        - `fallback_models` (array): Models to switch to, in order, when `model` is rate-limited, failing or slow
+        - `hedge_requests` (boolean): Also start the first fallback when `model` is slower than its usual p95 latency (default: off)
         
         ### Available Models (GroqCloud)
         - `llama-3.3-70b-versatile` (Recommended - Most capable)
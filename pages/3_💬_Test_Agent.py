@@ -8,7 +8,9 @@ import os
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.agent_manager import load_agents, save_chat
+from core.agent_manager import load_agents, get_agent_by_name, save_chat
+from core.metrics import get_metrics
+from core.response_cache import caching_enabled, get_response_cache
 from ui.components.agent_card import render_agent_summary
 from ui.components.chat_box import render_chat_interface, clear_chat_history, export_chat_messages
 
@@ -46,10 +48,7 @@ if not selected_agent:
     )
     
     # Get selected agent
-    selected_agent = next(
-        (agent for agent in agents if agent.get('name') == selected_name),
-        agents[0]
-    )
+    selected_agent = get_agent_by_name(selected_name) or agents[0]
 else:
     # Show selected agent with option to change
     col1, col2 = st.columns([3, 1])
@@ -131,6 +130,42 @@ with st.sidebar:
     else:
         st.caption("No messages yet")
     
+    # Response cache counters (shared by all agents in this process)
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cache_stats = response_cache.stats()
+        st.metric("Cache Hits", cache_stats['hits'], help=f"{cache_stats['misses']} misses, {cache_stats['size']} cached replies")
+        if not caching_enabled(selected_agent):
+            st.caption("Responses from this agent are not cached")
+    
+    st.divider()
+    
+    # Latency of recent runs of this agent
+    st.markdown("### ⏱️ Latency")
+    agent_key = selected_agent.get('id') or selected_agent.get('name')
+    runs = get_metrics().recent(agent_key)
+    if runs:
+        summary = get_metrics().summary(agent_key)
+        
+        def format_ms(value):
+            return "—" if value is None else f"{value / 1000:.2f}s"
+        
+        col1, col2 = st.columns(2)
+        col1.metric("p50", format_ms(summary['latency_p50_ms']))
+        col2.metric("p95", format_ms(summary['latency_p95_ms']))
+        col1.metric("First Token", format_ms(summary['ttft_p50_ms']), help="Median time to the first streamed words")
+        col2.metric("Queue p95", format_ms(summary['queue_wait_p95_ms']), help="Time waiting for the rate limit and a free model slot")
+        st.line_chart([run['latency_ms'] / 1000 for run in runs[-50:]], height=120)
+        
+        st.caption(
+            f"{summary['runs']} runs, {summary['errors']} errors, {summary['cache_hits']} cached · "
+            f"{summary['prompt_tokens'] + summary['completion_tokens']:,} tokens (≈${summary['cost_usd']:.4f})"
+        )
+        for tool, timing in summary['tools'].items():
+            st.caption(f"🔧 {tool}: {timing['calls']} calls, median {format_ms(timing['p50_ms'])}")
+    else:
+        st.caption("No runs measured yet")
+    
     st.divider()
     
     # Quick actions
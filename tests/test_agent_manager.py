@@ -306,6 +306,184 @@ class TestAgentManager:
         assert len(loaded_agents) == 2
         assert loaded_agents[0]['name'] == 'Test Agent 1'
         assert loaded_agents[1]['name'] == 'Test Agent 2'
+    
+    def test_load_agents_uses_cache(self, temp_data_dir, monkeypatch):
+        """Test that unchanged agent files are not re-parsed"""
+        create_agent({
+            'name': 'Cached Agent',
+            'author': 'Test',
+            'description': 'Test',
+            'model': 'llama-3.3-70b-versatile',
+            'tools': [],
+            'prompt': 'Test'
+        })
+        load_agents()
+        
+        import core.agent_manager as am
+        calls = []
+        original_load = am.json.load
+        monkeypatch.setattr(am.json, 'load', lambda f: calls.append(f) or original_load(f))
+        
+        assert load_agents()[0]['name'] == 'Cached Agent'
+        assert get_agent_by_name('Cached Agent') is not None
+        assert search_agents(query='cached')
+        assert calls == []
+    
+    def test_lookup_indexes_follow_mutations(self, temp_data_dir):
+        """Test that id and name lookups stay consistent across update/delete"""
+        created = create_agent({
+            'name': 'Indexed',
+            'author': 'Test',
+            'description': 'Test',
+            'model': 'llama-3.3-70b-versatile',
+            'tools': [],
+            'prompt': 'Test'
+        })
+        
+        update_agent(created['id'], {
+            'name': 'Renamed',
+            'author': 'Test',
+            'description': 'Test',
+            'model': 'llama-3.3-70b-versatile',
+            'tools': [],
+            'prompt': 'Test'
+        })
+        assert get_agent_by_name('Indexed') is None
+        assert get_agent_by_name('Renamed')['id'] == created['id']
+        assert load_agents()[0]['name'] == 'Renamed'
+        
+        delete_agent(created['id'])
+        assert get_agent(created['id']) is None
+        assert get_agent_by_name('Renamed') is None
+    
+    def test_ids_are_not_reused_after_delete(self, temp_data_dir):
+        """Test that generated ids keep increasing across deletions"""
+        agent_data = {
+            'name': 'Counter',
+            'author': 'Test',
+            'description': 'Test',
+            'model': 'llama-3.3-70b-versatile',
+            'tools': [],
+            'prompt': 'Test'
+        }
+        first = create_agent(dict(agent_data))
+        second = create_agent(dict(agent_data))
+        delete_agent(second['id'])
+        third = create_agent(dict(agent_data))
+        
+        assert first['id'] == 'agent_001'
+        assert third['id'] == 'agent_003'
+        
+        # The high-water mark survives a cold cache
+        import core.agent_manager as am
+        am.invalidate_agent_cache()
+        delete_agent(third['id'])
+        assert create_agent(dict(agent_data))['id'] == 'agent_004'
+    
+    def test_ids_past_999(self, temp_data_dir):
+        """Test id allocation beyond three digits"""
+        save_agents([{'id': 'agent_999', 'name': 'Last three-digit'}])
+        created = create_agent({'name': 'Four digits'})
+        assert created['id'] == 'agent_1000'
+        assert create_agent({'name': 'Next'})['id'] == 'agent_1001'
+    
+    def test_sqlite_backend(self, temp_data_dir, monkeypatch):
+        """Test the public API on the SQLite backend after migration"""
+        save_agents([{'id': 'agent_001', 'name': 'Migrated', 'author': 'Test', 'tools': []}])
+        
+        import core.agent_manager as am
+        monkeypatch.setattr(am, 'AGENTS_DB_FILE', str(temp_data_dir / "agents.db"))
+        assert am.migrate_to_sqlite() == 1
+        monkeypatch.setattr(am, 'STORAGE_BACKEND', 'sqlite')
+        
+        created = create_agent({'name': 'Fresh', 'author': 'Test', 'tools': []})
+        assert created['id'] == 'agent_002'
+        assert get_agent('agent_001')['name'] == 'Migrated'
+        assert [a['name'] for a in search_agents(query='fresh')] == ['Fresh']
+        assert update_agent('agent_002', {'name': 'Renamed', 'tools': []}) is True
+        assert get_agent_by_name('Renamed')['id'] == 'agent_002'
+        assert delete_agent('agent_001') is True
+        assert [a['id'] for a in load_agents()] == ['agent_002']
+        am.get_store().close()
+    
+    def test_migration_includes_journal(self, temp_data_dir, monkeypatch):
+        """Test that changes still in agents.json.journal are migrated"""
+        first = create_agent({'name': 'First', 'author': 'Test', 'tools': []})
+        second = create_agent({'name': 'Second', 'author': 'Test', 'tools': []})
+        third = create_agent({'name': 'Third', 'author': 'Test', 'tools': []})
+        update_agent(second['id'], {'name': 'Second v2', 'author': 'Test', 'tools': []})
+        delete_agent(third['id'])
+        
+        import core.agent_manager as am
+        monkeypatch.setattr(am, 'AGENTS_DB_FILE', str(temp_data_dir / "agents.db"))
+        assert am.migrate_to_sqlite() == 2
+        monkeypatch.setattr(am, 'STORAGE_BACKEND', 'sqlite')
+        
+        assert [a['name'] for a in load_agents()] == ['First', 'Second v2']
+        assert get_agent(first['id'])['name'] == 'First'
+        # The deleted agent's id is not handed out again
+        assert create_agent({'name': 'Fourth', 'tools': []})['id'] == 'agent_004'
+        am.get_store().close()
+    
+    def test_search_pages_with_cursor(self, temp_data_dir):
+        """Test walking sorted search results page by page"""
+        from core.agent_manager import search_agents_with_facets
+        
+        for name in ['Delta', 'alpha', 'Charlie', 'Bravo', 'Echo']:
+            create_agent({'name': name, 'author': 'Test', 'tools': []})
+        
+        seen = []
+        cursor = None
+        while True:
+            page = search_agents_with_facets(limit=2, sort='name', cursor=cursor)
+            assert page['total'] == 5
+            seen.extend(a['name'] for a in page['agents'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert seen == ['alpha', 'Bravo', 'Charlie', 'Delta', 'Echo']
+        assert [a['name'] for a in search_agents(sort='name_desc', limit=2)] == ['Echo', 'Delta']
+    
+    def test_change_listeners(self, temp_data_dir):
+        """Test that updates and deletes notify registered listeners"""
+        import core.agent_manager as am
+        
+        changed = []
+        am.add_change_listener(changed.append)
+        try:
+            created = create_agent({'name': 'Watched', 'author': 'Test', 'tools': []})
+            update_agent(created['id'], {'name': 'Watched 2', 'tools': []})
+            update_agent('agent_missing', {'name': 'Nobody'})
+            delete_agent(created['id'])
+            save_agents([])
+        finally:
+            am.remove_change_listener(changed.append)
+        
+        assert changed == [created['id'], created['id'], None]
+    
+    def test_load_agents_sees_external_changes(self, temp_data_dir):
+        """Test that edits made outside the process invalidate the cache"""
+        create_agent({
+            'name': 'Before',
+            'author': 'Test',
+            'description': 'Test',
+            'model': 'llama-3.3-70b-versatile',
+            'tools': [],
+            'prompt': 'Test'
+        })
+        assert load_agents()[0]['name'] == 'Before'
+        
+        # Fold the journal into agents.json before editing it by hand
+        import core.agent_manager as am
+        am.get_store().compact()
+        
+        agents_file = temp_data_dir / "agents.json"
+        agents = json.loads(agents_file.read_text())
+        agents[0]['name'] = 'After edit'
+        agents_file.write_text(json.dumps(agents))
+        
+        assert load_agents()[0]['name'] == 'After edit'
 
 
 if __name__ == '__main__':
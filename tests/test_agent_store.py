@@ -0,0 +1,409 @@
+"""
+Test cases for Agent Store backends
+"""
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.agent_store import AgentStore, AgentVersionConflict, JsonAgentStore, SqliteAgentStore, migrate_json_to_sqlite
+
+
+def make_agent(name, author='Test', model='llama-3.3-70b-versatile', tools=None, description='Test'):
+    """Build agent data for tests"""
+    return {
+        'name': name,
+        'author': author,
+        'description': description,
+        'model': model,
+        'tools': tools or [],
+        'prompt': 'Test',
+        'created_at': '2025-10-22'
+    }
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    """Create an empty store for each backend"""
+    if request.param == 'json':
+        path = tmp_path / "agents.json"
+        path.write_text("[]")
+        yield JsonAgentStore(str(path))
+    else:
+        sqlite_store = SqliteAgentStore(str(tmp_path / "agents.db"))
+        yield sqlite_store
+        sqlite_store.close()
+
+
+class TestAgentStore:
+    """Test suite shared by all storage backends"""
+    
+    def test_crud_round_trip(self, store):
+        """Test create, get, update and delete"""
+        created = store.create(make_agent('Alpha'))
+        assert created['id'] == 'agent_001'
+        assert store.get('agent_001')['name'] == 'Alpha'
+        assert store.get_by_name('Alpha')['id'] == 'agent_001'
+        
+        assert store.update('agent_001', make_agent('Beta')) is True
+        assert store.get('agent_001')['name'] == 'Beta'
+        assert store.get_by_name('Alpha') is None
+        
+        assert store.delete('agent_001') is True
+        assert store.get('agent_001') is None
+        assert store.delete('agent_001') is False
+    
+    def test_update_preserves_created_at(self, store):
+        """Test that updates keep the original creation date"""
+        store.create(make_agent('Alpha'))
+        updated = make_agent('Alpha')
+        updated['created_at'] = '1999-01-01'
+        store.update('agent_001', updated)
+        assert store.get('agent_001')['created_at'] == '2025-10-22'
+    
+    def test_versions_reject_stale_updates(self, store):
+        """Test that an update based on an old version is refused"""
+        assert store.create(make_agent('Alpha'))['version'] == 1
+        
+        assert store.update('agent_001', make_agent('Beta'), expected_version=1) is True
+        assert store.get('agent_001')['version'] == 2
+        
+        with pytest.raises(AgentVersionConflict):
+            store.update('agent_001', make_agent('Stale'), expected_version=1)
+        with pytest.raises(AgentVersionConflict):
+            store.update('agent_001', dict(make_agent('Stale'), version=1))
+        assert store.get('agent_001')['name'] == 'Beta'
+        
+        # Updates that do not name a version always apply
+        assert store.update('agent_001', make_agent('Gamma')) is True
+        assert store.get('agent_001')['version'] == 3
+    
+    def test_load_all_keeps_insertion_order(self, store):
+        """Test that agents come back in insertion order after updates"""
+        for name in ['One', 'Two', 'Three']:
+            store.create(make_agent(name))
+        store.update('agent_001', make_agent('One again'))
+        
+        assert [a['name'] for a in store.load_all()] == ['One again', 'Two', 'Three']
+        assert store.count() == 3
+    
+    def test_replace_all(self, store):
+        """Test replacing the whole catalog"""
+        store.create(make_agent('Old'))
+        store.replace_all([dict(make_agent('New'), id='agent_010')])
+        
+        assert [a['name'] for a in store.load_all()] == ['New']
+        assert store.create(make_agent('Next'))['id'] == 'agent_011'
+    
+    def test_search_filters(self, store):
+        """Test search with query and filters"""
+        store.create(make_agent('Python Expert', author='Alice', tools=['WebSearchTool']))
+        store.create(make_agent('JavaScript Expert', author='Bob', model='llama-3.1-8b-instant'))
+        
+        assert [a['name'] for a in store.search('python')] == ['Python Expert']
+        assert [a['name'] for a in store.search(filters={'author': 'Bob'})] == ['JavaScript Expert']
+        assert [a['name'] for a in store.search(filters={'tools': ['WebSearchTool']})] == ['Python Expert']
+    
+    def test_search_prefix_and_ranking(self, store):
+        """Test prefix matching and that name matches outrank description matches"""
+        store.create(make_agent('Helper', description='Writes python scripts'))
+        store.create(make_agent('Python Tutor'))
+        store.create(make_agent('Web Researcher', tools=['WebSearchTool']))
+        
+        assert [a['name'] for a in store.search('pyth')] == ['Python Tutor', 'Helper']
+        assert [a['name'] for a in store.search('search')] == ['Web Researcher']
+        assert [a['name'] for a in store.search('python tut')] == ['Python Tutor']
+        assert store.search('nothing matches this') == []
+    
+    def test_search_tracks_mutations(self, store):
+        """Test that the index follows updates and deletes"""
+        store.create(make_agent('Alpha'))
+        assert store.search('alpha')
+        
+        store.update('agent_001', make_agent('Beta'))
+        assert store.search('alpha') == []
+        assert [a['name'] for a in store.search('beta')] == ['Beta']
+        
+        store.delete('agent_001')
+        assert store.search('beta') == []
+    
+    def test_search_limit_offset(self, store):
+        """Test paging through search results"""
+        for i in range(5):
+            store.create(make_agent(f'Agent {i}'))
+        
+        assert [a['name'] for a in store.search(limit=2)] == ['Agent 0', 'Agent 1']
+        assert [a['name'] for a in store.search(limit=2, offset=4)] == ['Agent 4']
+        assert [a['name'] for a in store.search('agent', offset=3)] == ['Agent 3', 'Agent 4']
+    
+    def test_facet_filters_combine(self, store):
+        """Test OR within a facet and AND across facets"""
+        store.create(make_agent('A', author='Alice', tools=['WebSearchTool']))
+        store.create(make_agent('B', author='Bob', tools=['MathTool']))
+        store.create(make_agent('C', author='Alice', model='gemma2-9b-it', tools=['MathTool', 'FileOpsTool']))
+        
+        names = lambda filters: [a['name'] for a in store.search(filters=filters)]
+        assert names({'author': ['Alice', 'Bob']}) == ['A', 'B', 'C']
+        assert names({'author': 'Alice', 'tools': ['MathTool']}) == ['C']
+        assert names({'tools': ['WebSearchTool', 'FileOpsTool']}) == ['A', 'C']
+        assert names({'author': 'Bob', 'model': 'gemma2-9b-it'}) == []
+    
+    def test_find_returns_totals_and_facets(self, store):
+        """Test facet counts alongside a page of results"""
+        store.create(make_agent('Research A', author='Alice', tools=['WebSearchTool']))
+        store.create(make_agent('Research B', author='Bob', tools=['WebSearchTool', 'MathTool']))
+        store.create(make_agent('Calculator', author='Bob', model='llama-3.1-8b-instant', tools=['MathTool']))
+        
+        result = store.find('research', {'author': 'Bob'}, limit=1, with_facets=True)
+        
+        assert [a['name'] for a in result['agents']] == ['Research B']
+        assert result['total'] == 1
+        # The author facet ignores the author filter but respects the query
+        assert result['facets']['author'] == {'Alice': 1, 'Bob': 1}
+        assert result['facets']['model'] == {'llama-3.3-70b-versatile': 1}
+        assert result['facets']['tools'] == {'MathTool': 1, 'WebSearchTool': 1}
+        
+        everything = store.find(with_facets=True)
+        assert everything['total'] == 3
+        assert everything['facets']['tools'] == {'MathTool': 2, 'WebSearchTool': 2}
+    
+    def test_sorted_search(self, store):
+        """Test field sort orders with filters and paging"""
+        store.replace_all([
+            dict(make_agent('beta', tools=['MathTool']), id='agent_001', created_at='2025-01-02'),
+            dict(make_agent('Alpha', tools=['MathTool']), id='agent_002', created_at='2025-01-03'),
+            dict(make_agent('Gamma'), id='agent_003', created_at='2025-01-01'),
+        ])
+        
+        names = lambda **kwargs: [a['name'] for a in store.search(**kwargs)]
+        assert names(sort='name') == ['Alpha', 'beta', 'Gamma']
+        assert names(sort='name_desc', limit=1) == ['Gamma']
+        assert names(sort='newest') == ['Alpha', 'beta', 'Gamma']
+        assert names(sort='newest', filters={'tools': ['MathTool']}, offset=1) == ['beta']
+        with pytest.raises(ValueError):
+            store.search(sort='bogus')
+    
+    def test_incomplete_backend_cannot_be_created(self):
+        """Test that a backend missing abstract methods fails on instantiation"""
+        class ReadOnlyStore(AgentStore):
+            def load_all(self):
+                return []
+        
+        with pytest.raises(TypeError):
+            ReadOnlyStore()
+
+
+class TestJsonAgentStore:
+    """Test suite for the JSON snapshot + journal store"""
+    
+    @pytest.fixture
+    def path(self, tmp_path):
+        """Path of an empty agents.json"""
+        path = tmp_path / "agents.json"
+        path.write_text("[]")
+        return str(path)
+    
+    def test_mutations_append_to_journal(self, path):
+        """Test that mutations leave the snapshot alone and are replayed on load"""
+        store = JsonAgentStore(path)
+        store.create(make_agent('Alpha'))
+        store.create(make_agent('Beta'))
+        store.update('agent_001', make_agent('Alpha 2'))
+        store.delete('agent_002')
+        
+        with open(path) as f:
+            assert json.load(f) == []
+        with open(path + ".journal") as f:
+            assert [json.loads(line)['op'] for line in f] == ['create', 'create', 'update', 'delete']
+        
+        reloaded = JsonAgentStore(path)
+        assert [a['name'] for a in reloaded.load_all()] == ['Alpha 2']
+        assert reloaded.create(make_agent('Gamma'))['id'] == 'agent_003'
+    
+    def test_compaction_writes_snapshot(self, path, monkeypatch):
+        """Test that the journal is folded into the snapshot at the threshold"""
+        import core.agent_store as agent_store
+        monkeypatch.setattr(agent_store, 'JOURNAL_COMPACT_THRESHOLD', 3)
+        
+        store = JsonAgentStore(path)
+        for name in ['One', 'Two', 'Three', 'Four']:
+            store.create(make_agent(name))
+        
+        with open(path) as f:
+            assert [a['name'] for a in json.load(f)] == ['One', 'Two', 'Three']
+        with open(path + ".journal") as f:
+            assert len(f.readlines()) == 1
+        assert [a['name'] for a in JsonAgentStore(path).load_all()] == ['One', 'Two', 'Three', 'Four']
+        assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith('.tmp')]
+    
+    def test_torn_journal_tail_is_ignored(self, path):
+        """Test recovery from a crash in the middle of an append"""
+        store = JsonAgentStore(path)
+        store.create(make_agent('Survivor'))
+        with open(path + ".journal", 'a') as f:
+            f.write('{"op": "create", "agent": {"id": "agent_0')
+        
+        recovered = JsonAgentStore(path)
+        assert [a['name'] for a in recovered.load_all()] == ['Survivor']
+        recovered.create(make_agent('After crash'))
+        
+        assert [a['name'] for a in JsonAgentStore(path).load_all()] == ['Survivor', 'After crash']
+    
+    def test_replay_after_interrupted_compaction(self, path):
+        """Test that a journal left over after a new snapshot replays cleanly"""
+        store = JsonAgentStore(path)
+        store.create(make_agent('Alpha'))
+        store.create(make_agent('Beta'))
+        store.delete('agent_001')
+        with open(path + ".journal") as f:
+            journal = f.read()
+        
+        store.compact()
+        # Simulate a crash between the snapshot rename and the journal reset
+        with open(path + ".journal", 'w') as f:
+            f.write(journal)
+        
+        assert [a['name'] for a in JsonAgentStore(path).load_all()] == ['Beta']
+    
+    @pytest.mark.skipif(os.name == 'nt', reason="Needs SIGKILL")
+    def test_survives_kill_during_writes(self, path, monkeypatch):
+        """Test that killing a writer mid-stream leaves a loadable store"""
+        import signal
+        import subprocess
+        import time
+        
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = (
+            "import sys; sys.path.insert(0, sys.argv[1])\n"
+            "import core.agent_store as s\n"
+            "s.JOURNAL_COMPACT_THRESHOLD = 25\n"
+            "store = s.JsonAgentStore(sys.argv[2])\n"
+            "while True:\n"
+            "    store.create({'name': 'x' * 200, 'tools': []})\n"
+        )
+        writer = subprocess.Popen([sys.executable, '-c', script, repo_root, path])
+        time.sleep(1.0)
+        writer.send_signal(signal.SIGKILL)
+        writer.wait()
+        
+        agents = JsonAgentStore(path).load_all()
+        ids = [a['id'] for a in agents]
+        assert agents
+        assert len(ids) == len(set(ids))
+        # Ids are dense: nothing acknowledged before the kill went missing
+        assert ids == [f"agent_{n:03d}" for n in range(1, len(ids) + 1)]
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_concurrent_writers_lose_nothing(backend, tmp_path):
+    """Test that several processes writing one store lose no updates"""
+    import subprocess
+    
+    if backend == 'json':
+        path = tmp_path / "agents.json"
+        path.write_text("[]")
+        store = JsonAgentStore(str(path))
+    else:
+        path = tmp_path / "agents.db"
+        store = SqliteAgentStore(str(path))
+    counter = store.create(dict(make_agent('Counter'), count=0))
+    
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1])\n"
+        "import core.agent_store as s\n"
+        "s.JOURNAL_COMPACT_THRESHOLD = 7\n"
+        "store = (s.JsonAgentStore if sys.argv[2] == 'json' else s.SqliteAgentStore)(sys.argv[3])\n"
+        "for i in range(20):\n"
+        "    store.create({'name': sys.argv[4] + '-' + str(i), 'tools': []})\n"
+        "    while True:\n"
+        "        agent = dict(store.get(sys.argv[5]))\n"
+        "        agent['count'] += 1\n"
+        "        try:\n"
+        "            store.update(sys.argv[5], agent)\n"
+        "            break\n"
+        "        except s.AgentVersionConflict:\n"
+        "            continue\n"
+    )
+    workers = [
+        subprocess.Popen([sys.executable, '-c', script, repo_root, backend, str(path),
+                          f"worker{n}", counter['id']])
+        for n in range(4)
+    ]
+    assert [worker.wait(timeout=120) for worker in workers] == [0] * 4
+    
+    store.invalidate()
+    agents = store.load_all()
+    ids = [a['id'] for a in agents]
+    assert len(agents) == 1 + 4 * 20
+    assert len(ids) == len(set(ids))
+    assert store.get(counter['id'])['count'] == 4 * 20
+    assert store.get(counter['id'])['version'] == 1 + 4 * 20
+    if backend == 'sqlite':
+        store.close()
+
+
+class TestSqliteAgentStore:
+    """Test suite for SQLite-specific behaviour"""
+    
+    def test_uses_wal_mode(self, tmp_path):
+        """Test that the database runs in WAL mode"""
+        store = SqliteAgentStore(str(tmp_path / "agents.db"))
+        mode = store._connect().execute("PRAGMA journal_mode").fetchone()[0]
+        store.close()
+        assert mode == 'wal'
+    
+    def test_sees_writes_from_other_connections(self, tmp_path):
+        """Test that cached reads pick up commits from another connection"""
+        path = str(tmp_path / "agents.db")
+        reader = SqliteAgentStore(path)
+        writer = SqliteAgentStore(path)
+        
+        writer.create(make_agent('First'))
+        assert len(reader.load_all()) == 1
+        writer.create(make_agent('Second'))
+        assert len(reader.load_all()) == 2
+        
+        reader.close()
+        writer.close()
+    
+    def test_migrate_json_to_sqlite(self, tmp_path):
+        """Test the one-shot migration from agents.json"""
+        json_path = tmp_path / "agents.json"
+        json_path.write_text(json.dumps([
+            dict(make_agent('Research Analyst'), id='agent_001'),
+            dict(make_agent('Code Assistant'), id='agent_007'),
+        ]))
+        db_path = str(tmp_path / "agents.db")
+        
+        assert migrate_json_to_sqlite(str(json_path), db_path) == 2
+        # Running it again copies nothing new
+        assert migrate_json_to_sqlite(str(json_path), db_path) == 0
+        
+        store = SqliteAgentStore(db_path)
+        assert [a['id'] for a in store.load_all()] == ['agent_001', 'agent_007']
+        assert store.create(make_agent('New'))['id'] == 'agent_008'
+        store.close()
+    
+    def test_backfills_derived_indexes(self, tmp_path):
+        """Test that databases created without the index tables get indexed"""
+        path = str(tmp_path / "agents.db")
+        store = SqliteAgentStore(path)
+        store.create(make_agent('Legacy Agent', tools=['MathTool']))
+        conn = store._connect()
+        conn.execute("DELETE FROM agents_fts")
+        conn.execute("DELETE FROM agent_tools")
+        conn.execute("DELETE FROM meta WHERE key = 'index_version'")
+        store.close()
+        
+        reopened = SqliteAgentStore(path)
+        assert [a['name'] for a in reopened.search('legacy')] == ['Legacy Agent']
+        assert reopened.find(filters={'tools': ['MathTool']})['total'] == 1
+        reopened.close()
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
@@ -0,0 +1,107 @@
+"""
+Test cases for the batch runner
+"""
+import pytest
+import json
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("agno")
+
+import core.batch as batch
+from core.batch import completed_ids, load_prompts, run_batch
+
+
+class RateLimitError(Exception):
+    """Stand-in for a provider 429 error"""
+    status_code = 429
+
+
+@pytest.fixture
+def prompts_file(tmp_path):
+    """A JSONL file with three prompts"""
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('\n'.join([
+        json.dumps({'id': 'a', 'input': 'First'}),
+        json.dumps({'prompt': 'Second'}),
+        json.dumps('Third'),
+    ]) + '\n')
+    return str(path)
+
+
+@pytest.fixture
+def fake_runner(monkeypatch):
+    """Replace AgentRunner with a double whose failures can be scripted"""
+    calls = []
+    failures = {}
+    
+    class FakeRunner:
+        def __init__(self, agent):
+            self.cache_responses = True
+            self.max_retries = None
+        
+        def complete(self, user_input, chat_history=None):
+            calls.append((user_input, self.max_retries))
+            pending = failures.get(user_input)
+            if pending:
+                raise pending.pop(0)
+            return user_input.upper()
+    
+    monkeypatch.setattr(batch, 'AgentRunner', FakeRunner)
+    return calls, failures
+
+
+def read_results(path):
+    with open(path) as f:
+        return {record['id']: record for record in map(json.loads, f)}
+
+
+class TestBatch:
+    """Test suite for run_batch"""
+    
+    def test_load_prompts(self, prompts_file):
+        """Test the accepted input line formats"""
+        prompts = load_prompts(prompts_file)
+        assert [(p['id'], p['input']) for p in prompts] == [('a', 'First'), ('2', 'Second'), ('3', 'Third')]
+    
+    def test_runs_every_prompt(self, prompts_file, tmp_path, fake_runner):
+        """Test that every prompt produces one result line"""
+        output = str(tmp_path / "out.jsonl")
+        summary = run_batch({'name': 'Agent'}, load_prompts(prompts_file), output, concurrency=2)
+        
+        assert summary == {'total': 3, 'skipped': 0, 'succeeded': 3, 'failed': 0}
+        results = read_results(output)
+        assert results['a']['output'] == 'FIRST'
+        assert results['3'] == dict(results['3'], output='THIRD', error=None)
+    
+    def test_retry_budget_is_left_to_the_runner(self, prompts_file, tmp_path, fake_runner):
+        """Test that each prompt is run once with the batch's retry budget"""
+        calls, failures = fake_runner
+        failures['First'] = [RateLimitError("Rate limit reached. Please try again in 1ms")]
+        failures['Third'] = [ValueError("Invalid request")]
+        
+        output = str(tmp_path / "out.jsonl")
+        summary = run_batch({'name': 'Agent'}, load_prompts(prompts_file), output, concurrency=1, retries=2)
+        
+        assert sorted(calls) == [('First', 2), ('Second', 2), ('Third', 2)]
+        results = read_results(output)
+        assert 'Rate limit' in results['a']['error']
+        assert 'Invalid request' in results['3']['error']
+        assert summary['failed'] == 2
+    
+    def test_resume_skips_completed_prompts(self, prompts_file, tmp_path, fake_runner):
+        """Test that a rerun only repeats prompts without a successful result"""
+        calls, failures = fake_runner
+        failures['Second'] = [ValueError("Invalid request")]
+        output = str(tmp_path / "out.jsonl")
+        run_batch({'name': 'Agent'}, load_prompts(prompts_file), output)
+        assert completed_ids(output) == {'a', '3'}
+        
+        calls.clear()
+        summary = run_batch({'name': 'Agent'}, load_prompts(prompts_file), output)
+        assert [call[0] for call in calls] == ['Second']
+        assert summary['skipped'] == 2
+        assert completed_ids(output) == {'a', '2', '3'}
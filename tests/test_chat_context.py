@@ -0,0 +1,81 @@
+"""
+Test cases for the chat history context window
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.chat_context import (
+    MAX_HISTORY_TOKENS,
+    RESPONSE_TOKEN_RESERVE,
+    estimate_tokens,
+    history_budget,
+    message_tokens,
+    select_history,
+)
+
+
+def turn(role, content):
+    """Build a chat message"""
+    return {'role': role, 'content': content}
+
+
+class TestTokenCounts:
+    """Test suite for token estimates"""
+    
+    def test_estimate_tokens(self):
+        """Test the character-based estimate"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+    
+    def test_counts_leave_messages_untouched(self):
+        """Test that counting adds nothing to the message and follows edits"""
+        message = turn('user', 'x' * 40)
+        first = message_tokens(message)
+        assert message == turn('user', 'x' * 40)
+        
+        message['content'] = 'x' * 80
+        assert message_tokens(message) > first
+    
+    def test_budget_depends_on_model(self):
+        """Test that small-context models get a smaller history budget"""
+        assert history_budget('llama-3.3-70b-versatile') == MAX_HISTORY_TOKENS
+        small = history_budget('gemma2-9b-it', system_prompt='x' * 4000)
+        assert small < 8192 - RESPONSE_TOKEN_RESERVE - 1000
+        assert history_budget('gemma2-9b-it', user_input='x' * 100000) == 0
+
+
+class TestSelectHistory:
+    """Test suite for the sliding window"""
+    
+    def test_excludes_current_input(self):
+        """Test that the message being answered is not sent twice"""
+        history = [turn('user', 'Hi'), turn('assistant', 'Hello'), turn('user', 'How are you?')]
+        selected = select_history(history, 1000, current_input='How are you?')
+        assert [m['content'] for m in selected] == ['Hi', 'Hello']
+    
+    def test_drops_oldest_turns_past_budget(self):
+        """Test that only the most recent turns that fit are kept"""
+        history = []
+        for n in range(10):
+            history.append(turn('user', f"question {n} " + 'x' * 40))
+            history.append(turn('assistant', f"answer {n} " + 'y' * 40))
+        
+        budget = sum(message_tokens(m) for m in history[-4:])
+        selected = select_history(history, budget)
+        assert selected == history[-4:]
+        assert select_history(history, 0) == []
+    
+    def test_window_starts_with_user_turn(self):
+        """Test that an orphaned assistant reply is not left at the start"""
+        history = [turn('user', 'x' * 400), turn('assistant', 'short'), turn('user', 'next')]
+        budget = message_tokens(history[1]) + message_tokens(history[2])
+        assert select_history(history, budget) == [history[2]]
+    
+    def test_skips_other_roles_and_empty_messages(self):
+        """Test that only user and assistant content is sent"""
+        history = [turn('system', 'ignored'), turn('user', ''), turn('user', 'Hi'), turn('assistant', 'Hey')]
+        assert [m['content'] for m in select_history(history, 1000)] == ['Hi', 'Hey']
@@ -0,0 +1,282 @@
+"""
+Test cases for GroqCloud rate limiting, retries and model routing
+"""
+import pytest
+import asyncio
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.groq_integration as groq_integration
+from core.groq_integration import (
+    ModelHealth,
+    RateLimiter,
+    TokenBucket,
+    backoff_delay,
+    call_with_retries,
+    acall_with_retries,
+    is_retryable,
+    retry_after,
+    route_models,
+    stream_with_retries,
+)
+
+
+class RateLimitError(Exception):
+    """Stand-in for a provider 429 error"""
+    status_code = 429
+
+
+class FakeResponse:
+    """Response carrying headers, as on HTTP client errors"""
+    
+    def __init__(self, headers, status_code=429):
+        self.headers = headers
+        self.status_code = status_code
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record sleeps instead of waiting, with a fresh limiter"""
+    slept = []
+    monkeypatch.setattr(groq_integration.time, 'sleep', slept.append)
+    
+    async def fake_async_sleep(seconds):
+        slept.append(seconds)
+    monkeypatch.setattr(groq_integration.asyncio, 'sleep', fake_async_sleep)
+    monkeypatch.setattr(groq_integration, '_rate_limiter', RateLimiter())
+    return slept
+
+
+class TestErrors:
+    """Test suite for error classification and backoff"""
+    
+    def test_is_retryable(self):
+        """Test that rate limits, 5xx and network failures are retried"""
+        assert is_retryable(RateLimitError("slow down"))
+        assert is_retryable(ConnectionError("reset"))
+        assert is_retryable(Exception("Service temporarily unavailable"))
+        assert not is_retryable(ValueError("bad input"))
+        
+        error = Exception("server error")
+        error.response = FakeResponse({}, status_code=503)
+        assert is_retryable(error)
+        error.response = FakeResponse({}, status_code=400)
+        assert not is_retryable(error)
+    
+    def test_retry_after(self):
+        """Test retry-after from headers and from Groq's error message"""
+        error = Exception("rate limited")
+        error.response = FakeResponse({'retry-after': '3'})
+        assert retry_after(error) == 3.0
+        assert retry_after(Exception("Please try again in 7.5s")) == 7.5
+        assert retry_after(Exception("Please try again in 250ms")) == 0.25
+        assert retry_after(Exception("nope")) is None
+    
+    def test_backoff_is_jittered_and_capped(self):
+        """Test exponential growth within jitter bounds"""
+        for attempt in range(4):
+            delay = backoff_delay(attempt)
+            base = groq_integration.BACKOFF_BASE * 2 ** attempt
+            assert base / 2 <= delay <= base
+        assert backoff_delay(50) <= groq_integration.BACKOFF_MAX
+        assert backoff_delay(0, Exception("try again in 9s")) == 9.0
+
+
+class TestRateLimiter:
+    """Test suite for the token-bucket limiter"""
+    
+    def test_token_bucket_reports_wait(self):
+        """Test that overdrawing the bucket yields the time to repay it"""
+        bucket = TokenBucket(capacity=10, per_second=2, now=0.0)
+        assert bucket.reserve(10, now=0.0) == 0.0
+        assert bucket.reserve(4, now=0.0) == 2.0
+        assert bucket.reserve(1, now=3.0) == pytest.approx(0.0)
+    
+    def test_request_limit(self):
+        """Test that calls beyond the per-minute budget must wait"""
+        limiter = RateLimiter()
+        rpm = groq_integration.AVAILABLE_MODELS['gemma2-9b-it']['rpm']
+        delays = [limiter.reserve('gemma2-9b-it', 1) for _ in range(rpm + 1)]
+        assert max(delays[:rpm]) == 0.0
+        assert delays[-1] == pytest.approx(60 / rpm, rel=0.01)
+    
+    def test_token_limit_and_usage_correction(self):
+        """Test the token budget and settling a reservation"""
+        limiter = RateLimiter()
+        tpm = groq_integration.AVAILABLE_MODELS['gemma2-9b-it']['tpm']
+        assert limiter.reserve('gemma2-9b-it', tpm) == 0.0
+        # The request used far fewer tokens than reserved
+        limiter.record_usage('gemma2-9b-it', tpm, 100)
+        assert limiter.reserve('gemma2-9b-it', 1000) == 0.0
+    
+    def test_pause_and_disabled_limits(self):
+        """Test the shared pause after a 429 and scale=0"""
+        limiter = RateLimiter()
+        limiter.pause('gemma2-9b-it', 5)
+        assert 4 < limiter.reserve('gemma2-9b-it', 1) <= 5
+        assert limiter.reserve('llama-3.1-8b-instant', 1) == 0.0
+        assert RateLimiter(scale=0).reserve('gemma2-9b-it', 10 ** 9) == 0.0
+
+
+class TestRetries:
+    """Test suite for retrying model calls"""
+    
+    def test_retries_rate_limit_then_succeeds(self, sleeps):
+        """Test that a 429 pauses the model and the call is retried"""
+        attempts = []
+        
+        def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RateLimitError("Rate limit reached. Please try again in 2s")
+            return "ok"
+        
+        assert call_with_retries('gemma2-9b-it', 10, call) == "ok"
+        assert len(attempts) == 2
+        # The second attempt waited out the pause set by the 429
+        assert sleeps and 1.5 < max(sleeps) <= 2.0
+    
+    def test_gives_up_after_max_retries(self, sleeps):
+        """Test that persistent transient errors are eventually raised"""
+        def call():
+            raise ConnectionError("connection reset")
+        
+        with pytest.raises(ConnectionError):
+            call_with_retries('gemma2-9b-it', 10, call, max_retries=2)
+        assert len([s for s in sleeps if s > 0]) == 2
+    
+    def test_does_not_retry_permanent_errors(self, sleeps):
+        """Test that bad requests fail immediately"""
+        attempts = []
+        
+        def call():
+            attempts.append(1)
+            raise ValueError("invalid model")
+        
+        with pytest.raises(ValueError):
+            call_with_retries('gemma2-9b-it', 10, call)
+        assert len(attempts) == 1
+    
+    def test_cancelled_call_stops_retrying(self, sleeps):
+        """Test that a call whose result is no longer wanted gives up at its next retry"""
+        import threading
+        attempts = []
+        cancelled = threading.Event()
+        
+        def call():
+            attempts.append(1)
+            cancelled.set()
+            raise ConnectionError("connection reset")
+        
+        with pytest.raises(ConnectionError):
+            call_with_retries('gemma2-9b-it', 10, call, cancelled=cancelled)
+        assert len(attempts) == 1
+    
+    def test_async_retries(self, sleeps):
+        """Test the async variant"""
+        attempts = []
+        
+        async def call():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise TimeoutError("timed out")
+            return "ok"
+        
+        assert asyncio.run(acall_with_retries('gemma2-9b-it', 10, call)) == "ok"
+        assert len(attempts) == 3
+    
+    def test_stream_retried_only_before_first_item(self, sleeps):
+        """Test that a stream failing mid-way is not replayed"""
+        starts = []
+        
+        def start():
+            starts.append(1)
+            if len(starts) == 1:
+                raise ConnectionError("connection refused")
+            yield "a"
+            raise ConnectionError("connection reset")
+        
+        received = []
+        with pytest.raises(ConnectionError):
+            for item in stream_with_retries('gemma2-9b-it', 10, start):
+                received.append(item)
+        assert starts == [1, 1]
+        assert received == ["a"]
+
+
+class TestRouting:
+    """Test suite for model health tracking and fallback routing"""
+    
+    def test_health_percentiles_and_error_rate(self):
+        """Test rolling p50/p95 over successful calls and the error rate"""
+        health = ModelHealth(window=20)
+        for seconds in range(1, 21):
+            health.record('gemma2-9b-it', float(seconds))
+        stats = health.stats('gemma2-9b-it')
+        assert (stats['p50'], stats['p95'], stats['error_rate']) == (10.0, 19.0, 0.0)
+        
+        for _ in range(10):
+            health.record('gemma2-9b-it', 0.1, RateLimitError("429"))
+        stats = health.stats('gemma2-9b-it')
+        assert stats['calls'] == 20
+        assert stats['error_rate'] == 0.5
+        assert health.is_degraded('gemma2-9b-it')
+        assert health.stats('llama-3.1-8b-instant') == {'calls': 0, 'error_rate': 0.0, 'p50': None, 'p95': None}
+    
+    def test_slow_model_is_degraded_and_sets_hedge_delay(self):
+        """Test that a slow p95 degrades a model and becomes its hedge delay"""
+        health = ModelHealth()
+        assert health.hedge_delay('gemma2-9b-it') == groq_integration.DEFAULT_HEDGE_SECONDS
+        for _ in range(groq_integration.MIN_HEALTH_SAMPLES):
+            health.record('gemma2-9b-it', groq_integration.MAX_P95_SECONDS + 1)
+        assert health.is_degraded('gemma2-9b-it')
+        assert health.hedge_delay('gemma2-9b-it') == groq_integration.MAX_P95_SECONDS + 1
+    
+    def test_route_skips_rate_limited_and_degraded_models(self, monkeypatch):
+        """Test that ready models keep their order ahead of struggling ones"""
+        limiter = RateLimiter()
+        health = ModelHealth()
+        monkeypatch.setattr(groq_integration, '_rate_limiter', limiter)
+        monkeypatch.setattr(groq_integration, '_model_health', health)
+        models = ['llama-3.3-70b-versatile', 'gemma2-9b-it', 'llama-3.1-8b-instant']
+        assert route_models(models, 100) == models
+        
+        limiter.pause('llama-3.3-70b-versatile', 30)
+        for _ in range(groq_integration.MIN_HEALTH_SAMPLES):
+            health.record('gemma2-9b-it', 1.0, RuntimeError("503 Service Unavailable"))
+        assert route_models(models, 100) == [
+            'llama-3.1-8b-instant', 'llama-3.3-70b-versatile', 'gemma2-9b-it'
+        ]
+
+
+class TestHttpClient:
+    """Test suite for the pooled HTTP client"""
+    
+    @pytest.fixture
+    def fresh_client(self, monkeypatch):
+        """Start without a shared client and close the one a test creates"""
+        monkeypatch.setattr(groq_integration, '_http_client', None)
+        yield
+        if groq_integration._http_client is not None:
+            groq_integration._http_client.close()
+    
+    def test_client_is_shared(self, fresh_client):
+        """Test that every caller gets the same pooled client"""
+        httpx = pytest.importorskip("httpx")
+        client = groq_integration.get_http_client()
+        assert isinstance(client, httpx.Client)
+        assert groq_integration.get_http_client() is client
+        assert client.timeout.connect == groq_integration.HTTP_CONNECT_TIMEOUT
+    
+    def test_models_use_shared_client(self, fresh_client):
+        """Test that Groq models are built around the shared client"""
+        pytest.importorskip("httpx")
+        pytest.importorskip("agno")
+        first = groq_integration.create_groq_model('llama-3.3-70b-versatile')
+        second = groq_integration.create_groq_model('gemma2-9b-it')
+        assert first.http_client is second.http_client is groq_integration.get_http_client()
+        # Async models are left to build their own per-loop AsyncClient
+        assert getattr(groq_integration.create_groq_model('gemma2-9b-it', for_async=True), 'http_client', None) is None
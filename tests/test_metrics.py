@@ -0,0 +1,128 @@
+"""
+Test cases for run metrics and their sinks
+"""
+import pytest
+import json
+import os
+import sys
+import urllib.request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.metrics import MetricsRecorder, PrometheusSink, RunMetrics, estimate_cost, summarize
+
+
+class FakeUsage:
+    """Run output carrying Agno-style token metrics"""
+    
+    def __init__(self, input_tokens, output_tokens):
+        self.metrics = type('Metrics', (), {'input_tokens': input_tokens, 'output_tokens': output_tokens})()
+
+
+def make_record(latency_ms, agent_id='agent_001', **fields):
+    """Finished run record with a fixed latency"""
+    record = RunMetrics(agent_id, 'Alpha', 'gemma2-9b-it', streamed=True).finish()
+    record.update(latency_ms=latency_ms, **fields)
+    return record
+
+
+class TestRunMetrics:
+    """Test suite for measuring a single run"""
+    
+    def test_record_fields(self):
+        """Test tokens, cost, tool timings and the error of a finished run"""
+        metrics = RunMetrics('agent_001', 'Alpha', 'gemma2-9b-it', streamed=True)
+        metrics.model_started()
+        metrics.first_content()
+        metrics.tool_event({'type': 'tool_call', 'status': 'started', 'tool': 'calculate'})
+        metrics.tool_event({'type': 'tool_call', 'status': 'completed', 'tool': 'calculate'})
+        metrics.add_usage(FakeUsage(1000, 500))
+        record = metrics.finish(ValueError("boom"))
+        
+        assert record['tool_calls'] == 1
+        assert record['tools'][0]['tool'] == 'calculate'
+        assert record['tools'][0]['ms'] is not None
+        assert (record['prompt_tokens'], record['completion_tokens']) == (1000, 500)
+        assert record['cost_usd'] == pytest.approx(estimate_cost('gemma2-9b-it', 1000, 500))
+        assert record['queue_wait_ms'] is not None and record['ttft_ms'] is not None
+        assert record['error'] == "ValueError: boom"
+    
+    def test_unknown_usage_has_no_cost(self):
+        """Test that missing token counts leave tokens and cost unset"""
+        record = RunMetrics('agent_001', 'Alpha', 'gemma2-9b-it', streamed=False).finish()
+        assert record['prompt_tokens'] is None
+        assert record['cost_usd'] is None
+        assert record['ttft_ms'] is None
+
+
+class TestSinks:
+    """Test suite for the ring buffer, JSONL and Prometheus sinks"""
+    
+    def test_ring_buffer_keeps_latest_runs_per_agent(self):
+        """Test that the buffer is bounded and filtered by agent"""
+        recorder = MetricsRecorder(buffer_size=3)
+        for latency in (10, 20, 30, 40):
+            recorder.record(make_record(latency))
+        recorder.record(make_record(99, agent_id='agent_002'))
+        
+        assert [record['latency_ms'] for record in recorder.recent('agent_001')] == [30, 40]
+        assert recorder.summary('agent_002')['runs'] == 1
+    
+    def test_jsonl_sink(self, tmp_path):
+        """Test that each run is appended as one JSON line"""
+        path = tmp_path / 'metrics' / 'runs.jsonl'
+        recorder = MetricsRecorder(jsonl_path=str(path))
+        recorder.record(make_record(10))
+        recorder.record(make_record(20))
+        
+        lines = path.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)['latency_ms'] for line in lines] == [10, 20]
+    
+    def test_prometheus_text(self):
+        """Test counters and cumulative histogram buckets"""
+        sink = PrometheusSink(buckets=(0.1, 1.0))
+        sink.write(make_record(50, cache_hit=True, prompt_tokens=100))
+        sink.write(make_record(500, tools=[{'tool': 'calculate', 'ms': 5}], error="RuntimeError: x"))
+        text = sink.render()
+        
+        assert 'agent_market_runs_total{agent="Alpha",model="gemma2-9b-it",status="ok"} 1' in text
+        assert 'agent_market_runs_total{agent="Alpha",model="gemma2-9b-it",status="error"} 1' in text
+        assert 'agent_market_cache_hits_total{agent="Alpha"} 1' in text
+        assert 'agent_market_tokens_total{agent="Alpha",model="gemma2-9b-it",kind="prompt"} 100' in text
+        assert 'agent_market_run_latency_seconds_bucket{agent="Alpha",le="0.1"} 1' in text
+        assert 'agent_market_run_latency_seconds_bucket{agent="Alpha",le="1"} 2' in text
+        assert 'agent_market_run_latency_seconds_count{agent="Alpha"} 2' in text
+        assert 'agent_market_tool_calls_total{tool="calculate"} 1' in text
+    
+    def test_prometheus_endpoint(self):
+        """Test that /metrics serves the text format"""
+        sink = PrometheusSink()
+        sink.write(make_record(50))
+        server = sink.serve(0)
+        try:
+            assert server.server_address[0] == '127.0.0.1'
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert 'agent_market_runs_total' in response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestSummary:
+    """Test suite for per-agent summaries"""
+    
+    def test_percentiles_and_totals(self):
+        """Test latency percentiles, cache hits, tokens and tool timings"""
+        records = [make_record(latency) for latency in range(10, 210, 10)]
+        records[0].update(cache_hit=True, prompt_tokens=10, completion_tokens=5)
+        records[1].update(tools=[{'tool': 'read', 'ms': 7}, {'tool': 'read', 'ms': None}])
+        summary = summarize(records)
+        
+        assert summary['runs'] == 20
+        assert (summary['latency_p50_ms'], summary['latency_p95_ms']) == (100, 190)
+        assert summary['cache_hits'] == 1
+        assert (summary['prompt_tokens'], summary['completion_tokens']) == (10, 5)
+        assert summary['tools'] == {'read': {'calls': 2, 'p50_ms': 7}}
+        assert summarize([])['latency_p50_ms'] is None
@@ -0,0 +1,94 @@
+"""
+Test cases for the response cache
+"""
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.response_cache as response_cache_module
+from core.response_cache import ResponseCache, caching_enabled, response_cache_key
+
+
+def key_for(user_input, history=None, model='llama-3.3-70b-versatile', tools=None):
+    """Cache key with fixed prompt and instructions"""
+    return response_cache_key(model, 'You are helpful.', ['You are helpful.'], tools or [], history or [], user_input)
+
+
+class TestCacheKey:
+    """Test suite for cache keys"""
+    
+    def test_whitespace_is_normalized(self):
+        """Test that whitespace differences share an entry"""
+        assert key_for("What is  2+2? ") == key_for("What is 2+2?")
+    
+    def test_every_component_matters(self):
+        """Test that model, tools, history and input all change the key"""
+        base = key_for("Hi")
+        assert key_for("Hello") != base
+        assert key_for("Hi", model='gemma2-9b-it') != base
+        assert key_for("Hi", tools=['MathTool']) != base
+        assert key_for("Hi", history=[{'role': 'user', 'content': 'Earlier'}]) != base
+        assert key_for("Hi", tools=['MathTool', 'FileOpsTool']) == key_for("Hi", tools=['FileOpsTool', 'MathTool'])
+    
+    def test_caching_enabled(self):
+        """Test the per-agent opt-out and the live-data default"""
+        assert caching_enabled({'tools': ['MathTool']}) is True
+        assert caching_enabled({'tools': ['WebSearchTool']}) is False
+        assert caching_enabled({'tools': ['MathTool', 'FileOpsTool']}) is False
+        assert caching_enabled({'tools': ['YFinanceTool'], 'cache_responses': True}) is True
+        assert caching_enabled({'tools': [], 'cache_responses': False}) is False
+
+
+class TestResponseCache:
+    """Test suite for ResponseCache"""
+    
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted"""
+        cache = ResponseCache()
+        assert cache.get('a') is None
+        cache.put('a', 'reply')
+        assert cache.get('a') == 'reply'
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'size': 1}
+    
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', '1')
+        cache.put('b', '2')
+        cache.get('a')
+        cache.put('c', '3')
+        assert cache.get('b') is None
+        assert cache.get('a') == '1'
+        assert cache.get('c') == '3'
+    
+    def test_ttl_expiry(self, monkeypatch):
+        """Test that entries expire after the TTL"""
+        now = [1000.0]
+        monkeypatch.setattr(response_cache_module.time, 'time', lambda: now[0])
+        cache = ResponseCache(ttl=60)
+        cache.put('a', 'reply')
+        now[0] += 59
+        assert cache.get('a') == 'reply'
+        now[0] += 2
+        assert cache.get('a') is None
+        assert len(cache) == 0
+    
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        """Test that the on-disk tier serves a fresh process"""
+        db_path = str(tmp_path / "response_cache.db")
+        cache = ResponseCache(db_path=db_path)
+        cache.put('a', 'reply')
+        cache.close()
+        
+        reopened = ResponseCache(db_path=db_path)
+        assert len(reopened) == 0
+        assert reopened.get('a') == 'reply'
+        assert len(reopened) == 1
+        
+        reopened.clear()
+        reopened.close()
+        fresh = ResponseCache(db_path=db_path)
+        assert fresh.get('a') is None
+        fresh.close()
@@ -0,0 +1,672 @@
+"""
+Test cases for the Agent Runner pool
+"""
+import pytest
+import json
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("agno")
+
+import core.runner as runner_module
+from core.response_cache import ResponseCache
+from core.runner import RunnerPool
+
+
+@pytest.fixture(autouse=True)
+def response_cache(monkeypatch):
+    """Give each test its own empty response cache"""
+    cache = ResponseCache()
+    monkeypatch.setattr(runner_module, 'get_response_cache', lambda: cache)
+    monkeypatch.setattr(runner_module, 'get_semantic_cache', lambda: None)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limits(monkeypatch):
+    """Keep the process-wide Groq rate limiter out of runner tests"""
+    import core.groq_integration as groq_integration
+    monkeypatch.setattr(groq_integration, '_rate_limiter', groq_integration.RateLimiter(scale=0))
+    monkeypatch.setattr(groq_integration, '_model_health', groq_integration.ModelHealth())
+
+
+@pytest.fixture(autouse=True)
+def metrics(monkeypatch):
+    """Give each test its own run metrics recorder"""
+    from core.metrics import MetricsRecorder
+    recorder = MetricsRecorder()
+    monkeypatch.setattr(runner_module, 'get_metrics', lambda: recorder)
+    return recorder
+
+
+@pytest.fixture
+def built(monkeypatch):
+    """Record runner construction without building Agno agents"""
+    built = []
+    
+    class FakeRunner:
+        def __init__(self, agent_config):
+            self.config = agent_config
+            built.append(agent_config.get('name'))
+    
+    monkeypatch.setattr(runner_module, 'AgentRunner', FakeRunner)
+    return built
+
+
+def make_config(agent_id, name, prompt='Test'):
+    """Build an agent configuration for tests"""
+    return {'id': agent_id, 'name': name, 'model': 'llama-3.3-70b-versatile', 'tools': [], 'prompt': prompt}
+
+
+class TestRunnerPool:
+    """Test suite for RunnerPool"""
+    
+    def test_reuses_runner_for_same_config(self, built):
+        """Test that repeated turns get the same runner"""
+        pool = RunnerPool()
+        with pool.checkout(make_config('agent_001', 'Alpha')) as first:
+            pass
+        with pool.checkout(make_config('agent_001', 'Alpha')) as second:
+            assert second is first
+        assert built == ['Alpha']
+        assert (pool.hits, pool.misses) == (1, 1)
+    
+    def test_concurrent_callers_get_separate_runners(self, built):
+        """Test that a checked-out runner is never lent to a second caller"""
+        pool = RunnerPool()
+        with pool.checkout(make_config('agent_001', 'Alpha')) as first:
+            with pool.checkout(make_config('agent_001', 'Alpha')) as second:
+                assert second is not first
+        assert len(pool) == 2
+        assert built == ['Alpha', 'Alpha']
+    
+    def test_config_change_builds_new_runner(self, built):
+        """Test that an edited agent is not served a stale runner"""
+        pool = RunnerPool()
+        with pool.checkout(make_config('agent_001', 'Alpha')) as first:
+            pass
+        with pool.checkout(make_config('agent_001', 'Alpha', prompt='Changed')) as second:
+            assert second is not first
+            assert second.config['prompt'] == 'Changed'
+    
+    def test_lru_eviction(self, built):
+        """Test that the least recently used runner is evicted"""
+        pool = RunnerPool(max_size=2)
+        for agent_id, name in [('agent_001', 'One'), ('agent_002', 'Two'), ('agent_001', 'One'),
+                               ('agent_003', 'Three'), ('agent_001', 'One'), ('agent_002', 'Two')]:
+            with pool.checkout(make_config(agent_id, name)):
+                pass
+            assert len(pool) <= 2
+        assert built == ['One', 'Two', 'Three', 'Two']
+    
+    def test_invalidate(self, built):
+        """Test dropping one agent's runners, including one in use, and all runners"""
+        pool = RunnerPool()
+        with pool.checkout(make_config('agent_002', 'Two')):
+            pass
+        with pool.checkout(make_config('agent_001', 'One')):
+            pool.invalidate('agent_001')
+        assert len(pool) == 1
+        pool.invalidate()
+        assert len(pool) == 0
+
+
+class FakeEvent:
+    """Minimal stand-in for an Agno run event"""
+    
+    def __init__(self, event, content=None, tool=None):
+        self.event = event
+        self.content = content
+        self.tool = tool
+
+
+class FakeTool:
+    """Minimal stand-in for an Agno tool execution"""
+    
+    def __init__(self, tool_name, tool_args, result=None):
+        self.tool_name = tool_name
+        self.tool_args = tool_args
+        self.result = result
+
+
+class FakeAgent:
+    """Agno agent double replaying a fixed event stream"""
+    
+    def __init__(self, events):
+        self.events = events
+    
+    def run(self, user_input, stream=False, **kwargs):
+        assert stream
+        return iter(self.events)
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    """Pretend an API key is configured"""
+    from core.groq_integration import GroqConfig
+    monkeypatch.setattr(runner_module, 'get_config', lambda: GroqConfig(api_key='test-key'))
+
+
+class TestRunStream:
+    """Test suite for AgentRunner.run_stream"""
+    
+    def test_yields_content_and_tool_calls(self, configured):
+        """Test that deltas and tool events are passed through in order"""
+        runner = runner_module.AgentRunner(make_config('agent_001', 'Alpha'))
+        runner.agent = FakeAgent([
+            FakeEvent('RunStarted'),
+            FakeEvent('ToolCallStarted', tool=FakeTool('calculate', {'expression': '2+2'})),
+            FakeEvent('ToolCallCompleted', tool=FakeTool('calculate', {'expression': '2+2'}, '4')),
+            FakeEvent('RunContent', content='The answer '),
+            FakeEvent('RunContent', content='is 4.'),
+            FakeEvent('RunCompleted', content='The answer is 4.'),
+        ])
+        
+        events = list(runner.run_stream("What is 2+2?"))
+        assert [e['type'] for e in events] == ['tool_call', 'tool_call', 'content', 'content']
+        assert events[1] == {
+            'type': 'tool_call', 'status': 'completed', 'tool': 'calculate',
+            'args': {'expression': '2+2'}, 'result': '4',
+        }
+        assert ''.join(e['content'] for e in events[2:]) == 'The answer is 4.'
+    
+    def test_records_run_metrics(self, configured, metrics):
+        """Test that a streamed run records timings, tool calls and cache hits"""
+        runner = runner_module.AgentRunner(make_config('agent_001', 'Alpha'))
+        runner.agent = FakeAgent([
+            FakeEvent('ToolCallStarted', tool=FakeTool('calculate', {'expression': '2+2'})),
+            FakeEvent('ToolCallCompleted', tool=FakeTool('calculate', {'expression': '2+2'}, '4')),
+            FakeEvent('RunContent', content='4'),
+        ])
+        list(runner.run_stream("What is 2+2?"))
+        list(runner.run_stream("What is 2+2?"))
+        
+        first, second = metrics.recent('agent_001')
+        assert first['streamed'] and first['cache_hit'] is False
+        assert first['ttft_ms'] is not None and first['queue_wait_ms'] is not None
+        assert first['tool_calls'] == 1 and first['tools'][0]['tool'] == 'calculate'
+        assert first['error'] is None
+        assert second['cache_hit'] is True and second['queue_wait_ms'] is None
+    
+    def test_errors_become_content(self, configured):
+        """Test that a failing model call is reported in the stream"""
+        class FailingAgent:
+            def run(self, user_input, **kwargs):
+                raise RuntimeError("boom")
+        
+        runner = runner_module.AgentRunner(make_config('agent_001', 'Alpha'))
+        runner.agent = FailingAgent()
+        
+        events = list(runner.run_stream("Hi"))
+        assert len(events) == 1
+        assert "boom" in events[0]['content']
+
+
+class TestModelCallLimiter:
+    """Test suite for the process-wide model call limiter"""
+    
+    def test_caps_concurrent_coroutines(self):
+        """Test that no more than limit calls run at once"""
+        import asyncio
+        
+        limiter = runner_module.ModelCallLimiter(limit=2)
+        peak = []
+        
+        async def call():
+            async with limiter.slot():
+                peak.append(limiter.in_flight)
+                await asyncio.sleep(0.01)
+        
+        async def main():
+            await asyncio.gather(*(call() for _ in range(10)))
+        
+        asyncio.run(main())
+        assert len(peak) == 10
+        assert max(peak) == 2
+        assert limiter.in_flight == 0
+    
+    def test_shared_across_threads_and_loops(self):
+        """Test that threads and separate event loops share one limit"""
+        import asyncio
+        import threading
+        import time
+        
+        limiter = runner_module.ModelCallLimiter(limit=1)
+        active = []
+        overlaps = []
+        
+        def enter():
+            active.append(1)
+            overlaps.append(len(active))
+            time.sleep(0.005)
+            active.pop()
+        
+        def sync_worker():
+            for _ in range(5):
+                with limiter.blocking_slot():
+                    enter()
+        
+        async def async_calls():
+            for _ in range(5):
+                async with limiter.slot():
+                    enter()
+        
+        threads = [threading.Thread(target=sync_worker)] + [
+            threading.Thread(target=lambda: asyncio.run(async_calls())) for _ in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        
+        assert len(overlaps) == 15
+        assert max(overlaps) == 1
+        assert limiter.in_flight == 0
+    
+    def test_cancelled_waiter_frees_its_place(self):
+        """Test that cancelling a waiting coroutine does not leak a slot"""
+        import asyncio
+        
+        limiter = runner_module.ModelCallLimiter(limit=1)
+        
+        async def main():
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            limiter.release()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            await asyncio.wait_for(limiter.acquire(), timeout=1)
+            limiter.release()
+        
+        asyncio.run(main())
+        assert limiter.in_flight == 0
+        assert limiter.waiting == 0
+
+
+class TestAsyncRun:
+    """Test suite for AgentRunner.arun and arun_stream"""
+    
+    def test_arun_and_arun_stream(self, configured):
+        """Test the async paths against an async agent double"""
+        import asyncio
+        
+        class AsyncAgent:
+            def arun(self, user_input, stream=False, **kwargs):
+                if not stream:
+                    async def result():
+                        return FakeEvent('RunCompleted', content='done: ' + user_input)
+                    return result()
+                
+                async def events():
+                    yield FakeEvent('RunContent', content='par')
+                    yield FakeEvent('RunContent', content='tial')
+                return events()
+        
+        runner = runner_module.AgentRunner(dict(make_config('agent_001', 'Alpha'), cache_responses=False))
+        built = []
+        
+        def build_agent(model_name, for_async=False):
+            built.append((model_name, for_async))
+            return AsyncAgent()
+        runner._build_agent = build_agent
+        
+        async def main():
+            reply = await runner.arun("hi")
+            deltas = [event['content'] async for event in runner.arun_stream("hello")]
+            return reply, deltas
+        
+        assert asyncio.run(main()) == ('done: hi', ['par', 'tial'])
+        # Each event loop gets its own async agent, reused within the loop
+        assert asyncio.run(main()) == ('done: hi', ['par', 'tial'])
+        assert built == [('llama-3.3-70b-versatile', True)] * 2
+
+
+class TestChatHistory:
+    """Test suite for passing chat history to the model"""
+    
+    def test_history_precedes_user_message(self, configured):
+        """Test that earlier turns are sent and the current message is not duplicated"""
+        received = []
+        
+        class RecordingAgent:
+            def run(self, run_input, stream=False, **kwargs):
+                received.append(run_input)
+                return FakeEvent('RunCompleted', content='ok')
+        
+        runner = runner_module.AgentRunner(make_config('agent_001', 'Alpha'))
+        runner.agent = RecordingAgent()
+        
+        assert runner.run("First") == 'ok'
+        assert received[-1] == "First"
+        
+        history = [
+            {'role': 'user', 'content': 'First'},
+            {'role': 'assistant', 'content': 'ok'},
+            {'role': 'user', 'content': 'Second'},
+        ]
+        runner.run("Second", chat_history=history)
+        assert [(m.role, m.content) for m in received[-1]] == [
+            ('user', 'First'), ('assistant', 'ok'), ('user', 'Second'),
+        ]
+
+
+class TestResponseCaching:
+    """Test suite for cached agent replies"""
+    
+    def counting_agent(self, calls):
+        class CountingAgent:
+            def run(self, run_input, stream=False, **kwargs):
+                calls.append(run_input)
+                if stream:
+                    return iter([FakeEvent('RunContent', content='fresh '), FakeEvent('RunContent', content='answer')])
+                return FakeEvent('RunCompleted', content='fresh answer')
+        return CountingAgent()
+    
+    def test_repeated_question_is_served_from_cache(self, configured, response_cache):
+        """Test that identical input skips the model call in every run path"""
+        calls = []
+        runner = runner_module.AgentRunner(make_config('agent_001', 'Alpha'))
+        runner.agent = self.counting_agent(calls)
+        
+        assert runner.run("What is an agent?") == 'fresh answer'
+        assert runner.run("  What is   an agent? ") == 'fresh answer'
+        streamed = [e['content'] for e in runner.run_stream("What is an agent?")]
+        assert streamed == ['fresh answer']
+        assert len(calls) == 1
+        assert (response_cache.hits, response_cache.misses) == (2, 1)
+        
+        # Different history means a different prompt
+        history = [{'role': 'user', 'content': 'Hi'}, {'role': 'assistant', 'content': 'Hello'}]
+        runner.run("What is an agent?", chat_history=history)
+        assert len(calls) == 2
+    
+    def test_volatile_tool_agents_are_not_cached(self, configured, response_cache):
+        """Test the default opt-out for live-data tools and the explicit override"""
+        calls = []
+        config = dict(make_config('agent_002', 'Searcher'), tools=['WebSearchTool'])
+        runner = runner_module.AgentRunner(config)
+        runner.agent = self.counting_agent(calls)
+        runner.run("News?")
+        runner.run("News?")
+        assert len(calls) == 2
+        
+        opted_out = runner_module.AgentRunner(dict(make_config('agent_003', 'Beta'), cache_responses=False))
+        opted_out.agent = self.counting_agent(calls)
+        opted_out.run("Hi")
+        opted_out.run("Hi")
+        assert len(calls) == 4
+        assert len(response_cache) == 0
+    
+    def test_file_ops_agents_are_not_cached(self, configured, response_cache):
+        """Test that a repeated write or read reaches the agent instead of the cache"""
+        calls = []
+        config = dict(make_config('agent_004', 'Writer'), tools=['FileOpsTool'])
+        runner = runner_module.AgentRunner(config)
+        runner.agent = self.counting_agent(calls)
+        runner.run("Write 'hi' to notes.txt")
+        runner.run("Write 'hi' to notes.txt")
+        assert len(calls) == 2
+        assert len(response_cache) == 0
+
+
+class TestRateLimitRetries:
+    """Test suite for retrying rate-limited model calls in the runner"""
+    
+    def test_rate_limited_call_is_retried(self, configured, monkeypatch):
+        """Test that a 429 is retried instead of becoming an error message"""
+        import core.groq_integration as groq_integration
+        monkeypatch.setattr(groq_integration.time, 'sleep', lambda seconds: None)
+        
+        class RateLimitError(Exception):
+            status_code = 429
+        
+        calls = []
+        
+        class FlakyAgent:
+            def run(self, run_input, stream=False, **kwargs):
+                calls.append(run_input)
+                if len(calls) == 1:
+                    raise RateLimitError("Rate limit reached. Please try again in 10ms")
+                return FakeEvent('RunCompleted', content='ok')
+        
+        runner = runner_module.AgentRunner(dict(make_config('agent_001', 'Alpha'), cache_responses=False))
+        runner.agent = FlakyAgent()
+        assert runner.run("Hi") == 'ok'
+        assert len(calls) == 2
+
+
+class ReplyAgent:
+    """Agno agent double answering every run with a fixed reply, or raising"""
+    
+    def __init__(self, reply=None, error=None, delay=0.0):
+        self.reply = reply
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+    
+    def run(self, run_input, stream=False, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if stream:
+            return iter([FakeEvent('RunContent', content=self.reply)])
+        return FakeEvent('RunCompleted', content=self.reply)
+
+
+class TestModelFallback:
+    """Test suite for fallback models and hedged requests"""
+    
+    class ServiceUnavailable(Exception):
+        status_code = 503
+    
+    def make_runner(self, primary, fallback, **settings):
+        config = dict(
+            make_config('agent_001', 'Alpha'),
+            cache_responses=False,
+            fallback_models=['llama-3.1-8b-instant', 'not-a-model'],
+        )
+        config.update(settings)
+        runner = runner_module.AgentRunner(config)
+        runner.agent = primary
+        runner._fallback_agents['llama-3.1-8b-instant'] = fallback
+        # Hedged attempts build their own agents; hand them the same doubles
+        agents = {'llama-3.3-70b-versatile': primary, 'llama-3.1-8b-instant': fallback}
+        runner._build_agent = lambda model_name, for_async=False: agents[model_name]
+        return runner
+    
+    def test_fails_over_without_retrying_primary(self, configured):
+        """Test that a transient primary failure goes straight to the fallback"""
+        import core.groq_integration as groq_integration
+        primary = ReplyAgent(error=self.ServiceUnavailable("503 Service Unavailable"))
+        fallback = ReplyAgent(reply='from fallback')
+        runner = self.make_runner(primary, fallback)
+        
+        assert runner.fallback_models == ['llama-3.1-8b-instant']
+        assert runner.complete("Hi") == 'from fallback'
+        assert (primary.calls, fallback.calls) == (1, 1)
+        assert groq_integration.get_model_health().stats('llama-3.3-70b-versatile')['error_rate'] == 1.0
+    
+    def test_fallback_replies_are_not_cached(self, configured, response_cache):
+        """Test that only the primary model's replies are cached under its key"""
+        primary = ReplyAgent(error=self.ServiceUnavailable("503 Service Unavailable"))
+        fallback = ReplyAgent(reply='from fallback')
+        runner = self.make_runner(primary, fallback, cache_responses=True)
+        
+        assert runner.run("Hi") == 'from fallback'
+        assert [e['content'] for e in runner.run_stream("Hi")] == ['from fallback']
+        assert len(response_cache) == 0
+        
+        primary.error, primary.reply = None, 'from primary'
+        assert runner.run("Hi") == 'from primary'
+        assert runner.run("Hi") == 'from primary'
+        assert primary.calls == 3
+    
+    def test_permanent_errors_do_not_fail_over(self, configured):
+        """Test that a bad request is reported rather than sent elsewhere"""
+        primary = ReplyAgent(error=ValueError("invalid request"))
+        fallback = ReplyAgent(reply='from fallback')
+        runner = self.make_runner(primary, fallback)
+        
+        assert "invalid request" in runner.run("Hi")
+        assert fallback.calls == 0
+    
+    def test_stream_fails_over_before_first_event(self, configured):
+        """Test that a stream failing before any output moves to the fallback"""
+        primary = ReplyAgent(error=self.ServiceUnavailable("503 Service Unavailable"))
+        fallback = ReplyAgent(reply='streamed')
+        runner = self.make_runner(primary, fallback)
+        
+        events = list(runner.run_stream("Hi"))
+        assert events == [{'type': 'content', 'content': 'streamed'}]
+    
+    def test_hedges_slow_primary(self, configured, monkeypatch):
+        """Test that a fallback started after the hedge delay can win the race"""
+        import core.groq_integration as groq_integration
+        monkeypatch.setattr(groq_integration, 'DEFAULT_HEDGE_SECONDS', 0.05)
+        primary = ReplyAgent(reply='slow', delay=0.5)
+        fallback = ReplyAgent(reply='fast')
+        runner = self.make_runner(primary, fallback, hedge_requests=True)
+        
+        assert runner.complete("Hi") == 'fast'
+        assert (primary.calls, fallback.calls) == (1, 1)
+    
+    def test_losing_attempts_do_not_share_agents(self, configured, monkeypatch):
+        """Test that a hedge still running after its run returns never overlaps the next run's calls"""
+        import core.groq_integration as groq_integration
+        monkeypatch.setattr(groq_integration, 'DEFAULT_HEDGE_SECONDS', 0.05)
+        lock = threading.Lock()
+        
+        class OverlapAgent(ReplyAgent):
+            def __init__(self, reply, delay=0.0):
+                super().__init__(reply=reply, delay=delay)
+                self.active = self.most_active = 0
+            
+            def run(self, run_input, stream=False, **kwargs):
+                with lock:
+                    self.active += 1
+                    self.most_active = max(self.most_active, self.active)
+                try:
+                    return super().run(run_input, stream=stream, **kwargs)
+                finally:
+                    with lock:
+                        self.active -= 1
+        
+        built = []
+        
+        def build_agent(model_name, for_async=False):
+            agent = OverlapAgent('slow', delay=0.3) if model_name == 'llama-3.3-70b-versatile' else OverlapAgent('fast')
+            built.append(agent)
+            return agent
+        
+        runner = self.make_runner(OverlapAgent('slow', delay=0.3), OverlapAgent('fast'), hedge_requests=True)
+        monkeypatch.setattr(runner, '_build_agent', build_agent)
+        
+        # The second run starts while the first run's primary call is still going
+        assert runner.complete("Hi") == 'fast'
+        assert runner.complete("Hi") == 'fast'
+        time.sleep(0.4)
+        
+        assert len(built) == 4
+        assert all(agent.most_active == 1 for agent in built)
+        assert runner.agent.calls == runner._fallback_agents['llama-3.1-8b-instant'].calls == 0
+    
+    def test_hedges_slow_stream(self, configured, monkeypatch):
+        """Test that a streamed run is hedged up to its first event"""
+        import core.groq_integration as groq_integration
+        monkeypatch.setattr(groq_integration, 'DEFAULT_HEDGE_SECONDS', 0.05)
+        primary = ReplyAgent(reply='slow', delay=0.5)
+        fallback = ReplyAgent(reply='fast')
+        runner = self.make_runner(primary, fallback, hedge_requests=True)
+        
+        assert list(runner.run_stream("Hi")) == [{'type': 'content', 'content': 'fast'}]
+        assert (primary.calls, fallback.calls) == (1, 1)
+    
+    def test_hedged_stream_moves_on_after_failure(self, configured):
+        """Test that a hedged stream failing before any output starts the fallback at once"""
+        primary = ReplyAgent(error=self.ServiceUnavailable("503 Service Unavailable"))
+        fallback = ReplyAgent(reply='streamed')
+        runner = self.make_runner(primary, fallback, hedge_requests=True)
+        
+        assert list(runner.run_stream("Hi")) == [{'type': 'content', 'content': 'streamed'}]
+    
+    def test_hedges_slow_async_stream(self, configured, monkeypatch):
+        """Test that arun_stream() hedges too, cancelling the stream that lost"""
+        import asyncio
+        import core.groq_integration as groq_integration
+        monkeypatch.setattr(groq_integration, 'DEFAULT_HEDGE_SECONDS', 0.05)
+        cancelled = []
+        
+        class AsyncReplyAgent:
+            def __init__(self, reply, delay=0.0):
+                self.reply = reply
+                self.delay = delay
+            
+            async def arun(self, run_input, stream=False, **kwargs):
+                try:
+                    await asyncio.sleep(self.delay)
+                except asyncio.CancelledError:
+                    cancelled.append(self.reply)
+                    raise
+                yield FakeEvent('RunContent', content=self.reply)
+        
+        agents = {
+            'llama-3.3-70b-versatile': AsyncReplyAgent('slow', delay=0.5),
+            'llama-3.1-8b-instant': AsyncReplyAgent('fast'),
+        }
+        runner = self.make_runner(ReplyAgent(), ReplyAgent(), hedge_requests=True)
+        monkeypatch.setattr(runner, '_async_agent_for', agents.get)
+        
+        async def collect():
+            return [event async for event in runner.arun_stream("Hi")]
+        
+        assert asyncio.run(collect()) == [{'type': 'content', 'content': 'fast'}]
+        assert cancelled == ['slow']
+
+
+class TestToolGuards:
+    """Test suite for timeouts around custom tool calls"""
+    
+    def test_slow_tool_returns_timeout_result(self):
+        """Test that an overdue tool call hands the model a structured result"""
+        def lookup(query: str) -> str:
+            """Slow lookup"""
+            time.sleep(1)
+            return query
+        
+        guarded = runner_module.guard_tool(lookup, timeout=0.05)
+        result = json.loads(guarded("x"))
+        
+        assert guarded.__name__ == 'lookup' and guarded.__doc__ == "Slow lookup"
+        assert result['status'] == 'stopped'
+        assert (result['reason'], result['tool'], result['timeout_seconds']) == ('timeout', 'lookup', 0.05)
+    
+    def test_tool_errors_become_results(self):
+        """Test that a failing tool call hands the model a string instead of raising"""
+        def fails(query: str) -> str:
+            raise RuntimeError("ValueError: bad input")
+        
+        def exhausts(query: str) -> str:
+            raise MemoryError()
+        
+        assert runner_module.guard_tool(fails)("x") == "❌ Error: ValueError: bad input"
+        assert json.loads(runner_module.guard_tool(exhausts)("x"))['reason'] == 'memory_limit'
+    
+    def test_calculator_runs_in_sandbox(self, monkeypatch):
+        """Test that the calculator is answered by a sandbox worker"""
+        from core.tool_sandbox import ToolSandbox
+        from core.tools.math_tool_agno import get_math_tool
+        sandbox = ToolSandbox(workers=1)
+        monkeypatch.setattr(runner_module, 'get_tool_sandbox', lambda: sandbox)
+        try:
+            assert runner_module.guard_tool(get_math_tool())("6 * 7") == "🧮 Result: 6 * 7 = 42"
+            assert sandbox._started == 1
+        finally:
+            sandbox.close()
@@ -0,0 +1,111 @@
+"""
+Test cases for the semantic response cache
+"""
+import pytest
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+import core.semantic_cache as semantic_cache_module
+from core.semantic_cache import SemanticCache, hashing_embed
+
+
+class TestHashingEmbed:
+    """Test suite for the hashing vectorizer fallback"""
+    
+    def test_vectors_are_normalized(self):
+        """Test that embeddings have unit length (zero for empty text)"""
+        vectors = hashing_embed(["What is the capital of France?", ""])
+        assert vectors.shape == (2, semantic_cache_module.HASHING_DIMENSIONS)
+        assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+        assert not vectors[1].any()
+    
+    def test_paraphrases_are_closer_than_unrelated_text(self):
+        """Test that shared words and spellings raise similarity"""
+        base, paraphrase, unrelated = hashing_embed([
+            "What is the capital of France?",
+            "what's the capital city of france",
+            "Calculate compound interest on a loan",
+        ])
+        assert base @ paraphrase > base @ unrelated
+
+
+class TestSemanticCache:
+    """Test suite for SemanticCache"""
+    
+    def test_similar_question_hits(self):
+        """Test threshold matching within one agent's scope"""
+        cache = SemanticCache(threshold=0.8, embedder=hashing_embed)
+        cache.put('agent-a', "What is the capital of France?", "Paris")
+        
+        assert cache.get('agent-a', "what is the capital of france") == "Paris"
+        assert cache.get('agent-a', "Tell me a joke about penguins") is None
+        assert cache.get('agent-b', "What is the capital of France?") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+    
+    @pytest.mark.parametrize('cached, asked', [
+        ("What were the causes of World War I?", "What were the causes of World War II?"),
+        ("Monthly payment on a $300,000 mortgage at 6.5% over 30 years",
+         "Monthly payment on a $300,000 mortgage at 7.5% over 30 years"),
+        ("Sort this list in ascending order", "Sort this list in descending order"),
+    ])
+    def test_hashing_near_misses_do_not_hit(self, cached, asked):
+        """Test that lexically close questions needing other answers miss"""
+        cache = SemanticCache(threshold=0.5, embedder=hashing_embed)
+        cache.put('agent', cached, "cached answer")
+        
+        assert cache.get('agent', asked) is None
+        assert cache.get('agent', cached.upper()) == "cached answer"
+    
+    def test_model_embeddings_match_other_wordings(self):
+        """Test that exact terms are only required for the hashing fallback"""
+        cache = SemanticCache(threshold=0.8, embedder=lambda texts: hashing_embed(texts))
+        assert not cache.exact_terms
+        cache.put('agent', "What is the capital of France?", "Paris")
+        
+        assert cache.get('agent', "What is the capital of France please?") == "Paris"
+    
+    def test_capacity_replaces_oldest(self):
+        """Test that the per-agent ring overwrites its oldest entry"""
+        cache = SemanticCache(threshold=0.99, capacity=2, embedder=hashing_embed)
+        cache.put('agent', "alpha question", "A")
+        cache.put('agent', "beta question", "B")
+        cache.put('agent', "gamma question", "C")
+        
+        assert cache.get('agent', "alpha question") is None
+        assert cache.get('agent', "gamma question") == "C"
+    
+    def test_expired_entries_are_ignored(self, monkeypatch):
+        """Test that replies past the TTL are not served"""
+        now = [1000.0]
+        monkeypatch.setattr(semantic_cache_module.time, 'time', lambda: now[0])
+        cache = SemanticCache(threshold=0.9, ttl=60, embedder=hashing_embed)
+        cache.put('agent', "How do I reset my password?", "Use the link")
+        
+        now[0] += 61
+        assert cache.get('agent', "How do I reset my password?") is None
+
+
+class TestDefaults:
+    """Test suite for when the semantic tier is on"""
+    
+    def test_enabled_by_default_only_with_embedding_model(self):
+        """Test the default of AGENT_MARKET_SEMANTIC_CACHE"""
+        import subprocess
+        code = "import core.semantic_cache as s; print(s.SEMANTIC_CACHE_ENABLED)"
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        
+        def enabled(**env):
+            environ = {k: v for k, v in os.environ.items() if not k.startswith('AGENT_MARKET_')}
+            environ.update(env)
+            result = subprocess.run([sys.executable, '-c', code], cwd=root, env=environ,
+                                    capture_output=True, text=True, check=True)
+            return result.stdout.strip() == 'True'
+        
+        assert not enabled()
+        assert enabled(AGENT_MARKET_EMBEDDING_MODEL='all-MiniLM-L6-v2')
+        assert not enabled(AGENT_MARKET_EMBEDDING_MODEL='all-MiniLM-L6-v2', AGENT_MARKET_SEMANTIC_CACHE='0')
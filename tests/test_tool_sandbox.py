@@ -0,0 +1,76 @@
+"""
+Test cases for the tool sandbox
+"""
+import pytest
+import json
+import os
+import subprocess
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.tool_sandbox import ToolLimitExceeded, ToolSandbox, resource
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def worker_baseline_mb() -> int:
+    """Peak address space, in MB, of a process set up like a sandbox worker
+    with the batch calculator loaded (Linux only)"""
+    script = (
+        "from core.tools.math_tool_agno import get_math_batch_tool; get_math_batch_tool()\n"
+        "print([l.split()[1] for l in open('/proc/self/status') if l.startswith('VmPeak:')][0])"
+    )
+    env = dict(os.environ, OPENBLAS_NUM_THREADS='1', OMP_NUM_THREADS='1', MKL_NUM_THREADS='1')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get('PYTHONPATH')]))
+    output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True)
+    return int(output.stdout) // 1024 + 1
+
+
+@pytest.fixture
+def sandbox():
+    """Sandbox with one worker, stopped after the test"""
+    sandbox = ToolSandbox(workers=1)
+    yield sandbox
+    sandbox.close()
+
+
+class TestToolSandbox:
+    """Test suite for running tools in worker processes"""
+    
+    def test_runs_tool_and_reuses_worker(self, sandbox):
+        """Test that calls are answered by one long-lived worker"""
+        assert sandbox.run('calculator', ('2 + 2',), {}, timeout=30) == "🧮 Result: 2 + 2 = 4"
+        assert "1.41" in sandbox.run('calculator', (), {'expression': 'sqrt(2)'}, timeout=30)
+        assert sandbox._started == 1
+    
+    def test_timeout_replaces_worker(self, sandbox):
+        """Test that an overdue call is stopped and the next call gets a fresh worker"""
+        with pytest.raises(ToolLimitExceeded) as exc_info:
+            sandbox.run('calculator', ('2 + 2',), {}, timeout=0)
+        assert exc_info.value.reason == 'timeout'
+        assert sandbox._started == 0
+        assert "4" in sandbox.run('calculator', ('2 + 2',), {}, timeout=30)
+    
+    def test_only_listed_tools_run(self, sandbox):
+        """Test that the worker refuses tools outside SANDBOXED_TOOLS"""
+        with pytest.raises(RuntimeError, match="cannot run in the sandbox"):
+            sandbox.run('file_operations', ('read:secrets.txt',), {}, timeout=30)
+    
+    @pytest.mark.skipif(resource is None or not os.path.exists('/proc/self/status'),
+                        reason="needs rlimits and /proc to size the memory limit")
+    def test_memory_limit_is_reported(self):
+        """Test that running out of the worker's memory limit stops the call as memory_limit"""
+        pytest.importorskip("numpy")
+        # Room for 32 MB over a loaded worker; eight 1M-value inputs need 64 MB
+        sandbox = ToolSandbox(workers=1, memory_mb=worker_baseline_mb() + 32)
+        names = [f'x{i}' for i in range(8)]
+        variables = json.dumps({name: "0:1000000" for name in names})
+        try:
+            with pytest.raises(ToolLimitExceeded) as exc_info:
+                sandbox.run('batch_calculator', (' + '.join(names), variables), {}, timeout=30)
+            assert exc_info.value.reason == 'memory_limit'
+            assert "2 + 2 = 4" in sandbox.run('calculator', ('2 + 2',), {}, timeout=30)
+        finally:
+            sandbox.close()
@@ -10,7 +10,7 @@ import tempfile
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from core.tools.file_ops_agno import get_file_ops_tool
-from core.tools.math_tool_agno import get_math_tool
+from core.tools.math_tool_agno import compile_expression, get_math_batch_tool, get_math_tool
 
 
 class TestFileOpsTool:
@@ -128,6 +128,162 @@ class TestFileOpsTool:
         assert "Access denied" in result
 
 
+class TestFileOpsReads:
+    """Test suite for ranged and capped reads"""
+    
+    @pytest.fixture
+    def file_ops(self, tmp_path, monkeypatch):
+        """File operations tool working in an empty directory with a 100-line log"""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "app.log").write_text(''.join(f"line {i}\n" for i in range(1, 101)))
+        return get_file_ops_tool()
+    
+    def test_byte_range(self, file_ops):
+        """Test read with an offset and length, and the size header"""
+        result = file_ops("read:app.log:7:14")
+        
+        assert result.startswith("📄 app.log (792 bytes), read, bytes 7-21:")
+        assert result.endswith("line 2\nline 3\n")
+        assert "truncated" not in result
+    
+    def test_head_tail_and_lines(self, file_ops):
+        """Test line-based reads"""
+        assert file_ops("head:app.log:2").endswith("\n\nline 1\nline 2\n")
+        assert file_ops("tail:app.log:2").endswith("\n\nline 99\nline 100\n")
+        assert file_ops("lines:app.log:10-11").endswith("\n\nline 10\nline 11\n")
+        assert file_ops("lines:app.log:100").endswith("\n\nline 100\n")
+    
+    @pytest.mark.parametrize('mmap_threshold', [1024 * 1024, 1])
+    def test_reads_are_capped(self, file_ops, monkeypatch, mmap_threshold):
+        """Test the truncation marker, with and without mmap"""
+        import core.tools.file_ops_agno as file_ops_module
+        monkeypatch.setattr(file_ops_module, 'MAX_READ_BYTES', 14)
+        monkeypatch.setattr(file_ops_module, 'MMAP_THRESHOLD', mmap_threshold)
+        
+        result = file_ops("read:app.log")
+        assert "line 1\nline 2\n" in result
+        assert "[truncated, 778 bytes remaining; continue with 'read:app.log:14:14']" in result
+        
+        result = file_ops("tail:app.log:10")
+        assert result.endswith("line 100\n\n... [truncated, 778 earlier bytes not shown]")
+    
+    @pytest.mark.parametrize('mmap_threshold', [1024 * 1024, 1])
+    def test_line_reads_skip_blocks(self, file_ops, monkeypatch, mmap_threshold):
+        """Test line positions found across newline-counted blocks"""
+        import core.tools.file_ops_agno as file_ops_module
+        monkeypatch.setattr(file_ops_module, 'LINE_SCAN_BYTES', 16)
+        monkeypatch.setattr(file_ops_module, 'MMAP_THRESHOLD', mmap_threshold)
+        
+        assert file_ops("lines:app.log:57-58").endswith("\n\nline 57\nline 58\n")
+        assert file_ops("lines:app.log:100").endswith("\n\nline 100\n")
+        assert file_ops("lines:app.log:101").endswith("bytes 792-792:\n\n")
+    
+    def test_long_line_counts_stop_at_read_cap(self, file_ops, monkeypatch):
+        """Test that head and tail stop looking for lines past what a read shows"""
+        import core.tools.file_ops_agno as file_ops_module
+        monkeypatch.setattr(file_ops_module, 'MAX_READ_BYTES', 14)
+        
+        assert "bytes 0-14:\n\nline 1\nline 2\n" in file_ops(f"head:app.log:{10 ** 9}")
+        assert file_ops_module._line_end(b"a\n" * 100, 0, 10 ** 9) == 16
+        assert file_ops_module._tail_start(b"a\n" * 100, 10 ** 9) == 184
+    
+    def test_bad_arguments(self, file_ops, tmp_path):
+        """Test errors for malformed ranges and directories"""
+        (tmp_path / "logs").mkdir()
+        
+        assert "must be a whole number" in file_ops("read:app.log:x")
+        assert "must not be before" in file_ops("lines:app.log:5-2")
+        assert "Too many values" in file_ops("head:app.log:1:2")
+        assert "is not a file" in file_ops("read:logs")
+
+
+class TestFileOpsSearch:
+    """Test suite for regex search over files and directories"""
+    
+    @pytest.fixture
+    def file_ops(self, tmp_path, monkeypatch):
+        """File operations tool working in a directory of logs"""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "logs" / "old").mkdir(parents=True)
+        (tmp_path / "logs" / ".cache").mkdir()
+        (tmp_path / "logs" / "app.log").write_text("ok\nERROR disk full\nok\nERROR at 12:30 ERROR\n")
+        (tmp_path / "logs" / "old" / "app.log").write_text("ERROR network\n")
+        (tmp_path / "logs" / ".cache" / "hidden.log").write_text("ERROR hidden\n")
+        (tmp_path / "logs" / "core.bin").write_bytes(b"\0ERROR")
+        return get_file_ops_tool()
+    
+    @pytest.mark.parametrize('mmap_threshold', [1024 * 1024, 1])
+    def test_recursive_search(self, file_ops, monkeypatch, mmap_threshold):
+        """Test matching lines with line numbers, once per line, skipping hidden and binary files"""
+        import core.tools.file_ops_agno as file_ops_module
+        monkeypatch.setattr(file_ops_module, 'MMAP_THRESHOLD', mmap_threshold)
+        result = file_ops("search:ERROR:logs")
+        
+        assert result.splitlines()[2:] == [
+            f"{os.path.join('logs', 'app.log')}:2: ERROR disk full",
+            f"{os.path.join('logs', 'app.log')}:4: ERROR at 12:30 ERROR",
+            f"{os.path.join('logs', 'old', 'app.log')}:1: ERROR network",
+        ]
+        assert "files scanned: 2" in result
+    
+    def test_pattern_with_colons(self, file_ops):
+        """Test that the path is split off the right of the command"""
+        result = file_ops("search:\\d+:\\d+:logs/app.log")
+        
+        assert "logs/app.log:4: ERROR at 12:30 ERROR" in result
+        assert "1 matching lines" in result
+    
+    def test_match_limit(self, file_ops, monkeypatch):
+        """Test that results stop at the match limit with a marker"""
+        import core.tools.file_ops_agno as file_ops_module
+        monkeypatch.setattr(file_ops_module, 'SEARCH_MAX_MATCHES', 1)
+        result = file_ops("search:ERROR:logs/app.log")
+        
+        assert "1 matching lines" in result
+        assert "[stopped at 1 matches" in result
+        assert "[stopped" not in file_ops("search:network:logs")
+    
+    def test_byte_budget_and_deadline(self, file_ops, monkeypatch):
+        """Test that a search stops between files once its byte budget or time is spent"""
+        import core.tools.file_ops_agno as file_ops_module
+        monkeypatch.setattr(file_ops_module, 'SEARCH_MAX_TOTAL_BYTES', 50)
+        result = file_ops("search:ERROR:logs")
+        
+        assert "2 matching lines" in result
+        assert "old" not in result
+        assert "[stopped after 0 MB" in result
+        
+        monkeypatch.setattr(file_ops_module, 'SEARCH_SECONDS', -1)
+        result = file_ops("search:ERROR:logs")
+        assert "No matches" in result
+        assert "[stopped after -1s" in result
+    
+    @pytest.mark.parametrize('mmap_threshold', [1024 * 1024, 1])
+    def test_deadline_stops_within_a_file(self, file_ops, tmp_path, monkeypatch, mmap_threshold):
+        """Test that one large file is searched in windows and stops on the deadline"""
+        import core.tools.file_ops_agno as file_ops_module
+        (tmp_path / "big.log").write_text(''.join(f"ERROR {i}\n" for i in range(1, 1001)))
+        ticks = iter(range(10 ** 6))
+        monkeypatch.setattr(file_ops_module.time, 'monotonic', lambda: next(ticks))
+        monkeypatch.setattr(file_ops_module, 'SEARCH_SECONDS', 3)
+        monkeypatch.setattr(file_ops_module, 'SEARCH_MAX_MATCHES', 10 ** 6)
+        monkeypatch.setattr(file_ops_module, 'LINE_SCAN_BYTES', 1)
+        monkeypatch.setattr(file_ops_module, 'MMAP_THRESHOLD', mmap_threshold)
+        result = file_ops("search:ERROR:big.log")
+        
+        matches = [line for line in result.splitlines() if line.startswith("big.log:")]
+        # Each window is one line here, and the clock ticks once per window
+        assert 0 < len(matches) <= 3
+        assert matches == [f"big.log:{i}: ERROR {i}" for i in range(1, len(matches) + 1)]
+        assert "[stopped after 3s" in result
+    
+    def test_bad_search(self, file_ops):
+        """Test errors for bad patterns and paths"""
+        assert "Invalid pattern" in file_ops("search:(:logs")
+        assert "Access denied" in file_ops("search:ERROR:../logs")
+        assert "No matches" in file_ops("search:WARNING:logs")
+
+
 class TestMathTool:
     """Test suite for Math Calculator Tool"""
     
@@ -216,6 +372,101 @@ class TestMathTool:
         """Test using unknown function"""
         result = calculator("unknown_func(5)")
         assert "❌" in result
+    
+    def test_rejects_attribute_and_builtin_tricks(self, calculator):
+        """Test that only arithmetic and whitelisted calls get through"""
+        for expression in ["().__class__", "__import__('os')", "'a' * 3", "[x for x in (1, 2)]", "_pow(2, 3)"]:
+            result = calculator(expression)
+            assert "❌" in result
+    
+    def test_operand_size_limits(self, calculator):
+        """Test that factorial and power bombs are refused instead of run"""
+        assert "too large" in calculator("factorial(10 ** 6)")
+        assert "too large" in calculator("10 ** 10 ** 10")
+        assert "too large" in calculator("pow(7, 10 ** 9)")
+        assert "1024" in calculator("2 ** 10")
+        assert "too large" in calculator("round(7, -10 ** 7)")
+        assert "= 0" in calculator("round(7, -2)")
+        assert "= 3.14" in calculator("round(pi, 2)")
+    
+    def test_power_limit_counts_result_bits(self, calculator):
+        """Test that powers up to MAX_POWER_BITS are allowed for any base"""
+        assert "Error" not in calculator("2 ** 6000")
+        assert "Error" not in calculator("(-3) ** 6000")
+        assert "too large" in calculator("2 ** 10001")
+        assert "too large" in calculator("3 ** 6400")
+    
+    def test_sequences_are_only_function_arguments(self, calculator):
+        """Test that lists cannot be repeated or concatenated into huge values"""
+        for expression in ["sum([1] * 10 ** 8)", "max((0,) * 10 ** 9)", "[1] + [2]", "-[1]", "[1] < [2]"]:
+            assert "❌" in calculator(expression)
+        assert "= 6" in calculator("sum([1, 2, 3])")
+        assert "= 4" in calculator("max((1, 4))")
+    
+    def test_comparisons(self, calculator):
+        """Test that comparisons still evaluate as before the whitelist"""
+        assert "= True" in calculator("2 > 1")
+        assert "= False" in calculator("sqrt(16) == 5 or 1 >= 2")
+    
+    def test_compiled_expressions_are_cached(self, calculator):
+        """Test that repeated expressions reuse their compiled code"""
+        compile_expression.cache_clear()
+        calculator("sqrt(2) * 3")
+        calculator("sqrt(2) * 3")
+        assert compile_expression.cache_info().hits == 1
+
+
+
+class TestMathBatchTool:
+    """Test suite for the vectorized batch calculator"""
+    
+    @pytest.fixture
+    def batch_calculator(self):
+        """Get batch calculator tool instance (needs NumPy)"""
+        pytest.importorskip("numpy")
+        return get_math_batch_tool()
+    
+    def test_values_over_lists(self, batch_calculator):
+        """Test element-wise evaluation of equal-length lists"""
+        result = batch_calculator("x * (1 + r) ** 2", '{"x": [100, 200], "r": [0.1, 0]}', "values")
+        assert "over 2 values" in result
+        assert "[121, 200]" in result
+    
+    def test_summary_over_range(self, batch_calculator):
+        """Test summary statistics over a start:stop:step range"""
+        result = batch_calculator("sqrt(x)", '{"x": "0:101:1"}')
+        assert "count: 101" in result
+        assert "max: 10" in result
+        assert "median: 7.0710678119" in result
+    
+    def test_values_are_truncated(self, batch_calculator):
+        """Test that long results list only the first values"""
+        result = batch_calculator("x * 2", '{"x": "0:100"}', "values")
+        assert "(80 more)" in result
+    
+    def test_reductions_return_a_single_result(self, batch_calculator):
+        """Test that sum() over a range collapses to one number"""
+        assert "= 5050" in batch_calculator("sum(x)", '{"x": "1:101"}')
+    
+    def test_rejects_unsafe_and_oversized_input(self, batch_calculator):
+        """Test the whitelist, unknown names and the size limit"""
+        assert "❌" in batch_calculator("x.__class__", '{"x": [1]}')
+        assert "❌" in batch_calculator("y + 1", '{"x": [1]}')
+        assert "❌" in batch_calculator("x", '{"sqrt": [1]}')
+        assert "❌" in batch_calculator("x + 1", '{"x": "0:1e12"}')
+        assert "❌" in batch_calculator("factorial(n)", '{"n": [5000]}')
+    
+    def test_extra_arguments_do_not_reach_numpy(self, batch_calculator):
+        """Test that pow()'s modulus and a second sqrt() argument are refused, not used as out="""
+        assert "modulus" in batch_calculator("pow(x, 2, 5)", '{"x": [1, 2]}')
+        assert "❌" in batch_calculator("sqrt(x, r)", '{"x": [1, 4], "r": [0.0, 0.0]}')
+        assert "[3, 4]" in batch_calculator("log(x, 2)", '{"x": [8, 16]}', "values")
+    
+    def test_integer_powers_are_computed_in_floating_point(self, batch_calculator):
+        """Test that int constants raised to negative or large powers neither fail nor wrap"""
+        assert "[1, 2]" in batch_calculator("x * 10 ** -2", '{"x": [100, 200]}', "values")
+        assert "[18446744073709551616, 36893488147419103232]" in batch_calculator("x * 2 ** 64", '{"x": [1, 2]}', "values")
+        assert "[0.25, 0.5]" in batch_calculator("pow(2, -x)", '{"x": [2, 1]}', "values")
 
 
 if __name__ == '__main__':
@@ -54,19 +54,59 @@ def render_agent_card(agent: Dict, on_try: Callable = None, on_clone: Callable =
         st.divider()
 
 
-def render_agent_grid(agents: list, on_try: Callable = None, on_clone: Callable = None, on_delete: Callable = None):
-    """Render multiple agents in a grid layout"""
+def render_agent_row(agent: Dict, on_try: Callable = None, on_clone: Callable = None, on_delete: Callable = None):
+    """Render a compact single-row agent entry for dense browsing"""
+    
+    col_info, col_model, col_try, col_clone, col_delete = st.columns([5, 2, 1, 1, 1])
+    
+    with col_info:
+        tools = agent.get('tools', [])
+        tools_text = f" · 🧰 {', '.join(tools)}" if tools else ""
+        st.markdown(f"**🤖 {agent.get('name', 'Unnamed Agent')}** · 👤 {agent.get('author', 'Unknown')}{tools_text}")
+    
+    with col_model:
+        st.caption(agent.get('model', 'N/A'))
+    
+    with col_try:
+        if st.button("💬", key=f"try_{agent.get('id')}", help="Try", use_container_width=True):
+            if on_try:
+                on_try(agent)
+    
+    with col_clone:
+        if st.button("📝", key=f"clone_{agent.get('id')}", help="Clone", use_container_width=True):
+            if on_clone:
+                on_clone(agent)
+    
+    with col_delete:
+        if st.button("🗑️", key=f"delete_{agent.get('id')}", help="Delete", use_container_width=True):
+            if on_delete:
+                on_delete(agent)
+
+
+def render_agent_grid(agents: list, on_try: Callable = None, on_clone: Callable = None, on_delete: Callable = None,
+                      compact: bool = False, total: int = None, offset: int = 0):
+    """Render a page of agents as cards, or as compact rows
+    
+    agents is the page to draw; total and offset describe where the page
+    sits in the full result set for the count caption.
+    """
     
     if not agents:
         st.info("No agents found. Create your first agent to get started!")
         return
     
     # Display count
-    st.caption(f"Showing {len(agents)} agent(s)")
+    if total is not None and total > len(agents):
+        st.caption(f"Showing {offset + 1}–{offset + len(agents)} of {total} agent(s)")
+    else:
+        st.caption(f"Showing {len(agents)} agent(s)")
     
     # Render each agent
     for agent in agents:
-        render_agent_card(agent, on_try, on_clone, on_delete)
+        if compact:
+            render_agent_row(agent, on_try, on_clone, on_delete)
+        else:
+            render_agent_card(agent, on_try, on_clone, on_delete)
 
 
 def render_agent_summary(agent: Dict):
@@ -3,7 +3,7 @@ Chat Box Component - Chat interface for testing agents
 """
 import streamlit as st
 from typing import List, Dict, Optional
-from core.runner import AgentRunner
+from core.runner import checkout_runner
 
 
 def initialize_chat_session(agent_name: str):
@@ -14,6 +14,22 @@ def initialize_chat_session(agent_name: str):
     return session_key
 
 
+def _stream_content(events, status, tool_calls: List[str]):
+    """Yield content deltas from runner events, showing tool activity in status.
+    
+    Completed tool calls are appended to tool_calls as readable lines.
+    """
+    for event in events:
+        if event['type'] == 'content':
+            status.empty()
+            yield event['content']
+        elif event['status'] == 'started':
+            status.caption(f"🔧 Using {event['tool']}...")
+        else:
+            tool_calls.append(f"{event['tool']}({event['args']}) -> {event['result']}")
+            status.empty()
+
+
 def render_chat_interface(agent: Dict, show_reasoning: bool = False):
     """Render chat interface for an agent"""
     
@@ -55,35 +71,40 @@ def render_chat_interface(agent: Dict, show_reasoning: bool = False):
         with st.chat_message("user", avatar="👤"):
             st.markdown(user_input)
         
-        # Get agent response
+        # Stream agent response
         with st.chat_message("assistant", avatar="🤖"):
-            with st.spinner(f"{agent_name} is thinking..."):
-                try:
-                    # Create agent runner
-                    runner = AgentRunner(agent)
-                    
-                    # Get response
-                    response = runner.run(
+            status = st.empty()
+            status.caption(f"{agent_name} is thinking...")
+            tool_calls = []
+            try:
+                # Borrow a pooled runner for this agent; other sessions get
+                # their own while this one is streaming
+                with checkout_runner(agent) as runner:
+                    events = runner.run_stream(
                         user_input,
                         chat_history=st.session_state[session_key]
                     )
                     
-                    # Display response
-                    st.markdown(response)
-                    
-                    # Add to history
-                    st.session_state[session_key].append({
-                        'role': 'assistant',
-                        'content': response
-                    })
+                    # Display content as it arrives
+                    response = st.write_stream(_stream_content(events, status, tool_calls))
                 
-                except Exception as e:
-                    error_msg = f"❌ Error: {str(e)}"
-                    st.error(error_msg)
-                    st.session_state[session_key].append({
-                        'role': 'assistant',
-                        'content': error_msg
-                    })
+                # Add to history
+                message = {
+                    'role': 'assistant',
+                    'content': response
+                }
+                if tool_calls:
+                    message['reasoning'] = '\n'.join(tool_calls)
+                st.session_state[session_key].append(message)
+            
+            except Exception as e:
+                status.empty()
+                error_msg = f"❌ Error: {str(e)}"
+                st.error(error_msg)
+                st.session_state[session_key].append({
+                    'role': 'assistant',
+                    'content': error_msg
+                })
         
         # Rerun to update chat
         st.rerun()